@@ -11,21 +11,37 @@ DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
 DB_NAME = os.getenv("DB_NAME")
 
-DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# DATABASE_URL overrides the Postgres settings (e.g. sqlite:///local.db for local load tests)
+DATABASE_URL = os.getenv("DATABASE_URL") or f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"sslmode": "require"},  # Enforce SSL for Supabase
-    pool_pre_ping=True,                   # Check if connection is alive
-    pool_recycle=1800,                    # Reconnect every 30 minutes
-    pool_size=5,                          # Limit base connections
-    max_overflow=10,                      # Allow burst if needed
-    echo=False                            # Disable verbose SQL logging in prod
-)
+_engine = None
+
+def get_engine():
+    # Built on first use rather than at import, so importing the app never
+    # needs database settings (and psycopg2 is only loaded when it is used)
+    global _engine
+    if _engine is None:
+        if DATABASE_URL.startswith("sqlite"):
+            _engine = create_engine(
+                DATABASE_URL,
+                connect_args={"check_same_thread": False},  # Sessions are used from the threadpool
+                echo=False
+            )
+        else:
+            _engine = create_engine(
+                DATABASE_URL,
+                connect_args={"sslmode": "require"},  # Enforce SSL for Supabase
+                pool_pre_ping=True,                   # Check if connection is alive
+                pool_recycle=1800,                    # Reconnect every 30 minutes
+                pool_size=5,                          # Limit base connections
+                max_overflow=10,                      # Allow burst if needed
+                echo=False                            # Disable verbose SQL logging in prod
+            )
+    return _engine
 
 def init_db():
-    SQLModel.metadata.create_all(engine)
+    SQLModel.metadata.create_all(get_engine())
 
 def get_session():
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         yield session
@@ -0,0 +1,64 @@
+"""
+Version stamps and ETags for each user's record collection
+
+users.records_version is a per-user change counter. Every transaction
+that writes a user's health_records bumps it in the same commit
+(bump_records_version), so a record set and its counter always agree.
+
+Collection endpoints build a weak ETag from the user, the counter and
+whatever else shapes the body (e.g. query parameters). The counter is
+on the user row that authentication has already loaded, so answering
+If-None-Match with 304 costs no query: no rows are loaded or serialized.
+
+Responses are marked "private, no-cache". The browser keeps them, but
+asks every time, and gets a 304 while nothing has changed.
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Response
+from sqlalchemy import update
+from sqlmodel import Session
+
+from .models import users
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def bump_records_version(session: Session, user_id) -> None:
+    # Atomic increment in the caller's transaction; commit together with the record changes
+    session.execute(
+        update(users).where(users.user_id == user_id).values(records_version=users.records_version + 1)
+    )
+
+
+def records_etag(user: users, *variant) -> str:
+    """
+    Weak ETag of a user's record collection
+
+    Args:
+        user: The authenticated user, with records_version loaded
+        *variant: Anything else the body depends on, e.g. query parameters
+
+    Returns:
+        str: e.g. W/"3f2a..."; the user is part of it, so a browser shared
+        by two accounts never revalidates one account's copy for the other
+    """
+    parts = [str(user.user_id), str(user.records_version or 0), *map(str, variant)]
+    return f'W/"{hashlib.sha256("|".join(parts).encode()).hexdigest()[:24]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # Weak comparison (RFC 9110 13.1.2): the W/ prefix is ignored; "*" matches any current representation
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"})
@@ -0,0 +1,145 @@
+"""
+The patient features, declared once
+
+Everything that knows about the seven model inputs is derived from FEATURES:
+
+    schemas.py        PatientData, PatientDataWithCreatedAt, PatientDataUpdate (patient_model)
+    validators.py     PATIENT_FIELD_RULES, used by validate_patient_data and the columnar bulk validator
+    ml/inferences.py  feature_matrix: model column order, including the derived bmi/age ratio
+    ml/drift.py       histogram range and bins per feature
+    ml/distill.py     bounds, integer and flipped columns of the jittered training rows (model_matrix)
+
+plus a fixed-size binary row encoding (encode_rows / decode_rows). Changing
+a bound here changes it everywhere; adding a feature also needs the models
+retrained and a health_records column.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Type
+
+from pydantic import BaseModel, Field, create_model
+
+
+class Feature(NamedTuple):
+    name: str
+    type: Type            # int or float
+    min: float
+    max: float
+    message: str          # Validation message for values outside [min, max]
+    bins: int             # Drift histogram bins over [min, max]
+    storage: str          # NumPy type of the binary row encoding; wide enough for [min, max]
+
+
+FEATURES = (
+    Feature("pregnancies", int, 0, 20, "Pregnancies must be between 0 and 20", 10, "u1"),
+    Feature("glucose", int, 0, 300, "Glucose must be between 0 and 300 mg/dL", 15, "<u2"),
+    Feature("blood_pressure", int, 0, 200, "Blood pressure must be between 0 and 200 mmHg", 10, "u1"),
+    Feature("insulin", int, 0, 1000, "Insulin must be between 0 and 1000 μU/mL", 10, "<u2"),
+    Feature("bmi", float, 10.0, 70.0, "BMI must be between 10.0 and 70.0", 12, "<f8"),
+    Feature("diabetic_family", int, 0, 1, "Diabetic family history must be 0 (no) or 1 (yes)", 2, "u1"),
+    Feature("age", int, 1, 120, "Age must be between 1 and 120 years", 12, "u1"),
+)
+
+FEATURE_NAMES = tuple(feature.name for feature in FEATURES)
+
+# Model input columns in training order: the inputs, then bmi/age
+MODEL_COLUMNS = FEATURE_NAMES + ("bmi_age_ratio",)
+
+_BMI = FEATURE_NAMES.index("bmi")
+_AGE = FEATURE_NAMES.index("age")
+
+
+def patient_model(model_name: str, optional: bool = False, **extra_fields) -> Type[BaseModel]:
+    """
+    Build a Pydantic model with one bounded field per feature
+
+    Args:
+        model_name: Name of the generated class (shown in the OpenAPI schema)
+        optional: Make every feature Optional with a None default, for partial updates
+        **extra_fields: More fields as (type, default) pairs, e.g. created_at
+
+    Returns:
+        type: The model class
+    """
+    fields = {
+        feature.name: (
+            Optional[feature.type] if optional else feature.type,
+            Field(None if optional else ..., ge=feature.min, le=feature.max),
+        )
+        for feature in FEATURES
+    }
+    return create_model(model_name, **fields, **extra_fields)
+
+
+def field_rules() -> Dict[str, dict]:
+    # The shape validators.py has always used for its range checks
+    return {
+        feature.name: {
+            "min": feature.min,
+            "max": feature.max,
+            "integer": feature.type is int,
+            "message": feature.message,
+        }
+        for feature in FEATURES
+    }
+
+
+def feature_matrix(rows: List[Dict[str, Any]]):
+    """
+    Model input matrix for a list of rows, columns in MODEL_COLUMNS order
+
+    The inputs are copied in with one np.array call and the derived
+    column is computed on the whole array.
+    """
+    import numpy as np
+
+    if not rows:
+        return np.empty((0, len(MODEL_COLUMNS)), dtype=float)
+    return model_matrix([[row[name] for name in FEATURE_NAMES] for row in rows])
+
+
+def model_matrix(inputs):
+    """
+    Model input matrix from raw inputs whose columns are in FEATURE_NAMES
+    order: the inputs, then the derived bmi/age column
+    """
+    import numpy as np
+
+    X = np.empty((len(inputs), len(MODEL_COLUMNS)), dtype=float)
+    X[:, :len(FEATURE_NAMES)] = inputs
+    X[:, -1] = X[:, _BMI] / X[:, _AGE]
+    return X
+
+
+def row_dtype():
+    # NumPy structured type of one encoded row (16 bytes, little-endian, no padding)
+    import numpy as np
+
+    return np.dtype([(feature.name, feature.storage) for feature in FEATURES])
+
+
+def encode_rows(rows: List[Dict[str, Any]]) -> bytes:
+    """Pack rows into fixed-size binary records, one column at a time"""
+    import numpy as np
+
+    packed = np.empty(len(rows), dtype=row_dtype())
+    for name in FEATURE_NAMES:
+        packed[name] = [row[name] for row in rows]
+    return packed.tobytes()
+
+
+def decode_rows(data: bytes) -> List[Dict[str, Any]]:
+    """Unpack encode_rows output back into row dicts of ints and floats"""
+    import numpy as np
+
+    return [dict(zip(FEATURE_NAMES, values)) for values in np.frombuffer(data, dtype=row_dtype()).tolist()]
+
+
+def decode_matrix(data: bytes):
+    """Model input matrix straight from encode_rows output, without building dicts"""
+    import numpy as np
+
+    packed = np.frombuffer(data, dtype=row_dtype())
+    X = np.empty((len(packed), len(MODEL_COLUMNS)), dtype=float)
+    for i, name in enumerate(FEATURE_NAMES):
+        X[:, i] = packed[name]
+    X[:, -1] = X[:, _BMI] / X[:, _AGE]
+    return X
@@ -0,0 +1,356 @@
+"""
+Background predictions for bulk imports
+
+POST /records/bulk?background=true stores the rows straight away with
+prediction_status "pending" under one prediction_jobs row, and answers
+as soon as they are committed. A small pool of daemon threads picks up
+queued jobs and fills in the predictions JOB_BATCH_SIZE rows at a time:
+one predict_risk_batch call and one UPDATE per batch, with the job's
+counters committed in the same transaction, so GET /records/jobs/{id}
+always matches the rows.
+
+Several processes (uvicorn --workers N) can hold the same job ID: the one
+that submitted it, and any that find it while resuming. A worker takes a
+job with one conditional UPDATE (claim_job) that stamps it as the owner
+with a lease of JOB_LEASE_SECONDS, so only one of them runs it. Every batch
+renews the lease and commits only while the worker still owns the job; a
+worker that lost it (e.g. it stalled past its lease and another took
+over) rolls the batch back and stops. On Postgres the pending rows are
+also selected FOR UPDATE SKIP LOCKED.
+
+Queued jobs, and running jobs whose lease has expired (their worker
+stopped or died), are picked up again when the pool starts and then
+every JOB_LEASE_SECONDS; their rows that are still pending are predicted
+then.
+"""
+import os
+import queue
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Set
+from uuid import UUID, uuid4
+
+from sqlalchemy import and_, func, or_, update
+from sqlmodel import Session, select
+
+from .database import get_engine
+from .etags import bump_records_version
+from .features import FEATURE_NAMES
+from .metrics import observe_stage, registry
+from .models import health_records, prediction_jobs
+from .ml import inferences
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", "500"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+
+
+class JobLeaseLost(Exception):
+    """The job was taken over by another worker after this one's lease expired"""
+
+# Cumulative counters for /metrics
+job_stats = {
+    "jobs_finished_total": 0,
+    "rows_completed_total": 0,
+    "rows_failed_total": 0,
+}
+
+
+def job_progress(job: prediction_jobs) -> dict:
+    # Job row plus the derived numbers a client polls for; which worker holds it is internal
+    done = job.completed + job.failed
+    return {
+        **job.dict(exclude={"owner", "lease_expires_at"}),
+        "pending": job.total - done,
+        "progress": round(done / job.total * 100, 2) if job.total else 100.0,
+    }
+
+
+def worker_id() -> str:
+    # Unique per pool, readable in the table: host, process and a random suffix
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+
+def claimable():
+    # Queued, or running under a lease that has passed (or that predates leases)
+    return or_(
+        prediction_jobs.status == "queued",
+        and_(prediction_jobs.status == "running",
+             or_(prediction_jobs.lease_expires_at.is_(None), prediction_jobs.lease_expires_at < datetime.utcnow())),
+    )
+
+
+def claim_job(session: Session, job_id: UUID, owner: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+    """
+    Take a job for `owner`, atomically, and commit
+
+    Args:
+        session: Database session
+        job_id: The job to take
+        owner: The claiming worker (worker_id())
+        lease_seconds: How long the job stays ours without renewal
+
+    Returns:
+        bool: True if this worker now runs the job; False if it is unknown,
+        finished, or running under another worker's live lease
+    """
+    now = datetime.utcnow()
+    claimed = session.execute(
+        update(prediction_jobs)
+        .where(prediction_jobs.job_id == job_id, claimable())
+        .values(status="running", owner=owner, lease_expires_at=now + timedelta(seconds=lease_seconds),
+                started_at=func.coalesce(prediction_jobs.started_at, now))
+        .returning(prediction_jobs.job_id)
+    ).first()
+    session.commit()
+    return claimed is not None
+
+
+def _update_owned_job(session: Session, job: prediction_jobs, held_by: Optional[str], **values) -> None:
+    # Job counters/status, written only while `held_by` still owns the job (None: unowned use, no check)
+    statement = update(prediction_jobs).where(prediction_jobs.job_id == job.job_id)
+    if held_by is not None:
+        statement = statement.where(prediction_jobs.owner == held_by)
+    if session.execute(statement.values(**values)).rowcount == 0:
+        session.rollback()
+        raise JobLeaseLost(f"Prediction job {job.job_id} is no longer owned by {held_by}")
+
+
+def predict_job_batch(
+    session: Session,
+    job: prediction_jobs,
+    batch_size: int,
+    owner: Optional[str] = None,
+    lease_seconds: float = JOB_LEASE_SECONDS,
+) -> int:
+    """
+    Predict the next batch of a job's pending rows and commit it
+
+    Args:
+        session: Database session
+        job: The job, attached to `session`
+        batch_size: Maximum rows predicted per transaction
+        owner: The worker that claimed the job; the batch is only committed
+            while it still owns it, and its lease is renewed
+        lease_seconds: Lease length from now
+
+    Returns:
+        int: Number of rows processed, 0 once none are pending
+
+    Raises:
+        JobLeaseLost: If another worker has taken the job over; nothing is committed
+    """
+    rows = session.exec(
+        select(health_records.record_id, *(getattr(health_records, field) for field in FEATURE_NAMES))
+        .where(health_records.job_id == job.job_id, health_records.prediction_status == "pending")
+        .order_by(health_records.record_id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not rows:
+        return 0
+    ids = [row[0] for row in rows]
+    names = job.models.split(",") if job.models else None
+
+    started = time.perf_counter()
+    lease = {"lease_expires_at": datetime.utcnow() + timedelta(seconds=lease_seconds)} if owner is not None else {}
+    try:
+        model_set = inferences.load_models()
+        predictions = inferences.predict_risk_batch(
+            [dict(zip(FEATURE_NAMES, row[1:])) for row in rows], model_set, names)
+    except Exception as e:
+        session.execute(
+            update(health_records)
+            .where(health_records.record_id.in_(ids))
+            .values(prediction_status="failed")
+        )
+        # Counters are incremented in SQL, in the same transaction as the rows
+        _update_owned_job(session, job, owner, failed=prediction_jobs.failed + len(ids), error=str(e), **lease)
+        failed = True
+    else:
+        version = inferences.model_version(model_set)
+        # Bulk UPDATE by primary key: one executemany for the whole batch
+        session.execute(update(health_records), [
+            {"record_id": record_id, **inferences.stored_risks(prediction), "model_version": version,
+             "prediction_status": "complete"}
+            for record_id, prediction in zip(ids, predictions)
+        ])
+        _update_owned_job(session, job, owner, completed=prediction_jobs.completed + len(ids), **lease)
+        failed = False
+    bump_records_version(session, job.user_id)
+    session.commit()
+    job_stats["rows_failed_total" if failed else "rows_completed_total"] += len(ids)
+    observe_stage("prediction_job_batch", time.perf_counter() - started)
+    return len(ids)
+
+
+class PredictionJobPool:
+    """
+    Daemon threads that run queued bulk-import prediction jobs
+
+    Configured from the environment:
+        JOB_WORKERS: number of worker threads (default 2)
+        JOB_BATCH_SIZE: rows predicted per model call and transaction (default 500)
+        JOB_LEASE_SECONDS: how long a claimed job stays with this pool without
+            progress, and how often abandoned jobs are looked for (default 120)
+    """
+
+    def __init__(
+        self,
+        engine_factory: Callable = get_engine,
+        workers: int = JOB_WORKERS,
+        batch_size: int = JOB_BATCH_SIZE,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+    ):
+        self.engine_factory = engine_factory
+        self.workers = workers
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.owner = worker_id()
+        self._queue: queue.Queue = queue.Queue()
+        # Submitted and not finished here yet; resume() does not queue these again
+        self._known: Set[UUID] = set()
+        self._known_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._loop, name=f"prediction-job-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        # Off the startup path: a slow or unreachable database must not delay serving
+        threading.Thread(target=self._resume_loop, name="prediction-job-resume", daemon=True).start()
+
+    def stop(self) -> None:
+        # Running jobs stop after their current batch and are resumed on the next start
+        self._stop.set()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def submit(self, job_id: UUID) -> None:
+        with self._known_lock:
+            if job_id in self._known:
+                return
+            self._known.add(job_id)
+        self._queue.put(job_id)
+
+    def join(self, timeout: float = 30.0) -> bool:
+        """Wait until every submitted job has been run"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def resume(self) -> int:
+        """
+        Queue the jobs nobody is running: queued ones, and running ones whose lease expired
+
+        Returns:
+            int: Number of jobs queued here
+        """
+        try:
+            with Session(self.engine_factory()) as session:
+                job_ids = session.exec(
+                    select(prediction_jobs.job_id)
+                    .where(claimable())
+                    .order_by(prediction_jobs.created_at)
+                ).all()
+        except Exception as e:
+            print(f"Could not resume prediction jobs: {str(e)}")
+            return 0
+        with self._known_lock:
+            job_ids = [job_id for job_id in job_ids if job_id not in self._known]
+        for job_id in job_ids:
+            self.submit(job_id)
+        if job_ids:
+            print(f"Resumed {len(job_ids)} unfinished prediction jobs")
+        return len(job_ids)
+
+    def _resume_loop(self) -> None:
+        # At start, then once per lease: picks up jobs whose worker died without finishing them
+        self.resume()
+        while not self._stop.wait(self.lease_seconds):
+            self.resume()
+
+    def _loop(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            try:
+                if job_id is None:
+                    return
+                self.run_job(job_id)
+            except Exception as e:
+                print(f"Prediction job {job_id} failed: {str(e)}")
+            finally:
+                with self._known_lock:
+                    self._known.discard(job_id)
+                self._queue.task_done()
+
+    def run_job(self, job_id: UUID) -> Optional[dict]:
+        """
+        Predict every pending row of a job, batch by batch
+
+        Args:
+            job_id: The job to run
+
+        Returns:
+            dict: The job's final progress, or None if it was unknown,
+            already finished, run by another worker, or interrupted by stop()
+        """
+        with Session(self.engine_factory()) as session:
+            if not claim_job(session, job_id, self.owner, self.lease_seconds):
+                return None
+            job = session.get(prediction_jobs, job_id)
+
+            try:
+                while predict_job_batch(session, job, self.batch_size, self.owner, self.lease_seconds):
+                    if self._stop.is_set():
+                        # Hand it back at once instead of waiting for the lease to run out
+                        _update_owned_job(session, job, self.owner, status="queued", owner=None,
+                                          lease_expires_at=None)
+                        session.commit()
+                        return None
+
+                session.refresh(job)
+                _update_owned_job(session, job, self.owner, status="failed" if job.failed else "complete",
+                                  finished_at=datetime.utcnow(), owner=None, lease_expires_at=None)
+                session.commit()
+            except JobLeaseLost as e:
+                print(str(e))
+                return None
+            session.refresh(job)
+            job_stats["jobs_finished_total"] += 1
+            return job_progress(job)
+
+    def render_metrics(self) -> List[str]:
+        return [
+            "# HELP prediction_jobs_queued Bulk-import prediction jobs waiting for a worker",
+            "# TYPE prediction_jobs_queued gauge",
+            f"prediction_jobs_queued {self.queued}",
+            "# HELP prediction_jobs_finished_total Bulk-import prediction jobs run to the end",
+            "# TYPE prediction_jobs_finished_total counter",
+            f"prediction_jobs_finished_total {job_stats['jobs_finished_total']}",
+            "# HELP prediction_job_rows_total Rows predicted by bulk-import jobs",
+            "# TYPE prediction_job_rows_total counter",
+            f'prediction_job_rows_total{{status="complete"}} {job_stats["rows_completed_total"]}',
+            f'prediction_job_rows_total{{status="failed"}} {job_stats["rows_failed_total"]}',
+        ]
+
+
+job_pool = PredictionJobPool()
+registry.collectors.append(job_pool.render_metrics)
@@ -1,8 +1,49 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import auth, records, prediction
+from fastapi.responses import PlainTextResponse
+from app.routes import auth, records, prediction, admin, health
+from app.rate_limit import RateLimitMiddleware
+from app.database import get_engine
+from app.maintenance import VerificationSweeper
+from app.jobs import job_pool
+from app.metrics import MetricsMiddleware, registry
+from app.warmup import WARMUP_ENABLED, startup_warmup
+from app.ml.inferences import model_swapper, shadow
+from app.profiling import PROFILING_ENABLED, ProfilingMiddleware
 
-app = FastAPI(title="Health Records API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load and warm the models and DB pool in the background; /health/ready
+    # reports 503 until done. WARMUP_ENABLED=false defers loading to the first prediction
+    if WARMUP_ENABLED:
+        startup_warmup.start()
+
+    # Background cleanup of expired verification tokens
+    sweeper = None
+    if os.getenv("TOKEN_SWEEP_ENABLED", "true").lower() != "false":
+        sweeper = VerificationSweeper(get_engine())
+        sweeper.start()
+
+    # Follow model version switches made by other workers or the CLI
+    model_swapper.start()
+
+    # Workers for background bulk-import predictions; unfinished jobs are resumed
+    job_pool.start()
+
+    # Optionally score a candidate model version on sampled live traffic
+    if os.getenv("SHADOW_MODEL_VERSION"):
+        shadow.start_in_background(os.getenv("SHADOW_MODEL_VERSION"))
+    yield
+    startup_warmup.stop()
+    model_swapper.stop()
+    job_pool.stop()
+    shadow.stop()
+    if sweeper is not None:
+        sweeper.stop()
+
+app = FastAPI(title="Health Records API", version="1.0.0", lifespan=lifespan)
 
 # CORS setup
 origins = [
@@ -19,15 +60,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Throttle the auth endpoints per client IP
+app.add_middleware(RateLimitMiddleware)
+
+# Opt-in request profiling; not installed at all unless enabled
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Outermost, so throttled and CORS-rejected requests are counted too
+app.add_middleware(MetricsMiddleware)
+
 # Include route modules
 app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(records.router, prefix="/records", tags=["Records"])
 app.include_router(prediction.router, prefix="/predict", tags=["Prediction"])
+app.include_router(health.router, prefix="/health", tags=["Health"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"], include_in_schema=False)
 
 @app.get("/")
 def root():
     return {"message": "Health Records API is running"}
 
+#Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 
 #Run the uvicorn FastAPI
 #py -m uvicorn app.main:app --reload
\ No newline at end of file
@@ -0,0 +1,256 @@
+"""
+Periodic cleanup of expired verification tokens, abandoned signups and
+expired refresh tokens
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, update
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+
+from .models import refresh_tokens, users
+from .metrics import registry
+
+# Cumulative counters plus the outcome of the most recent run
+sweep_stats = {
+    "runs": 0,
+    "tokens_cleared_total": 0,
+    "accounts_purged_total": 0,
+    "refresh_tokens_purged_total": 0,
+    "last_run": None,
+}
+
+
+def _render_sweep_stats():
+    last = sweep_stats["last_run"] or {}
+    return [
+        "# HELP verification_sweep_runs_total Completed verification token sweeps",
+        "# TYPE verification_sweep_runs_total counter",
+        f"verification_sweep_runs_total {sweep_stats['runs']}",
+        "# HELP verification_sweep_rows_total Rows processed by verification token sweeps",
+        "# TYPE verification_sweep_rows_total counter",
+        f'verification_sweep_rows_total{{action="token_cleared"}} {sweep_stats["tokens_cleared_total"]}',
+        f'verification_sweep_rows_total{{action="account_purged"}} {sweep_stats["accounts_purged_total"]}',
+        f'verification_sweep_rows_total{{action="refresh_token_purged"}} {sweep_stats["refresh_tokens_purged_total"]}',
+        "# HELP verification_sweep_last_run_rows Rows processed by the most recent sweep",
+        "# TYPE verification_sweep_last_run_rows gauge",
+        f'verification_sweep_last_run_rows{{action="token_cleared"}} {last.get("tokens_cleared", 0)}',
+        f'verification_sweep_last_run_rows{{action="account_purged"}} {last.get("accounts_purged", 0)}',
+        f'verification_sweep_last_run_rows{{action="refresh_token_purged"}} {last.get("refresh_tokens_purged", 0)}',
+    ]
+
+
+registry.collectors.append(_render_sweep_stats)
+
+
+def clear_expired_verification_tokens(
+    session: Session,
+    now: datetime,
+    grace: timedelta = timedelta(days=1),
+    batch_size: int = 500,
+) -> int:
+    """
+    Null out verification tokens that expired more than `grace` ago
+
+    Each batch is its own short transaction so no lock is held for long.
+    The grace period keeps recently expired links answering with the
+    "expired" message instead of "invalid".
+
+    Args:
+        session: Database session
+        now: Reference time (UTC)
+        grace: How long after expiry a token is kept
+        batch_size: Maximum rows touched per transaction
+
+    Returns:
+        int: Number of rows cleared
+    """
+    cutoff = now - grace
+    cleared = 0
+    while True:
+        ids = session.exec(
+            select(users.user_id)
+            .where(users.verification_token != None, users.verification_token_expiry < cutoff)  # noqa: E711
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            return cleared
+        session.execute(
+            update(users)
+            .where(users.user_id.in_(ids))
+            .values(verification_token=None, verification_token_expiry=None)
+        )
+        session.commit()
+        cleared += len(ids)
+
+
+def purge_abandoned_accounts(
+    session: Session,
+    now: datetime,
+    older_than: timedelta,
+    batch_size: int = 500,
+) -> int:
+    """
+    Delete unverified accounts created more than `older_than` ago
+
+    Accounts that still hold an unexpired verification token are kept,
+    so a user who just asked for a new link is never removed.
+
+    Args:
+        session: Database session
+        now: Reference time (UTC)
+        older_than: Minimum account age before it can be purged
+        batch_size: Maximum rows deleted per transaction
+
+    Returns:
+        int: Number of accounts deleted
+    """
+    cutoff = now - older_than
+    purged = 0
+    while True:
+        ids = session.exec(
+            select(users.user_id)
+            .where(
+                users.is_verified == False,  # noqa: E712
+                users.created_at < cutoff,
+                (users.verification_token_expiry == None) | (users.verification_token_expiry < now)  # noqa: E711
+            )
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            return purged
+        session.execute(delete(users).where(users.user_id.in_(ids)))
+        session.commit()
+        purged += len(ids)
+
+
+def purge_refresh_tokens(
+    session: Session,
+    now: datetime,
+    batch_size: int = 500,
+) -> int:
+    """
+    Delete refresh tokens that can no longer be used or recognised
+
+    That is every token past its expiry, every token of a user that no
+    longer exists, and revoked tokens of a user with no live token left.
+    A rotated token is kept while its user still holds a live one, since
+    a replay of it is what revokes the rest of the family. Each batch is
+    its own short transaction.
+
+    Args:
+        session: Database session
+        now: Reference time (UTC)
+        batch_size: Maximum rows deleted per transaction
+
+    Returns:
+        int: Number of tokens deleted
+    """
+    live = aliased(refresh_tokens)
+    owner_exists = select(users.user_id).where(users.user_id == refresh_tokens.user_id).exists()
+    family_live = (
+        select(live.token_id)
+        .where(live.user_id == refresh_tokens.user_id, live.revoked == False, live.expires_at >= now)  # noqa: E712
+        .exists()
+    )
+    purged = 0
+    while True:
+        ids = session.exec(
+            select(refresh_tokens.token_id)
+            .where(
+                (refresh_tokens.expires_at < now)
+                | ~owner_exists
+                | ((refresh_tokens.revoked == True) & ~family_live)  # noqa: E712
+            )
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            return purged
+        session.execute(delete(refresh_tokens).where(refresh_tokens.token_id.in_(ids)))
+        session.commit()
+        purged += len(ids)
+
+
+def run_sweep(
+    session: Session,
+    now: Optional[datetime] = None,
+    purge_after: Optional[timedelta] = None,
+    batch_size: int = 500,
+) -> dict:
+    """
+    Run one sweep and record its outcome in `sweep_stats`
+
+    Args:
+        session: Database session
+        now: Reference time (UTC), defaults to the current time
+        purge_after: If set, also purge unverified accounts older than this
+        batch_size: Maximum rows touched per transaction
+
+    Returns:
+        dict: Rows processed and timing for this run
+    """
+    now = now or datetime.utcnow()
+    started = time.perf_counter()
+
+    tokens_cleared = clear_expired_verification_tokens(session, now, batch_size=batch_size)
+    accounts_purged = 0
+    if purge_after is not None:
+        accounts_purged = purge_abandoned_accounts(session, now, purge_after, batch_size=batch_size)
+    refresh_tokens_purged = purge_refresh_tokens(session, now, batch_size=batch_size)
+
+    result = {
+        "tokens_cleared": tokens_cleared,
+        "accounts_purged": accounts_purged,
+        "refresh_tokens_purged": refresh_tokens_purged,
+        "duration_seconds": round(time.perf_counter() - started, 4),
+        "finished_at": datetime.utcnow().isoformat(),
+    }
+    sweep_stats["runs"] += 1
+    sweep_stats["tokens_cleared_total"] += tokens_cleared
+    sweep_stats["accounts_purged_total"] += accounts_purged
+    sweep_stats["refresh_tokens_purged_total"] += refresh_tokens_purged
+    sweep_stats["last_run"] = result
+    return result
+
+
+class VerificationSweeper:
+    """
+    Daemon thread that calls `run_sweep` every `interval` seconds
+
+    Configured from the environment:
+        TOKEN_SWEEP_INTERVAL_SECONDS: time between runs (default 3600)
+        PURGE_UNVERIFIED_AFTER_DAYS: purge abandoned signups older than this (default off)
+    """
+
+    def __init__(self, engine, interval: Optional[float] = None, purge_after: Optional[timedelta] = None):
+        self.engine = engine
+        self.interval = interval or float(os.getenv("TOKEN_SWEEP_INTERVAL_SECONDS", "3600"))
+        if purge_after is None and os.getenv("PURGE_UNVERIFIED_AFTER_DAYS"):
+            purge_after = timedelta(days=int(os.getenv("PURGE_UNVERIFIED_AFTER_DAYS")))
+        self.purge_after = purge_after
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._loop, name="verification-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                with Session(self.engine) as session:
+                    result = run_sweep(session, purge_after=self.purge_after)
+                print(f"Verification sweep: {result['tokens_cleared']} tokens cleared, "
+                      f"{result['accounts_purged']} accounts purged, "
+                      f"{result['refresh_tokens_purged']} refresh tokens purged in {result['duration_seconds']}s")
+            except Exception as e:
+                print(f"Verification sweep failed: {str(e)}")
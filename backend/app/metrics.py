@@ -0,0 +1,296 @@
+"""
+In-process request metrics exposed in Prometheus text format
+"""
+import inspect
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .profiling import profiled
+
+# Bucket upper bounds, preallocated once per histogram
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. Counts are plain list slots updated without a
+    lock: under the GIL a concurrent update can at worst lose a single
+    increment, which is an acceptable trade for zero contention.
+    """
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside its bucket, like histogram_quantile"""
+        total = self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for bound, bucket in zip(self.bounds, self.counts):
+            if seen + bucket >= rank:
+                return lower + (bound - lower) * ((rank - seen) / bucket if bucket else 0.0)
+            seen += bucket
+            lower = bound
+        # Past the last finite bound there is nothing to interpolate against
+        return self.bounds[-1]
+
+
+class HistogramFamily:
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...], bounds: Tuple[float, ...]):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.bounds = bounds
+        self.children: Dict[Tuple[str, ...], Histogram] = {}
+
+    def labels(self, *values: str) -> Histogram:
+        child = self.children.get(values)
+        if child is None:
+            child = self.children.setdefault(values, Histogram(self.bounds))
+        return child
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, child in list(self.children.items()):
+            labels = _format_labels(self.labelnames, values)
+            cumulative = 0
+            for bound, count in zip(self.bounds, child.counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {cumulative}')
+            cumulative += child.counts[-1]
+            lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {child.sum}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class CounterFamily:
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...]):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *values: str, amount: float = 1) -> None:
+        self.values[values] = self.values.get(values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, total in list(self.values.items()):
+            lines.append(f"{self.name}{{{_format_labels(self.labelnames, values)}}} {total}")
+        return lines
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    return ",".join(
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    )
+
+
+class Registry:
+    def __init__(self):
+        self.families: list = []
+        # Callables returning extra pre-rendered lines (for state owned by other modules)
+        self.collectors: List[Callable[[], List[str]]] = []
+
+    def histogram(self, name, help_text, labelnames=(), bounds=LATENCY_BUCKETS) -> HistogramFamily:
+        family = HistogramFamily(name, help_text, tuple(labelnames), bounds)
+        self.families.append(family)
+        return family
+
+    def counter(self, name, help_text, labelnames=()) -> CounterFamily:
+        family = CounterFamily(name, help_text, tuple(labelnames))
+        self.families.append(family)
+        return family
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self.families:
+            lines.extend(family.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+request_size = registry.histogram(
+    "http_request_size_bytes", "HTTP request body size by route", ("method", "route"), SIZE_BUCKETS)
+response_size = registry.histogram(
+    "http_response_size_bytes", "HTTP response body size by route", ("method", "route"), SIZE_BUCKETS)
+responses_total = registry.counter(
+    "http_responses_total", "HTTP responses by route and status code", ("method", "route", "status"))
+stage_duration = registry.histogram(
+    "stage_duration_seconds", "Time spent in named request stages", ("stage", "model"))
+
+
+def observe_stage(stage: str, seconds: float, model: str = "") -> None:
+    stage_duration.labels(stage, model).observe(seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def stage_timer(stage: str, model: str = ""):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started, model)
+
+
+# Per-request stage totals, so the route can subtract nested stages
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+class MetricsRoute(APIRoute):
+    """
+    APIRoute that times the "validation" stage: body parsing, schema
+    validation and dependency resolution up to the moment the endpoint
+    function is entered, excluding the separately timed get_current_user.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _timed_endpoint(profiled(endpoint)), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            timings: Dict[str, float] = {}
+            token = _request_timings.set(timings)
+            started = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                entered = timings.get("_endpoint_start", time.perf_counter())
+                validation = entered - started - timings.get("get_current_user", 0.0)
+                stage_duration.labels("validation", "").observe(max(validation, 0.0))
+                _request_timings.reset(token)
+
+        return timed_handler
+
+
+def _timed_endpoint(endpoint):
+    # Wrapped before FastAPI inspects it; functools.wraps keeps the signature visible
+    if getattr(endpoint, "_marks_endpoint_start", False):
+        return endpoint
+
+    if inspect.iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def timed_endpoint(*args, **kwargs):
+            _mark_endpoint_start()
+            return await endpoint(*args, **kwargs)
+    else:
+        @wraps(endpoint)
+        def timed_endpoint(*args, **kwargs):
+            _mark_endpoint_start()
+            return endpoint(*args, **kwargs)
+
+    timed_endpoint._marks_endpoint_start = True
+    return timed_endpoint
+
+
+def _mark_endpoint_start() -> None:
+    timings = _request_timings.get()
+    if timings is not None:
+        timings["_endpoint_start"] = time.perf_counter()
+
+
+def route_label(scope) -> str:
+    """
+    Route template for a matched request, e.g. /records/{recordId}, taken
+    from the route FastAPI matched, never rebuilt from the raw path
+    """
+    # Recent FastAPI keeps included routes unprefixed and records the full template
+    # in its effective route context; older versions copy the route with the prefix
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    template = getattr(context, "path_format", None) or getattr(scope.get("route"), "path_format", None)
+    return template or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, body sizes and status per route
+    template (not raw path, which would explode label cardinality).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        sent = 0
+
+        async def send_wrapper(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            label = route_label(scope)
+            method = scope["method"]
+            request_duration.labels(method, label).observe(time.perf_counter() - started)
+            received = 0
+            for name, value in scope.get("headers", ()):
+                if name == b"content-length":
+                    received = int(value)
+                    break
+            request_size.labels(method, label).observe(received)
+            response_size.labels(method, label).observe(sent)
+            responses_total.inc(method, label, str(status))
+
+
+# Time every ORM commit, wherever it happens
+@event.listens_for(Session, "before_commit")
+def _before_commit(session):
+    session.info["_commit_started"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    started = session.info.pop("_commit_started", None)
+    if started is not None:
+        observe_stage("db_commit", time.perf_counter() - started)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("_commit_started", None)
@@ -0,0 +1,225 @@
+"""
+Bring an existing database up to the current models
+
+init_db() (SQLModel.metadata.create_all) creates missing tables but never
+alters a table that already exists. Columns and indexes added to users,
+health_records and prediction_jobs since they were first created are
+added here (ADDED_COLUMNS and ADDED_INDEXES).
+
+It also moves health_records to compact prediction storage. Each model
+used to have two columns: outcome_<name>, a label string ("Low Risk",
+"Medium Risk" or "High Risk"), and prediction_prob_<name>, a FLOAT
+percentage. The label is always risk_label() of the probability, so now
+there is one column per model: risk_<name> SMALLINT, holding the risk in
+hundredths of a percent (7034 means 70.34%). The API still returns
+outcome_<name> and prediction_prob_<name>. They are derived when the row
+is read (see inferences.prediction_fields).
+
+Run this once per database after deploying (from backend/):
+    python -m app.migrate_predictions          # upgrade DATABASE_URL
+    python -m app.migrate_predictions --sql    # only print the statements it would run
+    python -m app.migrate_predictions --sizes  # table/index size and scan time
+
+Only what is missing is changed, so running it again does nothing. All
+the statements run in one transaction. On Postgres, the dropped columns
+keep their space until the table is rewritten, e.g. with VACUUM FULL
+health_records.
+"""
+import argparse
+import sys
+import time
+from typing import Dict, List
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+
+from app.ml.inferences import model_files
+from app.models import health_records, prediction_jobs, users
+
+TABLE = "health_records"
+TABLES = {model.__tablename__: model.__table__ for model in (users, health_records, prediction_jobs)}
+
+# Columns added to tables that already existed, with what existing rows need (e.g. a default for NOT NULL)
+ADDED_COLUMNS = (
+    ("users", "records_version", "DEFAULT 0 NOT NULL"),
+    ("health_records", "model_version", ""),
+    ("health_records", "prediction_status", "DEFAULT 'complete' NOT NULL"),
+    ("health_records", "job_id", ""),
+    ("health_records", "fingerprint", ""),
+    ("prediction_jobs", "owner", ""),
+    ("prediction_jobs", "lease_expires_at", ""),
+)
+
+# Indexes declared on those tables' columns (index=True / unique=True in app.models) after they existed
+ADDED_INDEXES = (
+    ("users", "ix_users_email"),
+    ("users", "ix_users_verification_token"),
+    ("health_records", "ix_health_records_job_id"),
+    ("health_records", "ix_health_records_fingerprint"),
+)
+
+
+def schema_statements(engine) -> List[str]:
+    """
+    SQL that adds the ADDED_COLUMNS and ADDED_INDEXES a database lacks
+
+    Tables that do not exist yet are skipped: create_all builds them whole.
+
+    Returns:
+        list: Statements to run in order, columns before indexes
+    """
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    statements = []
+    for table, column, extra in ADDED_COLUMNS:
+        if table not in tables or column in {c["name"] for c in inspector.get_columns(table)}:
+            continue
+        column_type = TABLES[table].c[column].type.compile(dialect=engine.dialect)
+        statements.append(f"ALTER TABLE {table} ADD COLUMN {column} {column_type} {extra}".rstrip())
+    for table, name in ADDED_INDEXES:
+        if table not in tables or name in {index["name"] for index in inspector.get_indexes(table)}:
+            continue
+        index = next(index for index in TABLES[table].indexes if index.name == name)
+        statements.append(str(CreateIndex(index).compile(dialect=engine.dialect)))
+    return statements
+
+
+def migration_statements(names=tuple(model_files)) -> List[str]:
+    """
+    SQL that converts the old prediction columns to risk_<name> SMALLINT
+
+    Args:
+        names: Model names whose columns are converted
+
+    Returns:
+        list: Statements to run in order, in one transaction
+    """
+    statements = [f"ALTER TABLE {TABLE} ADD COLUMN risk_{name} SMALLINT" for name in names]
+    statements.append(
+        f"UPDATE {TABLE} SET "
+        + ", ".join(f"risk_{name} = CAST(ROUND(prediction_prob_{name} * 100) AS SMALLINT)" for name in names)
+    )
+    for name in names:
+        statements.append(f"ALTER TABLE {TABLE} DROP COLUMN outcome_{name}")
+        statements.append(f"ALTER TABLE {TABLE} DROP COLUMN prediction_prob_{name}")
+    return statements
+
+
+def needs_migration(engine) -> bool:
+    # The old layout still has the prediction_prob_<name> columns
+    columns = {column["name"] for column in inspect(engine).get_columns(TABLE)}
+    return any(f"prediction_prob_{name}" in columns for name in model_files)
+
+
+def duplicate_emails(engine) -> List[str]:
+    # Emails held by more than one user; the unique ix_users_email cannot be built until they are resolved
+    if "users" not in inspect(engine).get_table_names():
+        return []
+    with engine.connect() as connection:
+        return list(connection.execute(
+            text("SELECT email FROM users GROUP BY email HAVING COUNT(*) > 1 ORDER BY email")
+        ).scalars())
+
+
+def upgrade_statements(engine) -> List[str]:
+    # Everything migrate() would run on this database, in order
+    statements = schema_statements(engine)
+    if TABLE in inspect(engine).get_table_names() and needs_migration(engine):
+        statements += migration_statements()
+    return statements
+
+
+def migrate(engine) -> bool:
+    """
+    Add missing columns and indexes, and convert health_records in place
+    if it still has the old prediction columns
+
+    Returns:
+        bool: True if anything was changed, False if the database was current
+
+    Raises:
+        ValueError: If ix_users_email is missing and some emails belong to
+            more than one user; nothing is changed
+    """
+    statements = upgrade_statements(engine)
+    if not statements:
+        return False
+    if any(" ix_users_email " in statement for statement in statements):
+        duplicates = duplicate_emails(engine)
+        if duplicates:
+            raise ValueError(
+                f"Cannot add the unique ix_users_email: {len(duplicates)} emails belong to more than one user "
+                f"({', '.join(duplicates[:5])}{', ...' if len(duplicates) > 5 else ''}). Merge or delete those accounts first."
+            )
+    with engine.begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement))
+    return True
+
+
+def relation_sizes(engine) -> Dict[str, int]:
+    """
+    On-disk bytes of health_records and of its indexes
+
+    Postgres reports pg_table_size and pg_indexes_size. SQLite reports
+    the pages of the table and of its indexes from the dbstat virtual
+    table.
+    """
+    with engine.connect() as connection:
+        if engine.dialect.name == "postgresql":
+            table_bytes, index_bytes = connection.execute(
+                text(f"SELECT pg_table_size('{TABLE}'), pg_indexes_size('{TABLE}')")
+            ).one()
+        else:
+            table_bytes = connection.execute(
+                text(f"SELECT SUM(pgsize) FROM dbstat WHERE name = '{TABLE}'")
+            ).scalar()
+            index_bytes = connection.execute(
+                text(f"SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name IN "
+                     f"(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = '{TABLE}')")
+            ).scalar()
+    return {"table_bytes": int(table_bytes), "index_bytes": int(index_bytes)}
+
+
+def scan_seconds(engine) -> float:
+    # Time to read every row's prediction columns, whichever layout the table has
+    columns = [column["name"] for column in inspect(engine).get_columns(TABLE)
+               if column["name"].startswith(("risk_", "outcome_", "prediction_prob_"))]
+    started = time.perf_counter()
+    with engine.connect() as connection:
+        connection.execute(text(f"SELECT {', '.join(columns)} FROM {TABLE}")).fetchall()
+    return time.perf_counter() - started
+
+
+def main(argv=None) -> int:
+    from app.database import get_engine
+
+    parser = argparse.ArgumentParser(description="Bring an existing database up to the current models")
+    parser.add_argument("--sql", action="store_true", help="Print the statements it would run and exit")
+    parser.add_argument("--sizes", action="store_true", help="Print table/index size and scan time and exit")
+    args = parser.parse_args(argv)
+
+    engine = get_engine()
+    if args.sql:
+        statements = upgrade_statements(engine)
+        print(";\n".join(statements) + ";" if statements else "-- nothing to do")
+        return 0
+    if args.sizes:
+        for key, value in relation_sizes(engine).items():
+            print(f"  {key}: {value}")
+        print(f"  scan_ms: {scan_seconds(engine) * 1000:.1f}")
+        return 0
+    try:
+        upgraded = migrate(engine)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if upgraded:
+        print("Database upgraded to the current models")
+    else:
+        print("Database already matches the current models")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""
+Distil the six-model ensemble into one small student model
+
+The teacher signal is the mean positive-class probability of the six
+serving models. The student is a gradient-boosted set of shallow
+regression trees fitted to it with scikit-learn, then flattened into
+plain numpy arrays: serving it needs neither sklearn nor xgboost, and
+one row costs well under a millisecond against tens of milliseconds for
+the full ensemble.
+
+Inputs are the training CSV plus jittered copies of its rows, so the
+student also sees values between the training points.
+
+Retrain after the serving models change with:
+    python -m app.ml.distill ../notebook/diabetes.csv
+    python -m app.ml.distill ../notebook/diabetes.csv --version student-2025-10  # also store it for shadowing
+"""
+import argparse
+import csv
+import os
+import sys
+from datetime import datetime
+from typing import Dict, Tuple
+
+from app.features import FEATURE_NAMES, FEATURES, model_matrix
+from app.ml.drift import PEDIGREE_THRESHOLD
+
+STUDENT_PATH = "app/ml/student.pkl"
+
+# Same bounds as the API validation; jittered rows are clipped into them
+INPUT_BOUNDS = tuple((feature.name, feature.min, feature.max) for feature in FEATURES)
+# Jittered values of these columns are rounded back to integers
+INTEGER_COLUMNS = [i for i, feature in enumerate(FEATURES) if feature.type is int]
+# The yes/no column: flipped instead of jittered
+_FAMILY = FEATURE_NAMES.index("diabetic_family")
+
+CSV_COLUMNS = {
+    "pregnancies": "Pregnancies",
+    "glucose": "Glucose",
+    "blood_pressure": "BloodPressure",
+    "insulin": "Insulin",
+    "bmi": "BMI",
+    "age": "Age",
+}
+
+
+class StudentModel:
+    """
+    Boosted regression trees as flat arrays, one row per tree
+
+    Every tree is walked `depth` steps for all rows at once; a leaf points
+    at itself (children -1), so shorter branches simply stay put.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, base: float, learning_rate: float,
+                 depth: int, metadata: dict):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.base = base
+        self.learning_rate = learning_rate
+        self.depth = depth
+        self.metadata = metadata
+
+    def predict_proba(self, X):
+        import numpy as np
+
+        # sklearn trees compare float32 inputs against their thresholds
+        X = np.asarray(X, dtype=np.float32)
+        trees = np.arange(self.feature.shape[0])[None, :]
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.zeros((X.shape[0], self.feature.shape[0]), dtype=np.intp)
+        for _ in range(self.depth):
+            left = self.left[trees, node]
+            goes_left = X[rows, self.feature[trees, node]] <= self.threshold[trees, node]
+            node = np.where(left == -1, node, np.where(goes_left, left, self.right[trees, node]))
+        risk = np.clip(self.base + self.learning_rate * self.value[trees, node].sum(axis=1), 0.0, 1.0)
+        return np.column_stack([1.0 - risk, risk])
+
+
+def read_training_rows(csv_path: str) -> list:
+    rows = []
+    with open(csv_path, newline="") as f:
+        for r in csv.DictReader(f):
+            row = {name: float(r[column]) for name, column in CSV_COLUMNS.items()}
+            row["diabetic_family"] = 1.0 if float(r["DiabetesPedigreeFunction"]) >= PEDIGREE_THRESHOLD else 0.0
+            # Zero BMI/age are missing values in the Pima data and outside the API bounds
+            row["bmi"] = max(row["bmi"], 10.0)
+            row["age"] = max(row["age"], 1.0)
+            rows.append(row)
+    return rows
+
+
+def jittered_inputs(base, count: int, rng, spread: float = 0.25):
+    """
+    Resample rows of `base` (raw inputs, no bmi/age column) with Gaussian
+    noise of `spread` standard deviations, and flip diabetic_family on 10%
+    """
+    import numpy as np
+
+    X = base[rng.integers(0, len(base), count)].copy()
+    scale = base.std(axis=0) * spread
+    scale[_FAMILY] = 0.0
+    X += rng.normal(0.0, 1.0, X.shape) * scale
+    flip = rng.random(count) < 0.1
+    X[flip, _FAMILY] = 1.0 - X[flip, _FAMILY]
+    X = np.clip(X, [low for _, low, _ in INPUT_BOUNDS], [high for _, _, high in INPUT_BOUNDS])
+    X[:, INTEGER_COLUMNS] = np.round(X[:, INTEGER_COLUMNS])
+    return X
+
+
+def teacher_probability(teacher: Dict[str, object], X):
+    import numpy as np
+
+    return np.mean([np.asarray(model.predict_proba(X))[:, 1] for model in teacher.values()], axis=0)
+
+
+def risk_band(p):
+    # 0/1/2 for the Low/Medium/High thresholds of inferences.risk_label
+    import numpy as np
+
+    return np.digitize(p, [0.33, 0.66], right=True)
+
+
+def distill(
+    teacher: Dict[str, object],
+    csv_path: str,
+    synthetic: int = 20000,
+    holdout: int = 5000,
+    n_estimators: int = 150,
+    max_depth: int = 4,
+    seed: int = 0,
+) -> Tuple[StudentModel, dict]:
+    """
+    Fit a student to the ensemble's mean probability
+
+    Args:
+        teacher: Model name to fitted pipeline (the serving ModelSet)
+        csv_path: Training CSV in the notebook's format
+        synthetic: Jittered rows added to the CSV rows for training
+        holdout: Jittered rows kept aside to measure fidelity
+        n_estimators: Number of boosted trees
+        max_depth: Depth of each tree
+        seed: Random seed for jitter and subsampling
+
+    Returns:
+        tuple: The student, and its fidelity report on the holdout rows
+    """
+    import numpy as np
+    from sklearn.ensemble import GradientBoostingRegressor
+
+    rng = np.random.default_rng(seed)
+    base = np.array([[row[name] for name, _, _ in INPUT_BOUNDS] for row in read_training_rows(csv_path)])
+    X_train = model_matrix(np.vstack([base, jittered_inputs(base, synthetic, rng)]))
+    X_test = model_matrix(jittered_inputs(base, holdout, rng))
+    y_train = teacher_probability(teacher, X_train)
+    y_test = teacher_probability(teacher, X_test)
+
+    booster = GradientBoostingRegressor(
+        n_estimators=n_estimators, max_depth=max_depth, learning_rate=0.1, subsample=0.8, random_state=seed,
+    ).fit(X_train, y_train)
+
+    trees = [estimator[0].tree_ for estimator in booster.estimators_]
+    size = max(tree.node_count for tree in trees)
+    feature = np.zeros((len(trees), size), dtype=np.intp)
+    threshold = np.zeros((len(trees), size))
+    left = np.full((len(trees), size), -1, dtype=np.intp)
+    right = np.full((len(trees), size), -1, dtype=np.intp)
+    value = np.zeros((len(trees), size))
+    for i, tree in enumerate(trees):
+        n = tree.node_count
+        feature[i, :n] = np.maximum(tree.feature, 0)  # leaves have feature -2
+        threshold[i, :n] = tree.threshold
+        left[i, :n] = tree.children_left
+        right[i, :n] = tree.children_right
+        value[i, :n] = tree.value[:, 0, 0]
+
+    predicted = np.clip(booster.predict(X_test), 0.0, 1.0)
+    report = {
+        "trained_at": datetime.utcnow().isoformat(),
+        "teacher": sorted(teacher),
+        "teacher_version": getattr(teacher, "version", None),
+        "training_rows": int(len(X_train)),
+        "holdout_rows": int(len(X_test)),
+        "trees": len(trees),
+        "max_depth": max_depth,
+        "mean_abs_diff": round(float(np.abs(predicted - y_test).mean()), 4),
+        "max_abs_diff": round(float(np.abs(predicted - y_test).max()), 4),
+        "label_agreement": round(float((risk_band(predicted) == risk_band(y_test)).mean()), 4),
+    }
+    student = StudentModel(
+        feature, threshold, left, right, value,
+        base=float(booster.init_.constant_.ravel()[0]),
+        learning_rate=booster.learning_rate,
+        depth=max_depth,
+        metadata=report,
+    )
+    return student, report
+
+
+def main(argv=None) -> int:
+    import joblib
+    from app.ml.inferences import load_models
+    from app.ml.model_store import store
+
+    parser = argparse.ArgumentParser(description="Distil the serving ensemble into one student model")
+    parser.add_argument("csv", help="Training CSV (notebook/diabetes.csv)")
+    parser.add_argument("--output", default=STUDENT_PATH, help=f"Where to write the student (default {STUDENT_PATH})")
+    parser.add_argument("--version", help="Also store it as model_Student.pkl in this model store version")
+    parser.add_argument("--synthetic", type=int, default=20000, help="Jittered training rows (default 20000)")
+    parser.add_argument("--trees", type=int, default=150, help="Boosted trees (default 150)")
+    parser.add_argument("--depth", type=int, default=4, help="Tree depth (default 4)")
+    args = parser.parse_args(argv)
+
+    # Go through the imported module so the pickle references app.ml.distill.StudentModel, not __main__
+    from app.ml import distill as module
+    student, report = module.distill(
+        load_models(), args.csv, args.synthetic, n_estimators=args.trees, max_depth=args.depth)
+    joblib.dump(student, args.output)
+    print(f"Wrote student to {args.output}")
+    if args.version:
+        directory = os.path.join(store.root, args.version)
+        os.makedirs(directory, exist_ok=True)
+        joblib.dump(student, os.path.join(directory, "model_Student.pkl"))
+        print(f"Stored student as model version {args.version}")
+    for key in ("trees", "training_rows", "mean_abs_diff", "max_abs_diff", "label_agreement"):
+        print(f"  {key}: {report[key]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
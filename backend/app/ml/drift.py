@@ -0,0 +1,173 @@
+"""
+Streaming summaries of model inputs, compared against the training data
+
+Each feature keeps a running mean/variance (Welford) and a fixed-bin
+histogram, so memory stays constant no matter how many predictions are
+served. Drift is reported as the Population Stability Index (PSI) of the
+live histogram against the reference histogram of notebook/diabetes.csv.
+
+Rebuild the reference file after retraining with:
+    python -m app.ml.drift ../notebook/diabetes.csv
+"""
+import csv
+import json
+import math
+import os
+import sys
+import threading
+from typing import Dict, List
+
+from app.features import FEATURES
+
+# Histogram range and bin count per input feature (the API validation bounds, from app/features.py)
+FEATURE_BINS = {feature.name: (feature.min, feature.max, feature.bins) for feature in FEATURES}
+
+REFERENCE_PATH = os.path.join(os.path.dirname(__file__), "reference_stats.json")
+
+# Threshold used in the notebook to turn DiabetesPedigreeFunction into diabetic_family
+PEDIGREE_THRESHOLD = 0.471876
+
+
+def bin_index(value: float, low: float, high: float, bins: int) -> int:
+    # Out-of-range values are clamped into the edge bins
+    if value <= low:
+        return 0
+    if value >= high:
+        return bins - 1
+    return int((value - low) / (high - low) * bins)
+
+
+class FeatureStats:
+    __slots__ = ("low", "high", "counts", "n", "mean", "m2")
+
+    def __init__(self, low: float, high: float, bins: int):
+        self.low = low
+        self.high = high
+        self.counts = [0] * bins
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def observe(self, value: float) -> None:
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+        self.counts[bin_index(value, self.low, self.high, len(self.counts))] += 1
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+
+def psi(expected: List[int], actual: List[int], floor: float = 1e-4) -> float:
+    """
+    Population Stability Index between two histograms over the same bins
+
+    Rule of thumb: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 major shift.
+    """
+    expected_total = sum(expected)
+    actual_total = sum(actual)
+    if not expected_total or not actual_total:
+        return 0.0
+    score = 0.0
+    for e, a in zip(expected, actual):
+        e_share = max(e / expected_total, floor)
+        a_share = max(a / actual_total, floor)
+        score += (a_share - e_share) * math.log(a_share / e_share)
+    return score
+
+
+class DriftMonitor:
+    def __init__(self, reference: Dict[str, dict]):
+        self.reference = reference
+        self.features = {name: FeatureStats(*spec) for name, spec in FEATURE_BINS.items()}
+        self._lock = threading.Lock()
+
+    def observe(self, data: dict) -> None:
+        # One short lock per row keeps each Welford update consistent across threads
+        with self._lock:
+            for name, stats in self.features.items():
+                stats.observe(float(data[name]))
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            result = {}
+            for name, stats in self.features.items():
+                ref = self.reference.get(name, {})
+                result[name] = {
+                    "count": stats.n,
+                    "mean": round(stats.mean, 4),
+                    "std": round(stats.std, 4),
+                    "histogram": list(stats.counts),
+                    "reference_mean": ref.get("mean"),
+                    "reference_std": ref.get("std"),
+                    "reference_histogram": ref.get("histogram"),
+                    "psi": round(psi(ref.get("histogram", []), stats.counts), 4),
+                }
+            return result
+
+    def render_metrics(self) -> List[str]:
+        summary = self.summary()
+        lines = [
+            "# HELP feature_observations_total Prediction inputs observed per feature",
+            "# TYPE feature_observations_total counter",
+        ]
+        lines += [f'feature_observations_total{{feature="{name}"}} {s["count"]}' for name, s in summary.items()]
+        for metric, key, help_text in (
+            ("feature_mean", "mean", "Running mean of each prediction input"),
+            ("feature_stddev", "std", "Running standard deviation of each prediction input"),
+            ("feature_drift_psi", "psi", "Population Stability Index against the training data"),
+        ):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+            lines += [f'{metric}{{feature="{name}"}} {s[key]}' for name, s in summary.items()]
+        return lines
+
+
+def load_reference(path: str = REFERENCE_PATH) -> Dict[str, dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_reference(csv_path: str) -> Dict[str, dict]:
+    """
+    Summarise the raw training CSV in the same shape as the live stats
+
+    Args:
+        csv_path: Path to the Pima diabetes CSV used to train the models
+
+    Returns:
+        dict: Per-feature mean, std and histogram
+    """
+    columns = {
+        "pregnancies": "Pregnancies",
+        "glucose": "Glucose",
+        "blood_pressure": "BloodPressure",
+        "insulin": "Insulin",
+        "bmi": "BMI",
+        "age": "Age",
+    }
+    features = {name: FeatureStats(*spec) for name, spec in FEATURE_BINS.items()}
+    with open(csv_path, newline="") as f:
+        for row in csv.DictReader(f):
+            for name, column in columns.items():
+                features[name].observe(float(row[column]))
+            features["diabetic_family"].observe(
+                1.0 if float(row["DiabetesPedigreeFunction"]) >= PEDIGREE_THRESHOLD else 0.0
+            )
+    return {
+        name: {"mean": round(stats.mean, 4), "std": round(stats.std, 4), "histogram": stats.counts}
+        for name, stats in features.items()
+    }
+
+
+drift_monitor = DriftMonitor(load_reference())
+
+
+if __name__ == "__main__":
+    reference = build_reference(sys.argv[1])
+    with open(REFERENCE_PATH, "w") as f:
+        json.dump(reference, f, indent=2)
+    print(f"Wrote reference stats for {len(reference)} features to {REFERENCE_PATH}")
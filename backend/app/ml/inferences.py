@@ -1,5 +1,13 @@
-import joblib
-import numpy as np
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+from app.features import feature_matrix
+from app.metrics import observe_stage, registry, stage_duration
+from app.ml.drift import drift_monitor
+from app.ml.model_store import ModelSet, ModelStore, store
+from app.ml.shadow import ShadowEvaluator
 
 # List of exported models
 model_files = {
@@ -11,8 +19,56 @@ model_files = {
     "xgboost": "app/ml/model_XGBoost.pkl"
 }
 
-# Load all models
-models = {name: joblib.load(path) for name, path in model_files.items()}
+# Active ModelSet, loaded by the startup warm-up or on the first prediction.
+# joblib/numpy/sklearn/xgboost are only imported at that point, which keeps
+# importing the app (and every test module) fast.
+models = None
+_models_lock = threading.Lock()
+
+def load_models() -> dict:
+    """
+    Load the store's active model version once; safe to call from several threads
+
+    Returns:
+        dict: Model name to fitted pipeline (a ModelSet carrying its version)
+    """
+    global models
+    if models is None:
+        with _models_lock:
+            if models is None:
+                models = store.load(store.active_version(), model_files)
+    return models
+
+def model_version(model_set=None) -> Optional[str]:
+    # None for anything that is not a ModelSet (e.g. a mocked dict in tests)
+    model_set = model_set if model_set is not None else models
+    return model_set.version if isinstance(model_set, ModelSet) else None
+
+def swap_models(model_set: ModelSet) -> None:
+    # Rebinding one global is atomic: requests already running keep the set they started with
+    global models
+    with _models_lock:
+        models = model_set
+
+# "student" answers /predict from the distilled model alone unless the full breakdown is asked for
+SERVING_MODE = os.getenv("SERVING_MODE", "ensemble").lower()
+STUDENT_MODEL_PATH = os.getenv("STUDENT_MODEL_PATH", "app/ml/student.pkl")
+student = None
+
+def load_student():
+    """
+    Load the distilled student model once (see app.ml.distill)
+
+    Returns:
+        StudentModel: Single model approximating the six-model mean probability
+    """
+    global student
+    if student is None:
+        with _models_lock:
+            if student is None:
+                import joblib
+                student = joblib.load(STUDENT_MODEL_PATH)
+    return student
 
 # Helper function to convert probability to risk label
 def risk_label(risk: float) -> str:
@@ -23,21 +79,271 @@ def risk_label(risk: float) -> str:
     else:
         return "High Risk"
 
-def predict_risk(data: dict) -> dict:
-    X = np.array([[data["pregnancies"], data["glucose"], data["blood_pressure"],
-                   data["insulin"], data["bmi"], data["diabetic_family"], data["age"],
-                   (data["bmi"] / data["age"])]])
-    
+# health_records keeps one SMALLINT per model, risk_<name>, in hundredths of a percent (7034 is 70.34%).
+# The outcome_/prediction_prob_ pair the API returns is derived from it (see app/migrate_predictions.py)
+RISK_SCALE = 10000
+# risk_label of every storable value, indexed by the stored integer
+RISK_LABELS = tuple(risk_label(stored / RISK_SCALE) for stored in range(RISK_SCALE + 1))
+
+def stored_risks(result: dict) -> dict:
+    # predict_risk output -> health_records risk_<name> columns
+    return {
+        f"risk_{key[len('prediction_prob_'):]}": round(value * 100)
+        for key, value in result.items() if key.startswith("prediction_prob_")
+    }
+
+def risk_fields(name: str, risk: float) -> dict:
+    # outcome_<name>/prediction_prob_<name> of a probability, taken from the integer it is stored as,
+    # so a record reads back with the label and percentage it was returned with
+    stored = round(risk * RISK_SCALE)
+    return {f"outcome_{name}": RISK_LABELS[stored], f"prediction_prob_{name}": stored / 100}
+
+def prediction_fields(record, names=tuple(model_files)) -> dict:
+    # health_records row -> outcome_<name>/prediction_prob_<name>, both None for a model not evaluated yet
+    fields = {}
+    for name in names:
+        stored = getattr(record, f"risk_{name}")
+        fields[f"outcome_{name}"] = None if stored is None else RISK_LABELS[stored]
+        fields[f"prediction_prob_{name}"] = None if stored is None else stored / 100
+    return fields
+
+# Candidate model set scored on sampled live inputs, off the request path
+shadow = ShadowEvaluator(label=risk_label)
+
+def select_models(model_set: Optional[dict], names: Optional[List[str]] = None) -> dict:
+    # The whole set, or just the requested models (None means all)
+    model_set = model_set if model_set is not None else load_models()
+    if names is None:
+        return model_set
+    return {name: model_set[name] for name in names}
+
+def predict_risk(
+    data: dict,
+    model_set: Optional[dict] = None,
+    names: Optional[List[str]] = None,
+    observe_drift: bool = True,
+) -> dict:
+    # observe_drift=False when the same input was already counted (e.g. by predict_student in one request)
+    import numpy as np
+
+    X = feature_matrix([data])
+
+    if observe_drift:
+        drift_monitor.observe(data)
+
     results = {}
+    primary = {}
     
-    for name, model in models.items():
+    for name, model in select_models(model_set, names).items():
+        started = time.perf_counter()
         proba = np.array(model.predict_proba(X))[:, 1]
+        observe_stage("predict_risk", time.perf_counter() - started, name)
         risk = float(proba[0])
+        primary[name] = [risk]
 
-        # Use helper to get label
-        label = risk_label(risk)
+        results.update(risk_fields(name, risk))
 
-        results[f"outcome_{name}"] = label
-        results[f"prediction_prob_{name}"] = round(risk * 100, 2)
+    if shadow.enabled:
+        shadow.submit(X, primary)
     
     return results
+
+def predict_student(data: dict) -> dict:
+    # Same output shape as predict_risk, for the single "student" model
+    X = feature_matrix([data])
+
+    drift_monitor.observe(data)
+
+    started = time.perf_counter()
+    risk = float(load_student().predict_proba(X)[0, 1])
+    observe_stage("predict_risk", time.perf_counter() - started, "student")
+
+    return risk_fields("student", risk)
+
+def predict_risk_batch(
+    rows: list,
+    model_set: Optional[dict] = None,
+    names: Optional[List[str]] = None,
+    observe_drift: bool = True,
+) -> list:
+    # Same output as predict_risk per row, but each model runs once over the whole matrix.
+    # observe_drift=False for re-scoring inputs that were already counted (e.g. filling in skipped models)
+    if not rows:
+        return []
+    import numpy as np
+
+    X = feature_matrix(rows)
+
+    if observe_drift:
+        for data in rows:
+            drift_monitor.observe(data)
+
+    results = [{} for _ in rows]
+    primary = {}
+
+    for name, model in select_models(model_set, names).items():
+        started = time.perf_counter()
+        proba = np.asarray(model.predict_proba(X))[:, 1]
+        observe_stage("predict_risk_batch", time.perf_counter() - started, name)
+        primary[name] = proba.tolist()
+
+        for result, risk in zip(results, primary[name]):
+            result.update(risk_fields(name, risk))
+
+    if shadow.enabled:
+        shadow.submit(X, primary)
+
+    return results
+
+# Feature drift and shadow agreement gauges on /metrics
+registry.collectors.append(drift_monitor.render_metrics)
+registry.collectors.append(shadow.render_metrics)
+
+def model_stats() -> dict:
+    # Per-model latency summary from the predict_risk stage histograms
+    stats = {}
+    names = list(model_files) + (["student"] if SERVING_MODE == "student" else [])
+    for name in names:
+        hist = stage_duration.labels("predict_risk", name)
+        calls = hist.count
+        stats[name] = {
+            "calls": calls,
+            "mean_ms": round(hist.sum / calls * 1000, 3) if calls else 0.0,
+            "p50_ms": round(hist.quantile(0.5) * 1000, 3),
+            "p95_ms": round(hist.quantile(0.95) * 1000, 3),
+            "p99_ms": round(hist.quantile(0.99) * 1000, 3),
+        }
+    return stats
+
+# Fixed inputs every candidate model version must score before it goes live
+CANARY_ROWS = [
+    {"pregnancies": 0, "glucose": 85, "blood_pressure": 66, "insulin": 0, "bmi": 26.6, "diabetic_family": 0, "age": 31},
+    {"pregnancies": 6, "glucose": 148, "blood_pressure": 72, "insulin": 0, "bmi": 33.6, "diabetic_family": 1, "age": 50},
+    {"pregnancies": 1, "glucose": 89, "blood_pressure": 66, "insulin": 94, "bmi": 28.1, "diabetic_family": 0, "age": 21},
+    {"pregnancies": 8, "glucose": 183, "blood_pressure": 64, "insulin": 0, "bmi": 23.3, "diabetic_family": 1, "age": 32},
+    {"pregnancies": 2, "glucose": 197, "blood_pressure": 70, "insulin": 543, "bmi": 30.5, "diabetic_family": 0, "age": 53},
+]
+
+def validate_model_set(model_set: dict) -> dict:
+    """
+    Score the canary rows with every model of a candidate set
+
+    Returns:
+        dict: Model name to its positive-class probabilities on the canary rows
+
+    Raises:
+        ValueError: If a model is missing or returns unusable probabilities
+    """
+    import numpy as np
+
+    missing = sorted(set(model_files) - set(model_set))
+    if missing:
+        raise ValueError(f"Model set is missing: {', '.join(missing)}")
+    X = feature_matrix(CANARY_ROWS)
+    scores = {}
+    for name in model_files:
+        proba = np.asarray(model_set[name].predict_proba(X), dtype=float)
+        if proba.shape != (len(CANARY_ROWS), 2) or not np.all(np.isfinite(proba)) \
+                or proba.min() < 0 or proba.max() > 1:
+            raise ValueError(f"Model {name} returned invalid probabilities on the canary rows")
+        scores[name] = [round(p, 4) for p in proba[:, 1].tolist()]
+    return scores
+
+class ModelSwapper:
+    """
+    Loads, validates and activates model versions without a restart
+
+    A swap loads the new set next to the active one, scores the canary
+    rows with it and only then rebinds `models`. With a poll interval, a
+    daemon thread also follows the store's ACTIVE pointer, so activating
+    a version in one worker (or from the CLI) reaches every worker.
+
+    Configured from the environment:
+        MODEL_WATCH_INTERVAL_SECONDS: pointer poll interval (default 30, 0 disables)
+    """
+
+    def __init__(self, model_store: ModelStore = store, poll_interval: Optional[float] = None):
+        self.store = model_store
+        if poll_interval is None:
+            poll_interval = float(os.getenv("MODEL_WATCH_INTERVAL_SECONDS", "30"))
+        self.poll_interval = poll_interval
+        self.status = {"state": "idle", "version": None, "error": None, "finished_at": None}
+        self._swap_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def activate(self, version: str, persist: bool = True) -> dict:
+        """
+        Load, validate and swap in a version, in the calling thread
+
+        Args:
+            version: Version name from the store
+            persist: Also point the store's ACTIVE file at it
+
+        Returns:
+            dict: The swap status
+
+        Raises:
+            RuntimeError: If another swap is already running
+        """
+        if not self._swap_lock.acquire(blocking=False):
+            raise RuntimeError("A model swap is already in progress")
+        try:
+            self.status = {"state": "loading", "version": version, "error": None, "finished_at": None}
+            started = time.perf_counter()
+            try:
+                candidate = self.store.load(version, model_files)
+                self.status["state"] = "validating"
+                self.status["canary"] = validate_model_set(candidate)
+                swap_models(candidate)
+                if persist:
+                    self.store.set_active(version)
+                self.status["state"] = "active"
+            except Exception as e:
+                self.status.update(state="failed", error=str(e))
+            self.status["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            self.status["finished_at"] = datetime.utcnow().isoformat()
+            print(f"Model swap to {version}: {self.status['state']}"
+                  + (f" ({self.status['error']})" if self.status["error"] else ""))
+            return self.status
+        finally:
+            self._swap_lock.release()
+
+    def activate_in_background(self, version: str) -> bool:
+        # False if a swap is already running
+        if self._swap_lock.locked():
+            return False
+        threading.Thread(target=self._activate_quietly, args=(version,), name="model-swap", daemon=True).start()
+        return True
+
+    def _activate_quietly(self, version: str) -> None:
+        try:
+            self.activate(version)
+        except RuntimeError:
+            pass
+
+    def start(self) -> None:
+        if self.poll_interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            # Not loaded yet: load_models will read the pointer itself
+            if models is None or self._swap_lock.locked():
+                continue
+            try:
+                wanted = self.store.active_version()
+                if wanted != model_version() and wanted != self.status.get("version"):
+                    self.activate(wanted, persist=False)
+            except Exception as e:
+                print(f"Model version poll failed: {str(e)}")
+
+model_swapper = ModelSwapper()
@@ -0,0 +1,127 @@
+"""
+Versioned on-disk model store
+
+Each version is a directory under MODEL_STORE_DIR holding the same
+model_*.pkl files that ship in app/ml/. The models bundled with the code
+are the "bundled" version. The active version is named in an ACTIVE file,
+rewritten atomically, so every worker can poll it and follow a switch.
+
+    app/ml/versions/
+        ACTIVE                  -> "2025-10-01"
+        2025-10-01/model_SVC.pkl
+        ...
+
+List versions or validate and activate one with:
+    python -m app.ml.model_store list
+    python -m app.ml.model_store activate 2025-10-01
+"""
+import os
+import sys
+from typing import Dict, List, Optional
+
+BUNDLED_VERSION = "bundled"
+BUNDLED_DIR = "app/ml"
+MODEL_STORE_DIR = os.getenv("MODEL_STORE_DIR", "app/ml/versions")
+ACTIVE_FILE = "ACTIVE"
+
+
+class ModelSet(dict):
+    """Model name to fitted pipeline, tagged with the version it was loaded from"""
+
+    def __init__(self, version: str, models: Dict[str, object]):
+        super().__init__(models)
+        self.version = version
+
+
+class ModelStore:
+    def __init__(self, root: str = MODEL_STORE_DIR, bundled_dir: str = BUNDLED_DIR):
+        self.root = root
+        self.bundled_dir = bundled_dir
+
+    def versions(self) -> List[str]:
+        stored = []
+        if os.path.isdir(self.root):
+            stored = sorted(
+                name for name in os.listdir(self.root)
+                if os.path.isdir(os.path.join(self.root, name))
+            )
+        return [BUNDLED_VERSION] + stored
+
+    def directory(self, version: str) -> str:
+        if version == BUNDLED_VERSION:
+            return self.bundled_dir
+        if version not in self.versions():
+            raise KeyError(f"Unknown model version: {version}")
+        return os.path.join(self.root, version)
+
+    def active_version(self) -> str:
+        path = os.path.join(self.root, ACTIVE_FILE)
+        if not os.path.exists(path):
+            return BUNDLED_VERSION
+        with open(path) as f:
+            return f.read().strip() or BUNDLED_VERSION
+
+    def set_active(self, version: str) -> None:
+        # Write then rename, so a reader never sees a half-written pointer
+        self.directory(version)
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = os.path.join(self.root, f".{ACTIVE_FILE}.{os.getpid()}")
+        with open(tmp_path, "w") as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self.root, ACTIVE_FILE))
+
+    def model_files(self, version: str) -> Dict[str, str]:
+        # Every model_<Name>.pkl in the version, keyed by lower-cased name
+        directory = self.directory(version)
+        return {
+            name[len("model_"):-len(".pkl")].lower(): os.path.join(directory, name)
+            for name in sorted(os.listdir(directory))
+            if name.startswith("model_") and name.endswith(".pkl")
+        }
+
+    def load(self, version: str, model_files: Optional[Dict[str, str]] = None) -> ModelSet:
+        """
+        Unpickle every model of a version
+
+        Args:
+            version: Version name, or "bundled"
+            model_files: Model name to file path, only the file name is used;
+                defaults to every model_*.pkl in the version
+
+        Returns:
+            ModelSet: The loaded models
+
+        Raises:
+            KeyError: If the version does not exist
+            FileNotFoundError: If the version is missing one of the models
+        """
+        import joblib
+
+        directory = self.directory(version)
+        if model_files is None:
+            model_files = self.model_files(version)
+        return ModelSet(version, {
+            name: joblib.load(os.path.join(directory, os.path.basename(path)))
+            for name, path in model_files.items()
+        })
+
+
+store = ModelStore()
+
+
+if __name__ == "__main__":
+    from app.ml.inferences import model_files, validate_model_set
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    if command == "list":
+        active = store.active_version()
+        for version in store.versions():
+            print(f"{'*' if version == active else ' '} {version}")
+    elif command == "activate" and len(sys.argv) == 3:
+        candidate = store.load(sys.argv[2], model_files)
+        validate_model_set(candidate)
+        store.set_active(candidate.version)
+        print(f"Activated model version {candidate.version}; workers pick it up on their next poll")
+    else:
+        print("Usage: python -m app.ml.model_store [list | activate <version>]")
+        sys.exit(1)
@@ -0,0 +1,232 @@
+"""
+Shadow evaluation of a candidate model set on live traffic
+
+A sampled fraction of predict_risk inputs is queued, together with the
+primary probabilities, for a background thread that scores them with the
+candidate set. The request never waits on the candidate: when the queue
+is full the sample is dropped. Each candidate model is compared with the
+primary model of the same name, or with the mean of the primary models
+when there is none (e.g. a single distilled or LightGBM model).
+
+Everything kept is bounded: per-model aggregates, one latency histogram
+per model and a ring buffer of recent samples.
+"""
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from app.metrics import registry
+from app.ml.model_store import ModelStore, store
+
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "100"))
+SHADOW_RECENT_SIZE = int(os.getenv("SHADOW_RECENT_SIZE", "100"))
+
+shadow_duration = registry.histogram(
+    "shadow_model_duration_seconds", "Candidate model latency in shadow mode", ("version", "model"))
+
+ENSEMBLE = "ensemble"
+
+
+class ShadowStats:
+    __slots__ = ("reference", "rows", "abs_diff_sum", "max_abs_diff", "label_agreements")
+
+    def __init__(self, reference: str):
+        self.reference = reference
+        self.rows = 0
+        self.abs_diff_sum = 0.0
+        self.max_abs_diff = 0.0
+        self.label_agreements = 0
+
+
+class ShadowEvaluator:
+    """
+    Runs a candidate ModelSet next to the primary one, off the request path
+
+    Configured from the environment:
+        SHADOW_MODEL_VERSION: store version to shadow at startup (default off)
+        SHADOW_SAMPLE_RATE: fraction of predict_risk calls sampled (default 0.1)
+        SHADOW_QUEUE_SIZE: pending samples before new ones are dropped (default 100)
+        SHADOW_RECENT_SIZE: recent samples kept for inspection (default 100)
+    """
+
+    def __init__(
+        self,
+        label: Callable[[float], str],
+        model_store: ModelStore = store,
+        sample_rate: float = SHADOW_SAMPLE_RATE,
+        queue_size: int = SHADOW_QUEUE_SIZE,
+        recent_size: int = SHADOW_RECENT_SIZE,
+    ):
+        self.label = label
+        self.store = model_store
+        self.sample_rate = sample_rate
+        self.candidate = None
+        self.stats: Dict[str, ShadowStats] = {}
+        self.recent: deque = deque(maxlen=recent_size)
+        self.dropped = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.candidate is not None
+
+    def start(self, version: str, sample_rate: Optional[float] = None) -> None:
+        """
+        Load a candidate version and start shadowing it; replaces any previous candidate
+
+        Raises:
+            KeyError: If the version does not exist
+        """
+        candidate = self.store.load(version)
+        with self._lock:
+            self.candidate = candidate
+            if sample_rate is not None:
+                self.sample_rate = sample_rate
+            self.stats = {}
+            self.recent.clear()
+            self.dropped = 0
+            self.errors = 0
+            self.last_error = None
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="shadow-evaluator", daemon=True)
+            self._thread.start()
+
+    def start_in_background(self, version: str) -> None:
+        # Used at startup, so a slow or broken candidate never delays serving
+        def run():
+            try:
+                self.start(version)
+                print(f"Shadowing model version {version} at sample rate {self.sample_rate}")
+            except Exception as e:
+                print(f"Could not start shadow model version {version}: {str(e)}")
+
+        threading.Thread(target=run, name="shadow-load", daemon=True).start()
+
+    def stop(self) -> None:
+        self.candidate = None
+
+    def submit(self, X, primary: Dict[str, List[float]]) -> bool:
+        """
+        Offer one predict_risk call to the shadow; never blocks
+
+        Args:
+            X: Feature matrix the primary models scored
+            primary: Primary model name to its probabilities for the rows of X
+
+        Returns:
+            bool: True if the sample was queued
+        """
+        candidate = self.candidate
+        if candidate is None or random.random() >= self.sample_rate:
+            return False
+        try:
+            self._queue.put_nowait((candidate, X, primary))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def drain(self, timeout: float = 5.0) -> bool:
+        """Wait until every queued sample has been evaluated"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def _loop(self) -> None:
+        while True:
+            candidate, X, primary = self._queue.get()
+            try:
+                # A sample queued for a candidate that was since replaced or stopped is stale
+                if candidate is self.candidate:
+                    self.evaluate(candidate, X, primary)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+            finally:
+                self._queue.task_done()
+
+    def evaluate(self, candidate, X, primary: Dict[str, List[float]]) -> None:
+        import numpy as np
+
+        rows = len(primary[next(iter(primary))]) if primary else len(X)
+        ensemble = [sum(probs[i] for probs in primary.values()) / len(primary) for i in range(rows)] \
+            if primary else [0.0] * rows
+        sample = {"timestamp": datetime.utcnow().isoformat(), "rows": rows, "models": {}}
+        for name, model in candidate.items():
+            started = time.perf_counter()
+            proba = np.asarray(model.predict_proba(X))[:, 1].tolist()
+            elapsed = time.perf_counter() - started
+            shadow_duration.labels(candidate.version, name).observe(elapsed)
+
+            reference_name = name if name in primary else ENSEMBLE
+            reference = primary[name] if name in primary else ensemble
+            diffs = [abs(c - r) for c, r in zip(proba, reference)]
+            agreements = sum(self.label(c) == self.label(r) for c, r in zip(proba, reference))
+            with self._lock:
+                stats = self.stats.get(name)
+                if stats is None:
+                    stats = self.stats[name] = ShadowStats(reference_name)
+                stats.rows += rows
+                stats.abs_diff_sum += sum(diffs)
+                stats.max_abs_diff = max(stats.max_abs_diff, max(diffs, default=0.0))
+                stats.label_agreements += agreements
+            sample["models"][name] = {
+                "probability": round(proba[0], 4),
+                "reference": round(reference[0], 4),
+                "latency_ms": round(elapsed * 1000, 3),
+            }
+        self.recent.append(sample)
+
+    def summary(self) -> dict:
+        candidate = self.candidate
+        with self._lock:
+            models = {}
+            for name, stats in self.stats.items():
+                hist = shadow_duration.labels(candidate.version if candidate else "", name)
+                models[name] = {
+                    "compared_with": stats.reference,
+                    "rows": stats.rows,
+                    "mean_abs_diff": round(stats.abs_diff_sum / stats.rows, 4) if stats.rows else 0.0,
+                    "max_abs_diff": round(stats.max_abs_diff, 4),
+                    "label_agreement": round(stats.label_agreements / stats.rows, 4) if stats.rows else None,
+                    "p50_ms": round(hist.quantile(0.5) * 1000, 3),
+                    "p99_ms": round(hist.quantile(0.99) * 1000, 3),
+                }
+            return {
+                "version": candidate.version if candidate else None,
+                "sample_rate": self.sample_rate,
+                "queued": self._queue.qsize(),
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "models": models,
+                "recent": list(self.recent),
+            }
+
+    def render_metrics(self) -> List[str]:
+        summary = self.summary()
+        lines = [
+            "# HELP shadow_samples_dropped_total Shadow samples dropped because the queue was full",
+            "# TYPE shadow_samples_dropped_total counter",
+            f"shadow_samples_dropped_total {summary['dropped']}",
+            "# HELP shadow_label_agreement Share of shadow rows whose risk label matches the primary",
+            "# TYPE shadow_label_agreement gauge",
+        ]
+        lines += [
+            f'shadow_label_agreement{{version="{summary["version"]}",model="{name}"}} {s["label_agreement"]}'
+            for name, s in summary["models"].items() if s["label_agreement"] is not None
+        ]
+        return lines
@@ -1,4 +1,5 @@
 from uuid import UUID, uuid4
+from sqlalchemy import SmallInteger
 from sqlmodel import SQLModel, Field
 from typing import Optional
 import datetime
@@ -6,7 +7,7 @@ import datetime
 #the model of users table
 class users(SQLModel, table=True):
     user_id: UUID = Field(default_factory=uuid4, primary_key=True, sa_column_kwargs={"server_default": "gen_random_uuid()"})
-    email: str
+    email: str = Field(index=True, unique=True)
     password_hash: str
     first_name: str
     last_name: str
@@ -14,8 +15,19 @@ class users(SQLModel, table=True):
     phone_number: str
     date_of_birth: datetime.date = None
     is_verified: bool = Field(default=False)
-    verification_token: Optional[str] = Field(default=None)
+    verification_token: Optional[str] = Field(default=None, index=True)
     verification_token_expiry: Optional[datetime.datetime] = Field(default=None)
+    # Bumped by every write to the user's health_records; the ETag of their record collections (app/etags.py)
+    records_version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    created_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
+
+#the model of refresh_tokens table (only the SHA-256 of each token is stored)
+class refresh_tokens(SQLModel, table=True):
+    token_id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: UUID = Field(index=True)
+    token_hash: str = Field(index=True, unique=True)
+    expires_at: datetime.datetime
+    revoked: bool = Field(default=False)
     created_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
 
 #the model of health_records table
@@ -30,18 +42,38 @@ class health_records(SQLModel, table=True):
     diabetic_family: int
     age: int
     
-    # Predictions from all models
-    outcome_logisticregression: str
-    prediction_prob_logisticregression: float
-    outcome_randomforest: str
-    prediction_prob_randomforest: float
-    outcome_svc: str
-    prediction_prob_svc: float
-    outcome_knn: str
-    prediction_prob_knn: float
-    outcome_mlp: str
-    prediction_prob_mlp: float
-    outcome_xgboost: str
-    prediction_prob_xgboost: float
+    # Risk per model in hundredths of a percent (7034 is 70.34%); the API derives outcome_/prediction_prob_
+    # from it on read. Null for a model left out via models= until it is filled in
+    risk_logisticregression: Optional[int] = Field(default=None, sa_type=SmallInteger)
+    risk_randomforest: Optional[int] = Field(default=None, sa_type=SmallInteger)
+    risk_svc: Optional[int] = Field(default=None, sa_type=SmallInteger)
+    risk_knn: Optional[int] = Field(default=None, sa_type=SmallInteger)
+    risk_mlp: Optional[int] = Field(default=None, sa_type=SmallInteger)
+    risk_xgboost: Optional[int] = Field(default=None, sa_type=SmallInteger)
+    # Model-set version that produced the predictions (null for rows stored before versioning)
+    model_version: Optional[str] = Field(default=None)
+    # "pending" while a background bulk-import job (job_id) has not predicted the row yet, "failed" if it could not
+    prediction_status: str = Field(default="complete")
+    job_id: Optional[UUID] = Field(default=None, index=True)
+    # SHA-256 of user_id, features and created_at for rows from a bulk upload, so re-uploads are skipped;
+    # cleared when the row is edited
+    fingerprint: Optional[str] = Field(default=None, unique=True, index=True)
 
     created_at: Optional[datetime.datetime] = Field(default_factory=datetime.datetime.utcnow)
+
+#the model of prediction_jobs table (background predictions of a bulk import)
+class prediction_jobs(SQLModel, table=True):
+    job_id: UUID = Field(default_factory=uuid4, primary_key=True)
+    user_id: UUID = Field(index=True)
+    status: str = Field(default="queued")  # queued, running, complete, failed
+    models: Optional[str] = None  # models= subset, comma-separated; null for all models
+    total: int = 0
+    completed: int = 0
+    failed: int = 0
+    error: Optional[str] = None
+    created_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
+    started_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+    # Worker running the job ("host:pid:id") and until when; a running job whose lease has passed may be taken over
+    owner: Optional[str] = None
+    lease_expires_at: Optional[datetime.datetime] = None
@@ -0,0 +1,142 @@
+"""
+Opt-in per-request profiling
+
+Off unless PROFILING_ENABLED=true, in which case the middleware is
+installed and requests carrying an `X-Profile` header are profiled with
+probability PROFILE_SAMPLE_RATE. The endpoint function runs under
+cProfile in its worker thread; the top frames by cumulative time are kept
+in a bounded ring buffer that the admin endpoint reads.
+
+Only one profiler can be enabled at a time (on Python 3.12 a second one
+raises ValueError, and before that it would also pick up the other
+thread's work). So sampled requests take a process-wide lock without
+waiting. A request that finds the profiler busy, or that cannot enable
+it, runs normally and its entry is marked "skipped".
+"""
+import cProfile
+import inspect
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from typing import Optional
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "1.0"))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "25"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+
+# Finished profiles, oldest dropped first
+profiles: deque = deque(maxlen=PROFILE_BUFFER_SIZE)
+
+# Set by the middleware for sampled requests only
+_active_profile: ContextVar[Optional[cProfile.Profile]] = ContextVar("active_profile", default=None)
+
+# Held while a profiler is enabled; never waited on
+_profiler_lock = threading.Lock()
+
+
+def profiled(endpoint):
+    """
+    Wrap a sync endpoint so it runs under the request's profiler, if any.
+    Async endpoints are returned unchanged: profiling them on the event
+    loop would mix in every other in-flight request.
+    """
+    if getattr(endpoint, "_profiled", False) or inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @wraps(endpoint)
+    def profiled_endpoint(*args, **kwargs):
+        profile = _active_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        if not _profiler_lock.acquire(blocking=False):
+            profile.skipped = "profiler busy"
+            return endpoint(*args, **kwargs)
+        try:
+            try:
+                profile.enable()
+            except ValueError as e:
+                # Another profiling tool (a debugger, coverage, sys.monitoring) owns the interpreter
+                profile.skipped = str(e)
+                return endpoint(*args, **kwargs)
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                profile.disable()
+        finally:
+            _profiler_lock.release()
+
+    profiled_endpoint._profiled = True
+    return profiled_endpoint
+
+
+def top_frames(profile: cProfile.Profile, limit: int = PROFILE_TOP_N) -> list:
+    """
+    Aggregate a profile into its `limit` most expensive functions
+
+    Returns:
+        list: Dicts with function, file, line, calls and times in ms, by cumulative time
+    """
+    # create_stats also works for an endpoint that never ran (e.g. a 401), unlike pstats.Stats
+    profile.create_stats()
+    stats = profile.stats
+    rows = []
+    for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.items():
+        rows.append({
+            "function": function,
+            "file": filename,
+            "line": line,
+            "calls": calls,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        })
+    rows.sort(key=lambda row: row["cumtime_ms"], reverse=True)
+    return rows[:limit]
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = cProfile.Profile()
+        profile.skipped = None
+        token = _active_profile.set(profile)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _active_profile.reset(token)
+            profiles.append({
+                "timestamp": datetime.utcnow().isoformat(),
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                "skipped": profile.skipped,
+                "top": [] if profile.skipped else top_frames(profile),
+            })
+
+    def _wants_profile(self, scope) -> bool:
+        for name, _ in scope.get("headers", ()):
+            if name == b"x-profile":
+                return random.random() < self.sample_rate
+        return False
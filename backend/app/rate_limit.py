@@ -0,0 +1,306 @@
+"""
+Token-bucket rate limiting for the authentication endpoints
+
+The per-IP limits key on the TCP peer. Behind a reverse proxy (Render, a
+load balancer, nginx) every request comes from the proxy, so set
+TRUSTED_PROXIES to the proxies' addresses or networks, comma-separated
+(e.g. TRUSTED_PROXIES=10.0.0.0/8). For requests from those peers the
+client is the rightmost X-Forwarded-For entry that is not itself a
+trusted proxy. The header is ignored for anyone else, so clients cannot
+pick their own key.
+
+The per-account login limit also keys on that address: a client
+guessing one account's password is throttled, while the owner can still
+log in from anywhere else.
+"""
+import ipaddress
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+
+class Rule(NamedTuple):
+    """A bucket of `capacity` tokens that fully refills every `period` seconds"""
+    capacity: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+
+def _refill(state: Optional[Tuple[float, float]], rule: Rule, now: float) -> float:
+    # A missing bucket is a full bucket
+    if state is None:
+        return float(rule.capacity)
+    tokens, stamp = state
+    return min(float(rule.capacity), tokens + (now - stamp) * rule.rate)
+
+
+class MemoryBackend:
+    """
+    Per-process bucket store.
+
+    Each bucket is a (tokens, stamp, full_at) tuple keyed by string, so a
+    lookup is a single dict access. `full_at` is when the bucket would be
+    back to capacity; such buckets are indistinguishable from missing ones
+    and get dropped by `evict`.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rule: Rule, now: float) -> float:
+        with self._lock:
+            state = self._buckets.get(key)
+            tokens = _refill(state and state[:2], rule, now)
+            if tokens < 1.0:
+                return (1.0 - tokens) / rule.rate
+            tokens -= 1.0
+            self._buckets[key] = (tokens, now, now + (rule.capacity - tokens) / rule.rate)
+            return 0.0
+
+    def evict(self, now: float) -> int:
+        with self._lock:
+            stale = [key for key, state in self._buckets.items() if state[2] <= now]
+            for key in stale:
+                del self._buckets[key]
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteBackend:
+    """
+    Bucket store in a local SQLite file so several workers on one host
+    share the same limits. Each take is one short IMMEDIATE transaction.
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, stamp REAL NOT NULL, full_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limit_full_at ON rate_limit_buckets (full_at)")
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rule: Rule, now: float) -> float:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, stamp FROM rate_limit_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens = _refill(row, rule, now)
+                if tokens < 1.0:
+                    return (1.0 - tokens) / rule.rate
+                tokens -= 1.0
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, stamp, full_at) VALUES (?, ?, ?, ?)",
+                    (key, tokens, now, now + (rule.capacity - tokens) / rule.rate),
+                )
+                return 0.0
+            finally:
+                self._conn.execute("COMMIT")
+
+    def evict(self, now: float) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM rate_limit_buckets WHERE full_at <= ?", (now,)).rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM rate_limit_buckets")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rate_limit_buckets").fetchone()[0]
+
+
+class RateLimiter:
+    """
+    Front end over a bucket backend that also sweeps out idle buckets
+    every `evict_interval` seconds, piggybacking on normal traffic.
+    """
+
+    def __init__(self, backend=None, enabled: bool = True, evict_interval: float = 60.0, clock=time.time):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.enabled = enabled
+        self.evict_interval = evict_interval
+        self._clock = clock
+        self._next_evict = clock() + evict_interval
+
+    def hit(self, key: str, rule: Rule) -> float:
+        """
+        Consume one token from the bucket for `key`
+
+        Returns:
+            float: 0.0 if allowed, otherwise seconds until a token is available
+        """
+        if not self.enabled:
+            return 0.0
+        now = self._clock()
+        if now >= self._next_evict:
+            self._next_evict = now + self.evict_interval
+            self.backend.evict(now)
+        return self.backend.take(key, rule, now)
+
+    def reset(self) -> None:
+        self.backend.clear()
+
+
+def _backend_from_env():
+    # RATE_LIMIT_BACKEND=sqlite:///path/to/file.db shares buckets between workers
+    url = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    return MemoryBackend()
+
+
+limiter = RateLimiter(
+    backend=_backend_from_env(),
+    enabled=os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "false",
+)
+
+# Per client IP, checked in the middleware before the route runs
+IP_RULES = {
+    "/auth/login": Rule(capacity=20, period=60),
+    "/auth/signup": Rule(capacity=5, period=3600),
+    "/auth/resend-verification": Rule(capacity=5, period=900),
+}
+
+# Per account (email or username), checked in the route before any query. Login attempts are
+# counted per account and client IP, so flooding someone's account cannot lock them out elsewhere
+ACCOUNT_RULES = {
+    "/auth/login": Rule(capacity=10, period=300),
+    "/auth/resend-verification": Rule(capacity=3, period=900),
+}
+
+
+def parse_trusted_proxies(value: str) -> tuple:
+    """
+    Parse TRUSTED_PROXIES
+
+    Args:
+        value: Comma-separated IP addresses and CIDR networks
+
+    Returns:
+        tuple: ip_network objects; a bare address becomes a /32 or /128
+
+    Raises:
+        ValueError: If an entry is not an address or network
+    """
+    return tuple(ipaddress.ip_network(entry.strip(), strict=False) for entry in value.split(",") if entry.strip())
+
+
+TRUSTED_PROXIES = parse_trusted_proxies(os.getenv("TRUSTED_PROXIES", ""))
+
+
+def _is_trusted(address: str, trusted: tuple) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted)
+
+
+def client_ip(scope, trusted: tuple = TRUSTED_PROXIES) -> str:
+    """
+    Address of the client an ASGI request came from
+
+    Args:
+        scope: ASGI connection scope
+        trusted: Proxy networks whose X-Forwarded-For is believed
+
+    Returns:
+        str: The peer address, or, when the peer is a trusted proxy, the
+        rightmost forwarded address that is not a trusted proxy
+    """
+    client = scope.get("client")
+    peer = client[0] if client else "unknown"
+    if not trusted or not _is_trusted(peer, trusted):
+        return peer
+    forwarded = b",".join(value for name, value in scope.get("headers", ()) if name == b"x-forwarded-for")
+    hops = [hop.strip() for hop in forwarded.decode("latin-1").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop, trusted):
+            return hop
+    # Every hop is a proxy of ours: the leftmost is the closest we have to a client
+    return hops[0] if hops else peer
+
+
+def _too_many(retry_after: float) -> dict:
+    return {"Retry-After": str(max(1, int(retry_after + 0.999)))}
+
+
+def check_account_limit(path: str, account: str, ip: Optional[str] = None) -> None:
+    """
+    Throttle repeated attempts against one account
+
+    Args:
+        path: Route path the attempt was made on
+        account: Email or username the attempt targets
+        ip: Client address (client_ip) to give each client its own bucket
+            for the account; None shares one bucket across all clients
+
+    Raises:
+        HTTPException: 429 if the account bucket is empty
+    """
+    key = f"acct:{path}:{account.strip().lower()}"
+    if ip is not None:
+        key += f":{ip}"
+    retry_after = limiter.hit(key, ACCOUNT_RULES[path])
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many attempts for this account. Please try again later.",
+            headers=_too_many(retry_after),
+        )
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware that rejects over-limit requests to the auth routes
+    with a 429 before FastAPI resolves any dependency, so no database
+    session is opened for them.
+    """
+
+    def __init__(
+        self,
+        app,
+        rate_limiter: RateLimiter = limiter,
+        rules: Dict[str, Rule] = IP_RULES,
+        trusted_proxies: tuple = TRUSTED_PROXIES,
+    ):
+        self.app = app
+        self.limiter = rate_limiter
+        self.rules = rules
+        self.trusted_proxies = trusted_proxies
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST":
+            rule = self.rules.get(scope["path"])
+            if rule is not None:
+                ip = client_ip(scope, self.trusted_proxies)
+                retry_after = self.limiter.hit(f"ip:{scope['path']}:{ip}", rule)
+                if retry_after:
+                    response = JSONResponse(
+                        {"detail": "Too many requests. Please try again later."},
+                        status_code=429,
+                        headers=_too_many(retry_after),
+                    )
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
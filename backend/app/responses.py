@@ -0,0 +1,116 @@
+"""
+Fast JSON bodies for large responses
+
+Routes that return many rows build the body themselves and skip
+FastAPI's per-field jsonable_encoder pass:
+
+    dumps()          orjson if it is installed, else the stdlib json module with the
+                     same output (UUIDs and datetimes as strings, no whitespace)
+    json_response()  the encoded body, compressed with br or gzip when the client
+                     accepts it and the body is at least COMPRESS_MIN_BYTES
+
+brotli is optional: without the module only gzip is offered.
+"""
+import gzip
+import json
+import os
+from datetime import date, datetime
+from typing import Any, Optional
+from uuid import UUID
+
+from fastapi import Request, Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent as is; compressing them saves less than it costs
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "4096"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+
+def _default(value: Any):
+    # The non-JSON types the record rows carry, written the way orjson writes them
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode `content` as compact UTF-8 JSON
+
+    Args:
+        content: Lists, dicts and scalars, including UUIDs and datetimes
+
+    Returns:
+        bytes: The JSON body
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick "br" or "gzip" from an Accept-Encoding header
+
+    Codings with q=0 are refused; "*" allows either. Brotli is preferred
+    when the brotli module is installed.
+
+    Returns:
+        str: The coding to use, or None to send the body uncompressed
+    """
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip()] = quality
+    wildcard = accepted.get("*", 0.0)
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+def json_response(request: Request, body: bytes, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """
+    application/json response for an already encoded body, compressed if worthwhile
+
+    Args:
+        request: The request, for its Accept-Encoding header
+        body: JSON bytes, e.g. from dumps()
+        status_code: HTTP status
+        headers: Extra response headers
+
+    Returns:
+        Response: With Content-Encoding and Vary set when compressed
+    """
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    coding = negotiate_encoding(request.headers.get("accept-encoding")) if len(body) >= COMPRESS_MIN_BYTES else None
+    if coding == "br":
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    elif coding == "gzip":
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if coding:
+        headers["Content-Encoding"] = coding
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
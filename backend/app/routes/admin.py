@@ -0,0 +1,81 @@
+import os
+import secrets
+from fastapi import APIRouter, Header, HTTPException, Query
+from app import profiling
+from app.ml import inferences
+from app.ml.model_store import store
+from app.metrics import MetricsRoute
+
+router = APIRouter(route_class=MetricsRoute)
+
+#Admin token from .env; the admin routes are hidden (404) while it is unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def require_admin(x_admin_token: str | None):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def require_profiling(x_admin_token: str | None):
+    # Profile routes are hidden as well while profiling is off
+    if not profiling.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    require_admin(x_admin_token)
+
+#GET the most recent request profiles (newest first)
+@router.get("/profiles")
+def get_profiles(limit: int = 20, x_admin_token: str | None = Header(default=None)):
+    require_profiling(x_admin_token)
+    return list(reversed(profiling.profiles))[:limit]
+
+#DELETE all stored request profiles
+@router.delete("/profiles")
+def clear_profiles(x_admin_token: str | None = Header(default=None)):
+    require_profiling(x_admin_token)
+    profiling.profiles.clear()
+    return {"detail": "Profiles cleared"}
+
+#GET the serving model version, the stored versions and the last swap
+@router.get("/models")
+def get_model_versions(x_admin_token: str | None = Header(default=None)):
+    require_admin(x_admin_token)
+    return {
+        "serving": inferences.model_version(),
+        "active": store.active_version(),
+        "versions": store.versions(),
+        "swap": inferences.model_swapper.status,
+    }
+
+#POST to load, validate and swap in a stored model version in the background
+@router.post("/models/{version}/activate", status_code=202)
+def activate_model_version(version: str, x_admin_token: str | None = Header(default=None)):
+    require_admin(x_admin_token)
+    if version not in store.versions():
+        raise HTTPException(status_code=404, detail="Model version not found")
+    if not inferences.model_swapper.activate_in_background(version):
+        raise HTTPException(status_code=409, detail="A model swap is already in progress")
+    return {"detail": f"Activating model version {version}"}
+
+#GET shadow-mode agreement and latency of the candidate model version
+@router.get("/shadow")
+def get_shadow(x_admin_token: str | None = Header(default=None)):
+    require_admin(x_admin_token)
+    return inferences.shadow.summary()
+
+#POST to start shadowing a stored model version on a sample of live predictions
+@router.post("/shadow/{version}")
+def start_shadow(version: str, sample_rate: float = Query(default=None, gt=0, le=1),
+                 x_admin_token: str | None = Header(default=None)):
+    require_admin(x_admin_token)
+    if version not in store.versions():
+        raise HTTPException(status_code=404, detail="Model version not found")
+    inferences.shadow.start(version, sample_rate)
+    return {"detail": f"Shadowing model version {version}", "sample_rate": inferences.shadow.sample_rate}
+
+#DELETE to stop shadow mode
+@router.delete("/shadow")
+def stop_shadow(x_admin_token: str | None = Header(default=None)):
+    require_admin(x_admin_token)
+    inferences.shadow.stop()
+    return {"detail": "Shadow mode stopped"}
@@ -1,20 +1,25 @@
 import jwt
 import os
+import re
 import secrets
+import hashlib
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta
-from ..schemas import UserCreate, UserLogin, ResendVerification
-from ..models import users
+from ..schemas import UserCreate, UserLogin, ResendVerification, RefreshRequest
+from ..models import users, refresh_tokens
 from ..database import get_session
 from sqlmodel import Session, select
 from passlib.hash import bcrypt
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy import or_
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
 from ..email_service import send_verification_email
+from ..rate_limit import check_account_limit, client_ip
+from ..metrics import MetricsRoute, stage_timer
 
-router = APIRouter()
+router = APIRouter(route_class=MetricsRoute)
 
 #Get the secret key from .env
 SECRET_KEY = os.getenv("SECRET_KEY")
@@ -22,6 +27,7 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 #set the configuration for the access token
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = 7
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 #function to create access token
@@ -31,54 +37,107 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+#Refresh tokens are random and high-entropy, so a plain SHA-256 is enough to store them
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+#function to create a refresh token and stage its hash in the session (caller commits)
+def create_refresh_token(session: Session, user_id: UUID) -> str:
+    token = secrets.token_urlsafe(32)
+    session.add(refresh_tokens(
+        user_id=user_id,
+        token_hash=hash_refresh_token(token),
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    ))
+    return token
+
 #Function to check the current user
 def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
+    with stage_timer("get_current_user"):
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            user_id: str = payload.get("sub")
+            if user_id is None:
+                raise HTTPException(status_code=401, detail="Invalid token")
+        except jwt.PyJWTError:
             raise HTTPException(status_code=401, detail="Invalid token")
-    except jwt.PyJWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = session.get(users, UUID(user_id))
-    if user is None:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
+        user = session.get(users, UUID(user_id))
+        if user is None:
+            raise HTTPException(status_code=401, detail="User not found")
+        return user
+
+# Unique columns of users (index=True, unique=True in models.users) and the signup error for each
+SIGNUP_CONFLICTS = {
+    "email": "Email already registered",
+    "username": "Username already registered",
+}
+
+# Single-column indexes of users by name, e.g. ix_users_email -> email
+_INDEX_COLUMNS = {index.name: index.columns[0].name for index in users.__table__.indexes if len(index.columns) == 1}
+
+def conflicting_column(error: IntegrityError) -> str | None:
+    """
+    Column of users whose unique index or constraint an INSERT violated
+
+    psycopg2 names the constraint, which is looked up among the models'
+    indexes; a constraint named otherwise (e.g. users_email_key from a
+    hand-made schema) is identified by the "Key (email)=(...)" detail.
+    SQLite names the column ("UNIQUE constraint failed: users.email").
+
+    Returns:
+        str | None: The column name, or None for any other violation
+    """
+    diag = getattr(error.orig, "diag", None)
+    if diag is not None:
+        if getattr(diag, "column_name", None):
+            return diag.column_name
+        if getattr(diag, "constraint_name", None) in _INDEX_COLUMNS:
+            return _INDEX_COLUMNS[diag.constraint_name]
+        match = re.match(r"Key \((\w+)\)=", getattr(diag, "message_detail", None) or "")
+        return match.group(1) if match else None
+    message = str(error.orig)
+    prefix = "UNIQUE constraint failed: users."
+    if message.startswith(prefix) and "," not in message:
+        return message[len(prefix):].strip()
+    return None
 
 #API call to signup an user
 @router.post("/signup")
 def signup(user: UserCreate, session: Session = Depends(get_session)):
-    # Check if email or username already exists
-    existing_user = session.exec(
-        select(users).where((users.email == user.email) | (users.username == user.username))
-    ).first()
-
-    if existing_user:
-        if existing_user.email == user.email:
-            raise HTTPException(status_code=400, detail="Email already registered")
-        if existing_user.username == user.username:
-            raise HTTPException(status_code=400, detail="Username already registered")
-
     # Generate verification token
     verification_token = secrets.token_urlsafe(32)
     token_expiry = datetime.utcnow() + timedelta(hours=24)
 
-    #Hashed the password and create new user
-    hashed_pw = bcrypt.hash(user.password)
+    #Create the new user; the password is hashed once the email and username are claimed
     db_user = users(
         email=user.email,
         username=user.username,
         first_name=user.first_name,
         last_name=user.last_name,
         phone_number=user.phone_number,
-        password_hash=hashed_pw,
+        password_hash="",
         date_of_birth=user.date_of_birth,
         is_verified=False,
         verification_token=verification_token,
         verification_token_expiry=token_expiry
     )
     session.add(db_user)
+
+    # Email and username uniqueness is enforced by the unique indexes, so a single INSERT
+    # both checks and claims them without racing a concurrent signup
+    try:
+        session.flush()
+    except IntegrityError as e:
+        session.rollback()
+        detail = SIGNUP_CONFLICTS.get(conflicting_column(e))
+        if detail is None:
+            raise
+        raise HTTPException(status_code=400, detail=detail)
+
+    # bcrypt costs a few hundred ms, so a duplicate signup is turned away before paying it.
+    # The row is not visible to anyone until the commit below
+    db_user.password_hash = bcrypt.hash(user.password)
     session.commit()
     session.refresh(db_user)
 
@@ -139,6 +198,8 @@ def verify_email(token: str, session: Session = Depends(get_session)):
 #API call to resend verification email
 @router.post("/resend-verification")
 def resend_verification(data: ResendVerification, session: Session = Depends(get_session)):
+    check_account_limit("/auth/resend-verification", data.email)
+
     # Find user by email
     user = session.exec(
         select(users).where(users.email == data.email)
@@ -173,7 +234,9 @@ def resend_verification(data: ResendVerification, session: Session = Depends(get
 
 #API call to login
 @router.post("/login")
-def login(user: UserLogin, session: Session = Depends(get_session)):
+def login(user: UserLogin, request: Request, session: Session = Depends(get_session)):
+    check_account_limit("/auth/login", user.email, client_ip(request.scope))
+
     query = select(users).where(or_(users.email == user.email, users.username == user.email))
     db_user = session.exec(query).first()
     if not db_user or not bcrypt.verify(user.password, db_user.password_hash):
@@ -190,6 +253,8 @@ def login(user: UserLogin, session: Session = Depends(get_session)):
         )
 
     token = create_access_token({"sub": str(db_user.user_id)})
+    refresh_token = create_refresh_token(session, db_user.user_id)
+    session.commit()
     return {
         "id": db_user.user_id,
         "email": db_user.email,
@@ -200,4 +265,51 @@ def login(user: UserLogin, session: Session = Depends(get_session)):
         "date_of_birth": db_user.date_of_birth,
         "created_at": db_user.created_at,
         "access_token": token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer"}
+
+
+#API call to exchange a refresh token for a new access token (the refresh token is rotated)
+@router.post("/refresh")
+def refresh(data: RefreshRequest, session: Session = Depends(get_session)):
+    token_hash = hash_refresh_token(data.refresh_token)
+
+    # Revoke the presented token in one indexed statement; only one concurrent caller can win.
+    # The owner must still exist and be verified, or the token is not accepted
+    owner_active = (
+        select(users.user_id)
+        .where(users.user_id == refresh_tokens.user_id, users.is_verified == True)  # noqa: E712
+        .exists()
+    )
+    user_id = session.execute(
+        update(refresh_tokens)
+        .where(
+            refresh_tokens.token_hash == token_hash,
+            refresh_tokens.revoked == False,  # noqa: E712
+            refresh_tokens.expires_at > datetime.utcnow(),
+            owner_active
+        )
+        .values(revoked=True)
+        .returning(refresh_tokens.user_id)
+    ).scalar_one_or_none()
+
+    if user_id is None:
+        # A rotated token being replayed means it leaked: revoke the whole family
+        reused = session.exec(
+            select(refresh_tokens).where(refresh_tokens.token_hash == token_hash, refresh_tokens.revoked == True)  # noqa: E712
+        ).first()
+        if reused:
+            session.execute(
+                update(refresh_tokens)
+                .where(refresh_tokens.user_id == reused.user_id, refresh_tokens.revoked == False)  # noqa: E712
+                .values(revoked=True)
+            )
+            session.commit()
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    new_refresh_token = create_refresh_token(session, user_id)
+    session.commit()
+    return {
+        "access_token": create_access_token({"sub": str(user_id)}),
+        "refresh_token": new_refresh_token,
         "token_type": "bearer"}
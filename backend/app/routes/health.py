@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Response
+from app import warmup
+
+router = APIRouter()
+
+#Liveness: the process is up and serving requests
+@router.get("/live")
+def live():
+    return {"status": "alive"}
+
+#Readiness: 503 until the startup warm-up (models + DB pool) has succeeded
+@router.get("/ready")
+def ready(response: Response):
+    if not warmup.WARMUP_ENABLED:
+        return {"status": "ready", "warmup": "disabled"}
+    is_ready, report = warmup.startup_warmup.readiness()
+    if not is_ready:
+        response.status_code = 503
+    return report
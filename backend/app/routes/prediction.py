@@ -1,11 +1,31 @@
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, Query
 from app.schemas import PatientData
-from app.ml.inferences import predict_risk
+from app.ml import inferences
+from app.ml.inferences import predict_risk, predict_student, model_stats
+from app.ml.drift import drift_monitor
+from app.metrics import MetricsRoute
+from app.validators import validate_model_names
 
-router = APIRouter()
+router = APIRouter(route_class=MetricsRoute)
 
 #Raw API call just to predict without saving any data into database
+#models=xgboost,svc evaluates only those models (default all six)
+#In student serving mode only the distilled model runs, unless breakdown=true or models= asks for more
 @router.post("/")
-def predict(data: PatientData):
-    result = predict_risk(data.dict())
+def predict(data: PatientData, breakdown: bool = Query(default=False), models: Optional[str] = Query(default=None)):
+    names = validate_model_names(models)
+    if inferences.SERVING_MODE != "student":
+        result = predict_risk(data.dict(), names=names)
+    elif breakdown or names:
+        # One request, one drift observation: predict_student already counted the input
+        result = {**predict_student(data.dict()), **predict_risk(data.dict(), names=names, observe_drift=False)}
+    else:
+        result = predict_student(data.dict())
     return result, data
+
+
+#Per-model latency and input feature drift since the worker started
+@router.get("/stats")
+def prediction_stats():
+    return {"models": model_stats(), "features": drift_monitor.summary()}
@@ -1,39 +1,151 @@
-from fastapi import APIRouter, Depends, HTTPException
+import hashlib
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import bindparam, delete, or_, update
 from sqlmodel import Session, select
-from app.schemas import PatientData, PatientDataWithCreatedAt, PatientDataUpdate
-from app.models import health_records, users
-from app.ml.inferences import predict_risk
+from app.schemas import (
+    HealthRecordResponse, PatientData, PatientDataWithCreatedAt, PatientDataUpdate, PatientDataBatchUpdate
+)
+from app.models import health_records, prediction_jobs, users
+from app.ml.inferences import (
+    RISK_LABELS, load_models, model_files, model_version, predict_risk, predict_risk_batch, prediction_fields,
+    stored_risks
+)
 from app.database import get_session
 from .auth import get_current_user
-from typing import List
+from app.metrics import MetricsRoute
+from app.validators import validate_bulk_records, validate_model_names, validate_record_ids, validate_series_metric
+from app.jobs import job_pool, job_progress
+from app.responses import dumps, json_response
+from app.etags import CACHE_CONTROL, bump_records_version, etag_matches, not_modified, records_etag
+from app.features import FEATURE_NAMES
+from app.series import MAX_SERIES_BUCKETS, downsample
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from datetime import datetime
 
-router = APIRouter()
+router = APIRouter(route_class=MetricsRoute)
+
+# Fingerprints looked up per query when deduplicating a bulk upload
+FINGERPRINT_LOOKUP_SIZE = 500
+
+# Columns returned as stored; the risk_ columns are returned as outcome_/prediction_prob_ instead
+RECORD_FIELDS = tuple(column.name for column in health_records.__table__.columns if not column.name.startswith("risk_"))
+# Selected as plain tuples for collection responses (records_json): RECORD_FIELDS except user_id, which
+# is the same on every row and costs a UUID conversion each, then the risk_ columns
+_ROW_FIELDS = tuple(field for field in RECORD_FIELDS if field != "user_id")
+RECORD_COLUMNS = tuple(health_records.__table__.columns[field] for field in _ROW_FIELDS) + tuple(
+    health_records.__table__.columns[f"risk_{name}"] for name in model_files)
+_PREDICTION_KEYS = tuple(
+    (len(_ROW_FIELDS) + i, f"outcome_{name}", f"prediction_prob_{name}") for i, name in enumerate(model_files))
+
+def record_response(record: health_records) -> dict:
+    # One stored row as the API returns it (HealthRecordResponse); records_json does the same for many
+    data = {field: getattr(record, field) for field in RECORD_FIELDS}
+    data.update(prediction_fields(record))
+    return data
+
+def records_json(rows, user_id) -> bytes:
+    """
+    JSON array of HealthRecordResponse objects from RECORD_COLUMNS tuples
+
+    No ORM objects or Pydantic models are built: each row becomes one
+    dict and the whole list is encoded once with app.responses.dumps.
+
+    Args:
+        rows: RECORD_COLUMNS tuples of one user's records
+        user_id: Their owner
+    """
+    items = []
+    for row in rows:
+        item = {"user_id": user_id}
+        item.update(zip(_ROW_FIELDS, row))
+        for i, outcome, prob in _PREDICTION_KEYS:
+            stored = row[i]
+            item[outcome] = None if stored is None else RISK_LABELS[stored]
+            item[prob] = None if stored is None else stored / 100
+        items.append(item)
+    return dumps(items)
+
+def fill_missing_predictions(session: Session, records: List[health_records], names: List[str]) -> int:
+    """
+    Evaluate requested models that were skipped (models=) when the records were stored
+
+    Records missing the same models are scored together, one model call per
+    group, and the results are saved with the owners' records_version
+    bumped. A record scored by another model version has every model it
+    already has re-scored as well, so all of its predictions come from the
+    version stamped in model_version.
+
+    Returns:
+        int: Number of records updated
+    """
+    missing = {}
+    for record in records:
+        names_missing = [name for name in names if getattr(record, f"risk_{name}") is None]
+        if names_missing:
+            missing[id(record)] = names_missing
+    if not missing:
+        return 0
+    model_set = load_models()
+    version = model_version(model_set)
+    groups = {}
+    for record in records:
+        if id(record) not in missing:
+            continue
+        wanted = set(missing[id(record)])
+        if record.model_version != version:
+            wanted.update(name for name in model_files if getattr(record, f"risk_{name}") is not None)
+        groups.setdefault(tuple(name for name in model_files if name in wanted), []).append(record)
+    for wanted, group in groups.items():
+        rows = [{field: getattr(record, field) for field in FEATURE_NAMES} for record in group]
+        for record, prediction in zip(group, predict_risk_batch(rows, model_set, list(wanted), observe_drift=False)):
+            for key, value in stored_risks(prediction).items():
+                setattr(record, key, value)
+            record.model_version = version
+            session.add(record)
+    for user_id in {record.user_id for group in groups.values() for record in group}:
+        bump_records_version(session, user_id)
+    # Keep the loaded values after commit, so the records can be returned without reloading each one
+    session.expire_on_commit = False
+    try:
+        session.commit()
+    finally:
+        session.expire_on_commit = True
+    return len(missing)
 
 #POST a health record
-@router.post("/")
+#All write endpoints take models=xgboost,svc to evaluate only those models; the others stay null until
+#POST /records/predictions/fill evaluates them
+@router.post("/", response_model=HealthRecordResponse)
 def add_record(
     record: PatientData, 
+    models: Optional[str] = Query(default=None),
     session: Session = Depends(get_session),
     current_user: users = Depends(get_current_user)
 ):
-    # Call the prediction logic first
-    result = predict_risk(record.dict())
+    # Call the prediction logic first, pinned to one model set so the stored version is exact
+    names = validate_model_names(models)
+    model_set = load_models()
+    result = predict_risk(record.dict(), model_set, names)
 
     # Add prediction to the record
     record_data = record.dict()
-    record_data.update(result)  # adds 'outcome' and 'prediction_prob' fields
+    record_data.update(stored_risks(result))  # adds the 'risk_' fields
+    record_data["model_version"] = model_version(model_set)
 
     #Save into DB
     db_record = health_records(**record_data, user_id=current_user.user_id)
     session.add(db_record)
+    bump_records_version(session, current_user.user_id)
     session.commit()
     session.refresh(db_record)
-    return db_record
+    return record_response(db_record)
 
 #POST a health record with a custom datetime
-@router.post("/custom")
+@router.post("/custom", response_model=HealthRecordResponse)
 def add_record_with_created_at(
     record: PatientDataWithCreatedAt,
+    models: Optional[str] = Query(default=None),
     session: Session = Depends(get_session),
     current_user: users = Depends(get_current_user)
 ):
@@ -43,58 +155,202 @@ def add_record_with_created_at(
     prediction_input = {k: v for k, v in record_dict.items() if k != "created_at"}
 
     # Call prediction logic
-    prediction_result = predict_risk(prediction_input)
+    model_set = load_models()
+    prediction_result = predict_risk(prediction_input, model_set, validate_model_names(models))
 
     # Combine original data (including created_at) and prediction result
-    record_data = {**record_dict, **prediction_result}
+    record_data = {**record_dict, **stored_risks(prediction_result), "model_version": model_version(model_set)}
 
     # Save into DB
     db_record = health_records(**record_data, user_id=current_user.user_id)
     session.add(db_record)
+    bump_records_version(session, current_user.user_id)
     session.commit()
     session.refresh(db_record)
-    return db_record
+    return record_response(db_record)
+
+def record_fingerprint(user_id, record: dict) -> str:
+    # Identity of an uploaded row: same user, features and created_at give the same fingerprint
+    parts = [str(user_id), *(str(record[field]) for field in FEATURE_NAMES), record["created_at"].isoformat()]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+def new_bulk_rows(session: Session, user_id, record_dicts: List[dict]) -> List[dict]:
+    """
+    Rows of an upload that are not stored yet, ready to insert
+
+    Rows repeated within the upload are kept once. Fingerprints are looked
+    up FINGERPRINT_LOOKUP_SIZE at a time to keep the IN lists bounded.
+    """
+    by_fingerprint = {}
+    for record_dict in record_dicts:
+        by_fingerprint.setdefault(record_fingerprint(user_id, record_dict), record_dict)
+    fingerprints = list(by_fingerprint)
+    existing = set()
+    for start in range(0, len(fingerprints), FINGERPRINT_LOOKUP_SIZE):
+        existing.update(session.exec(
+            select(health_records.fingerprint)
+            .where(health_records.fingerprint.in_(fingerprints[start:start + FINGERPRINT_LOOKUP_SIZE]))
+        ).all())
+    return [
+        {**record_dict, "user_id": user_id, "fingerprint": fingerprint}
+        for fingerprint, record_dict in by_fingerprint.items() if fingerprint not in existing
+    ]
+
+def insert_new_rows(session: Session, rows: List[dict]) -> List[int]:
+    # INSERT ... ON CONFLICT (fingerprint) DO NOTHING, so a concurrent upload of the same
+    # rows cannot slip duplicates in; returns the ids actually inserted
+    if not rows:
+        return []
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    table = health_records.__table__
+    return session.execute(
+        insert(table).on_conflict_do_nothing(index_elements=["fingerprint"]).returning(table.c.record_id),
+        rows
+    ).scalars().all()
 
 #POST multiple health record with a custom datetime
+#Rows already stored (same fingerprint) are skipped without being predicted again
+#background=true stores the rows as pending and predicts them in a background job (202 with the job id)
+#Rows are checked column by column (validate_bulk_records) and every failing row and field is reported
 @router.post("/bulk")
 def add_multiple_records(
-    records: List[PatientDataWithCreatedAt],
+    response: Response,
+    records: List[Dict[str, Any]] = Body(...),
+    models: Optional[str] = Query(default=None),
+    background: bool = Query(default=False),
     session: Session = Depends(get_session),
     current_user: users = Depends(get_current_user)
 ):
-    #make a list for storing the records
-    db_records = []
+    names = validate_model_names(models)
+    rows = new_bulk_rows(session, current_user.user_id, validate_bulk_records(records))
 
-    #do for loop to do prediction for each record
-    for record in records:
-        record_dict = record.dict()
-        # Separate data for prediction: exclude created_at
-        prediction_input = {k: v for k, v in record_dict.items() if k != "created_at"}
-        prediction = predict_risk(prediction_input)
-        record_data = {**record_dict, **prediction, "user_id": current_user.user_id}
-        db_record = health_records(**record_data)
-        db_records.append(db_record)
+    if background and rows:
+        job = prediction_jobs(
+            user_id=current_user.user_id,
+            models=",".join(names) if names is not None else None,
+        )
+        session.add(job)
+        for row in rows:
+            row.update(job_id=job.job_id, prediction_status="pending")
+        inserted = insert_new_rows(session, rows)
+        job.total = len(inserted)
+        job_id = job.job_id
+        bump_records_version(session, current_user.user_id)
+        session.commit()
+        job_pool.submit(job_id)
+        response.status_code = 202
+        return {
+            "message": f"{len(inserted)} records added, predictions pending",
+            "inserted": len(inserted),
+            "skipped": len(records) - len(inserted),
+            "job_id": str(job_id),
+            "status_url": f"/records/jobs/{job_id}",
+        }
+
+    #predict the new records in one pass per model, pinned to one model set
+    if rows:
+        model_set = load_models()
+        version = model_version(model_set)
+        predictions = predict_risk_batch(
+            [{field: row[field] for field in FEATURE_NAMES} for row in rows], model_set, names)
+        for row, prediction in zip(rows, predictions):
+            row.update(stored_risks(prediction), model_version=version, prediction_status="complete")
 
     #Save into DB
-    session.add_all(db_records)
+    inserted = insert_new_rows(session, rows)
+    if inserted:
+        bump_records_version(session, current_user.user_id)
     session.commit()
-    return {"message": f"{len(db_records)} records added successfully"}
+    skipped = len(records) - len(inserted)
+    message = f"{len(inserted)} records added successfully"
+    if skipped:
+        message += f", {skipped} duplicates skipped"
+    return {"message": message, "inserted": len(inserted), "skipped": skipped}
+
+#GET the progress of a background bulk import of the current user
+@router.get("/jobs/{job_id}")
+def get_job(
+    job_id: UUID,
+    session: Session = Depends(get_session),
+    current_user: users = Depends(get_current_user)
+):
+    job = session.get(prediction_jobs, job_id)
+    if not job or job.user_id != current_user.user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_progress(job)
 
 #GET all the Health Records for the current user
-@router.get("/my-records")
+#Large bodies are encoded from row tuples and compressed (br/gzip) when the client accepts it
+#The ETag follows the user's records_version; If-None-Match with it gets a 304 before any row is read
+@router.get("/my-records", response_model=List[HealthRecordResponse])
 def get_my_records(
+    request: Request,
     session: Session = Depends(get_session),
     current_user: users = Depends(get_current_user)
 ):
-    records = session.exec(
-        select(health_records)
+    etag = records_etag(current_user)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    # Rows as Core tuples straight into the JSON body (see records_json)
+    rows = session.connection().execute(
+        select(*RECORD_COLUMNS)
         .where(health_records.user_id == current_user.user_id)
         .order_by(health_records.created_at.asc())
     ).all()
-    return records
+    return json_response(
+        request, records_json(rows, current_user.user_id), headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+#POST to evaluate models that were skipped (models=) when records were stored, for all or the listed records
+#Rows still waiting for a background job are left to it; GETs never write predictions
+@router.post("/predictions/fill")
+def fill_predictions(
+    record_ids: Optional[List[int]] = Body(default=None),
+    models: Optional[str] = Query(default=None),
+    session: Session = Depends(get_session),
+    current_user: users = Depends(get_current_user)
+):
+    names = validate_model_names(models) or list(model_files)
+    query = select(health_records).where(
+        health_records.user_id == current_user.user_id,
+        health_records.prediction_status != "pending",
+        or_(*(getattr(health_records, f"risk_{name}").is_(None) for name in names)),
+    )
+    if record_ids is not None:
+        record_ids = validate_record_ids(record_ids)
+        require_records(record_ids, set(session.exec(
+            select(health_records.record_id)
+            .where(health_records.user_id == current_user.user_id, health_records.record_id.in_(record_ids))
+        ).all()))
+        query = query.where(health_records.record_id.in_(record_ids))
+    filled = fill_missing_predictions(session, session.exec(query).all(), names)
+    return {"detail": f"{filled} records filled", "filled": filled}
+
+#GET a chart series of one metric: min/max/mean per time bucket, computed in the database
+#The payload is bounded by buckets= (e.g. the chart width in pixels), not by the number of records
+@router.get("/series")
+def get_series(
+    request: Request,
+    metric: str = Query(...),
+    buckets: int = Query(default=200, ge=1, le=MAX_SERIES_BUCKETS),
+    start: Optional[datetime] = Query(default=None),
+    end: Optional[datetime] = Query(default=None),
+    session: Session = Depends(get_session),
+    current_user: users = Depends(get_current_user)
+):
+    metric = validate_series_metric(metric)
+    etag = records_etag(current_user, "series", metric, buckets, start, end)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    series = downsample(session, current_user.user_id, metric, buckets, start, end)
+    return json_response(request, dumps(series), headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
 
 #GET one record of the current user
-@router.get("/{recordId}")
+@router.get("/{recordId}", response_model=HealthRecordResponse)
 def get_record(
     recordId: int, 
     session: Session = Depends(get_session),
@@ -103,13 +359,115 @@ def get_record(
     record = session.get(health_records, recordId)
     if not record or record.user_id != current_user.user_id:
         raise HTTPException(status_code=404, detail="Record not found")
-    return record
+    return record_response(record)
+
+def require_records(record_ids: List[int], found) -> None:
+    # All-or-nothing: a batch naming any record the user does not own changes nothing
+    missing = [record_id for record_id in record_ids if record_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Records not found: {', '.join(map(str, missing))}")
+
+def update_rows(session: Session, user_id, rows: List[dict]) -> None:
+    # One executemany UPDATE for rows that all set the same columns; "b_record_id" picks the row
+    if not rows:
+        return
+    table = health_records.__table__
+    session.execute(
+        update(table).where(table.c.record_id == bindparam("b_record_id"), table.c.user_id == user_id),
+        rows
+    )
+
+#PATCH (edit) many records of the current user in one transaction
+#Rows whose model inputs changed are re-predicted together in one pass; models= applies to those rows
+@router.patch("/batch", response_model=List[HealthRecordResponse])
+def update_records_batch(
+    request: Request,
+    record_updates: List[PatientDataBatchUpdate],
+    models: Optional[str] = Query(default=None),
+    session: Session = Depends(get_session),
+    current_user: users = Depends(get_current_user)
+):
+    names = validate_model_names(models)
+    record_ids = validate_record_ids([record_update.record_id for record_update in record_updates])
+
+    stored = {
+        row.record_id: row
+        for row in session.exec(
+            select(health_records.record_id, health_records.created_at, health_records.prediction_status,
+                   health_records.fingerprint, *(getattr(health_records, field) for field in FEATURE_NAMES))
+            .where(health_records.user_id == current_user.user_id, health_records.record_id.in_(record_ids))
+        ).all()
+    }
+    require_records(record_ids, stored)
+
+    # Merge each update with the stored values, so every row sets the same columns
+    repredict, unchanged = [], []
+    for record_update in record_updates:
+        row = stored[record_update.record_id]
+        current = {field: getattr(row, field) for field in ("created_at",) + FEATURE_NAMES}
+        values = {**current, **record_update.dict(exclude_unset=True, exclude_none=True, exclude={"record_id"})}
+        inputs_changed = any(values[field] != current[field] for field in FEATURE_NAMES)
+        # Pending rows are left to their background job
+        if inputs_changed and row.prediction_status != "pending":
+            repredict.append(values)
+        else:
+            unchanged.append(values)
+        # An edited row is no longer the uploaded one
+        values["fingerprint"] = None if values != current else row.fingerprint
+        values["b_record_id"] = record_update.record_id
+
+    if repredict:
+        model_set = load_models()
+        version = model_version(model_set)
+        predictions = predict_risk_batch(
+            [{field: values[field] for field in FEATURE_NAMES} for values in repredict], model_set, names)
+        # Predictions of models left out are stale now; clear them so they get filled in later
+        cleared = {f"risk_{name}": None for name in model_files if names is not None and name not in names}
+        for values, prediction in zip(repredict, predictions):
+            values.update(cleared)
+            values.update(stored_risks(prediction))
+            values["model_version"] = version
+            values["prediction_status"] = "complete"
+
+    update_rows(session, current_user.user_id, repredict)
+    update_rows(session, current_user.user_id, unchanged)
+    bump_records_version(session, current_user.user_id)
+    session.commit()
+
+    rows = session.connection().execute(
+        select(*RECORD_COLUMNS)
+        .where(health_records.user_id == current_user.user_id, health_records.record_id.in_(record_ids))
+        .order_by(health_records.created_at.asc())
+    ).all()
+    return json_response(request, records_json(rows, current_user.user_id))
+
+#DELETE many records of the current user in one statement
+@router.delete("/batch")
+def delete_records_batch(
+    record_ids: List[int] = Body(...),
+    session: Session = Depends(get_session),
+    current_user: users = Depends(get_current_user)
+):
+    record_ids = validate_record_ids(record_ids)
+    require_records(record_ids, set(session.exec(
+        select(health_records.record_id)
+        .where(health_records.user_id == current_user.user_id, health_records.record_id.in_(record_ids))
+    ).all()))
+
+    session.execute(
+        delete(health_records)
+        .where(health_records.user_id == current_user.user_id, health_records.record_id.in_(record_ids))
+    )
+    bump_records_version(session, current_user.user_id)
+    session.commit()
+    return {"detail": f"{len(record_ids)} records deleted successfully"}
 
 #PUT (edit) one record of the current user
-@router.put("/{record_id}")
+@router.put("/{record_id}", response_model=HealthRecordResponse)
 def update_record(
     record_id: int,
     record_update: PatientDataUpdate,
+    models: Optional[str] = Query(default=None),
     session: Session = Depends(get_session),
     current_user: users = Depends(get_current_user)
 ):
@@ -121,27 +479,45 @@ def update_record(
     if not db_record:
         raise HTTPException(status_code=404, detail="Record not found")
 
-    # Convert incoming update to dict, excluding unset fields
-    update_data = record_update.dict(exclude_unset=True)
+    names = validate_model_names(models)
+
+    # Convert incoming update to dict, excluding unset fields (and nulls: none of the columns may be emptied)
+    update_data = record_update.dict(exclude_unset=True, exclude_none=True)
+    edited = {key for key, value in update_data.items() if getattr(db_record, key) != value}
+    inputs_changed = any(key in FEATURE_NAMES for key in edited)
 
-    # Update db_record fields with incoming data
+    # Merge the update into the stored record; an edited row is no longer the uploaded one
     for key, value in update_data.items():
         setattr(db_record, key, value)
+    if edited:
+        db_record.fingerprint = None
+        bump_records_version(session, current_user.user_id)
 
-    # Prepare prediction input by excluding created_at
-    prediction_input = {k: v for k, v in update_data.items() if k != "created_at"}
+    if not inputs_changed:
+        # Same features, same predictions (e.g. a created_at-only edit); only fill in models asked for
+        if models is not None:
+            fill_missing_predictions(session, [db_record], names or list(model_files))
+    elif db_record.prediction_status != "pending":
+        # Re-predict from the merged features; pending rows are left to their background job
+        model_set = load_models()
+        prediction_input = {field: getattr(db_record, field) for field in FEATURE_NAMES}
+        prediction_result = predict_risk_batch([prediction_input], model_set, names)[0]
 
-    # Call prediction with only the updated data
-    prediction_result = predict_risk(prediction_input)
+        # Predictions of models left out are stale now; clear them so they get filled in later
+        for name in model_files:
+            if names is not None and name not in names:
+                setattr(db_record, f"risk_{name}", None)
 
-    # Update prediction fields on the record
-    for key, value in prediction_result.items():
-        setattr(db_record, key, value)
+        # Update prediction fields on the record
+        for key, value in stored_risks(prediction_result).items():
+            setattr(db_record, key, value)
+        db_record.model_version = model_version(model_set)
+        db_record.prediction_status = "complete"
 
     session.add(db_record)
     session.commit()
     session.refresh(db_record)
-    return db_record
+    return record_response(db_record)
 
 #DELETE one record of the current user
 @router.delete("/{record_id}")
@@ -162,5 +538,6 @@ def delete_record(
 
     # Delete the record
     session.delete(db_record)
+    bump_records_version(session, current_user.user_id)
     session.commit()
     return {"detail": "Record deleted successfully"}
\ No newline at end of file
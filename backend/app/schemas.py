@@ -1,6 +1,9 @@
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import BaseModel, EmailStr, Field, create_model, validator
 import datetime
 from typing import Optional
+from uuid import UUID
+from app.features import FEATURES, patient_model
+from app.ml.inferences import model_files
 
 #Schemas for user inputs
 
@@ -42,51 +45,43 @@ class UserLogin(BaseModel):
 class ResendVerification(BaseModel):
     email: EmailStr
 
-class PatientData(BaseModel):
-    pregnancies: int = Field(..., ge=0, le=20)
-    glucose: int = Field(..., ge=0, le=300)
-    blood_pressure: int = Field(..., ge=0, le=200)
-    insulin: int = Field(..., ge=0, le=1000)
-    bmi: float = Field(..., ge=10.0, le=70.0)
-    diabetic_family: int = Field(..., ge=0, le=1)
-    age: int = Field(..., ge=1, le=120)
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
-    @validator('age')
-    def validate_age_not_zero(cls, v):
-        if v == 0:
-            raise ValueError("Age cannot be 0 (division by zero risk)")
-        return v
+# The patient feature fields and their bounds are generated from app/features.py
+PatientData = patient_model("PatientData")
 
 # PatientData with modified datetime
-class PatientDataWithCreatedAt(BaseModel):
-    pregnancies: int = Field(..., ge=0, le=20)
-    glucose: int = Field(..., ge=0, le=300)
-    blood_pressure: int = Field(..., ge=0, le=200)
-    insulin: int = Field(..., ge=0, le=1000)
-    bmi: float = Field(..., ge=10.0, le=70.0)
-    diabetic_family: int = Field(..., ge=0, le=1)
-    age: int = Field(..., ge=1, le=120)
-    created_at: datetime.datetime  # make created_at mandatory here
-
-    @validator('age')
-    def validate_age_not_zero(cls, v):
-        if v == 0:
-            raise ValueError("Age cannot be 0 (division by zero risk)")
-        return v
+PatientDataWithCreatedAt = patient_model(
+    "PatientDataWithCreatedAt",
+    created_at=(datetime.datetime, ...),  # make created_at mandatory here
+)
 
 #PatientData for PUT method
-class PatientDataUpdate(BaseModel):
-    pregnancies: Optional[int] = Field(None, ge=0, le=20)
-    glucose: Optional[int] = Field(None, ge=0, le=300)
-    blood_pressure: Optional[int] = Field(None, ge=0, le=200)
-    insulin: Optional[int] = Field(None, ge=0, le=1000)
-    bmi: Optional[float] = Field(None, ge=10.0, le=70.0)
-    diabetic_family: Optional[int] = Field(None, ge=0, le=1)
-    age: Optional[int] = Field(None, ge=1, le=120)
-    created_at: Optional[datetime.datetime] = None  # Allow updating created_at if needed
+PatientDataUpdate = patient_model(
+    "PatientDataUpdate",
+    optional=True,
+    created_at=(Optional[datetime.datetime], None),  # Allow updating created_at if needed
+)
+
+# One entry of PATCH /records/batch
+class PatientDataBatchUpdate(PatientDataUpdate):
+    record_id: int
 
-    @validator('age')
-    def validate_age_not_zero(cls, v):
-        if v is not None and v == 0:
-            raise ValueError("Age cannot be 0 (division by zero risk)")
-        return v
\ No newline at end of file
+# A stored health record as the API returns it. health_records keeps one risk_<model> column per model;
+# the outcome_/prediction_prob_ pair is derived from it (app.routes.records.record_response)
+HealthRecordResponse = create_model(
+    "HealthRecordResponse",
+    record_id=(int, ...),
+    user_id=(UUID, ...),
+    **{feature.name: (feature.type, ...) for feature in FEATURES},
+    model_version=(Optional[str], None),
+    prediction_status=(str, ...),
+    job_id=(Optional[UUID], None),
+    fingerprint=(Optional[str], None),
+    created_at=(Optional[datetime.datetime], None),
+    **{
+        f"{column}_{name}": (Optional[column_type], None)
+        for name in model_files for column, column_type in (("outcome", str), ("prediction_prob", float))
+    },
+)
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+Downsampled time series of one record metric, for charts
+
+A chart has a fixed number of horizontal pixels. So GET /records/series
+splits the time range of the user's records into `buckets` equal
+intervals. For each interval that has records, it returns the first and
+last timestamp, the count, and the min, max and mean of the metric.
+That is enough to draw the trend line and a min/max band. The
+aggregation runs in the database, in one GROUP BY query, and no row is
+sent to Python.
+
+Metrics are the patient features and risk_<model>. Risk is returned as
+a percentage, like prediction_prob_<model>.
+"""
+import os
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Integer, case, cast, extract, func
+from sqlmodel import Session, select
+
+from .features import FEATURE_NAMES
+from .ml.inferences import model_files
+from .models import health_records
+
+SERIES_METRICS = FEATURE_NAMES + tuple(f"risk_{name}" for name in model_files)
+MAX_SERIES_BUCKETS = int(os.getenv("MAX_SERIES_BUCKETS", "2000"))
+
+
+def _bucket_index(session: Session, epoch, origin: float, width: float, buckets: int):
+    # Bucket of each row; the newest row falls on the upper edge and joins the last bucket
+    offset = (epoch - origin) / width
+    if session.get_bind().dialect.name == "postgresql":
+        index = cast(func.floor(offset), Integer)  # Postgres CAST rounds, floor first
+    else:
+        index = cast(offset, Integer)              # SQLite CAST truncates, offsets are >= 0
+    return case((index >= buckets - 1, buckets - 1), else_=index)
+
+
+def downsample(
+    session: Session,
+    user_id,
+    metric: str,
+    buckets: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> dict:
+    """
+    Min/max/mean of `metric` per time bucket for one user's records
+
+    Args:
+        session: Database session
+        user_id: Owner of the records
+        metric: One of SERIES_METRICS
+        buckets: Number of equal time intervals between the first and last record
+        start: Only records created at or after this time
+        end: Only records created at or before this time
+
+    Returns:
+        dict: metric, buckets, count (records covered) and points, one per non-empty
+        bucket in time order, each with start, end, count, min, max and mean
+    """
+    value = getattr(health_records, metric)
+    epoch = extract("epoch", health_records.created_at)
+    conditions = [health_records.user_id == user_id, value.is_not(None), health_records.created_at.is_not(None)]
+    if start is not None:
+        conditions.append(health_records.created_at >= start)
+    if end is not None:
+        conditions.append(health_records.created_at <= end)
+
+    first, last, count = session.exec(select(func.min(epoch), func.max(epoch), func.count()).where(*conditions)).one()
+    points = []
+    if count:
+        first, last = float(first), float(last)
+        bucket = _bucket_index(session, epoch, first, (last - first) / buckets or 1.0, buckets).label("bucket")
+        rows = session.exec(
+            select(
+                bucket,
+                func.min(health_records.created_at),
+                func.max(health_records.created_at),
+                func.count(),
+                func.min(value),
+                func.max(value),
+                func.avg(value),
+            )
+            .where(*conditions)
+            .group_by(bucket)
+            .order_by(bucket)
+        ).all()
+        # risk_<model> is stored in hundredths of a percent
+        scale = 100 if metric.startswith("risk_") else None
+        points = [
+            {
+                "start": bucket_start,
+                "end": bucket_end,
+                "count": bucket_count,
+                "min": low / scale if scale else low,
+                "max": high / scale if scale else high,
+                "mean": round(float(mean) / (scale or 1), 2),
+            }
+            for _, bucket_start, bucket_end, bucket_count, low, high, mean in rows
+        ]
+    return {"metric": metric, "buckets": buckets, "count": count, "points": points}
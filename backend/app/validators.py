@@ -1,8 +1,27 @@
 """
 Input validation utilities for health records API
 """
+import os
+from collections import Counter
 from fastapi import HTTPException
-from typing import Dict, Any
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from pydantic import TypeAdapter, ValidationError
+from app.features import field_rules
+from app.ml.inferences import model_files
+from app.series import SERIES_METRICS
+
+# Most records one batch edit or delete may touch
+MAX_BATCH_RECORDS = int(os.getenv("MAX_BATCH_RECORDS", "1000"))
+
+
+# Range rules for the patient features, generated from app/features.py like the
+# Pydantic schemas, so validate_patient_data and the columnar bulk validator
+# check exactly the bounds the schemas enforce
+PATIENT_FIELD_RULES = field_rules()
+
+# The datetime parsing of the schemas' created_at (ISO 8601 with Z or offsets, Unix timestamps), a column at a time
+_TIMESTAMPS = TypeAdapter(List[datetime])
 
 
 def validate_patient_data(data: Dict[str, Any]) -> None:
@@ -15,45 +34,7 @@ def validate_patient_data(data: Dict[str, Any]) -> None:
     Raises:
         HTTPException: If validation fails
     """
-    validations = {
-        "pregnancies": {
-            "min": 0,
-            "max": 20,
-            "message": "Pregnancies must be between 0 and 20"
-        },
-        "glucose": {
-            "min": 0,
-            "max": 300,
-            "message": "Glucose must be between 0 and 300 mg/dL"
-        },
-        "blood_pressure": {
-            "min": 0,
-            "max": 200,
-            "message": "Blood pressure must be between 0 and 200 mmHg"
-        },
-        "insulin": {
-            "min": 0,
-            "max": 1000,
-            "message": "Insulin must be between 0 and 1000 μU/mL"
-        },
-        "bmi": {
-            "min": 10.0,
-            "max": 70.0,
-            "message": "BMI must be between 10.0 and 70.0"
-        },
-        "diabetic_family": {
-            "min": 0,
-            "max": 1,
-            "message": "Diabetic family history must be 0 (no) or 1 (yes)"
-        },
-        "age": {
-            "min": 1,
-            "max": 120,
-            "message": "Age must be between 1 and 120 years"
-        }
-    }
-
-    for field, rules in validations.items():
+    for field, rules in PATIENT_FIELD_RULES.items():
         if field in data and data[field] is not None:
             value = data[field]
 
@@ -72,6 +53,98 @@ def validate_patient_data(data: Dict[str, Any]) -> None:
                 )
 
 
+def _number_or_nan(value: Any) -> float:
+    # Column fallback when np.array cannot convert the whole column at once
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def find_patient_data_errors(rows: List[Dict[str, Any]], required: bool = True) -> Tuple[Dict[str, list], List[dict]]:
+    """
+    Check every rule of PATIENT_FIELD_RULES on whole columns at once
+
+    Each field is turned into one NumPy array and tested with a handful of
+    vectorised comparisons, instead of one Python check per row and field.
+
+    Args:
+        rows: Patient rows, e.g. a parsed bulk upload
+        required: Whether a missing or null field is an error
+
+    Returns:
+        tuple: Column name to converted values (int or float per the rules,
+        None where missing), and one {"row", "field", "value", "message"}
+        per failing value, ordered by row then field
+    """
+    import numpy as np
+
+    columns = {}
+    errors = []
+    for field, rules in PATIENT_FIELD_RULES.items():
+        values = [row.get(field) for row in rows]
+        try:
+            column = np.array(values, dtype=float)  # None becomes NaN
+        except (TypeError, ValueError):
+            column = np.array([_number_or_nan(value) for value in values], dtype=float)
+
+        is_none = np.array([value is None for value in values], dtype=bool)
+        invalid = np.isnan(column) | (column < rules["min"]) | (column > rules["max"])
+        if rules["integer"]:
+            invalid |= column != np.floor(column)
+        if not required:
+            invalid &= ~is_none
+        for i in np.flatnonzero(invalid):
+            message = "Field required" if values[i] is None else rules["message"]
+            errors.append({"row": int(i), "field": field, "value": values[i], "message": message})
+
+        # Convert the valid values in one go; missing and invalid ones are kept as sent
+        valid = ~(invalid | is_none)
+        converted = np.where(valid, column, 0)
+        converted = (converted.astype(np.int64) if rules["integer"] else converted).tolist()
+        if not valid.all():
+            converted = [c if ok else value for c, ok, value in zip(converted, valid.tolist(), values)]
+        columns[field] = converted
+    errors.sort(key=lambda error: error["row"])
+    return columns, errors
+
+
+def validate_bulk_records(rows: List[Dict[str, Any]], timestamp_field: str = "created_at") -> List[Dict[str, Any]]:
+    """
+    Validate a bulk upload in one columnar pass and report every problem at once
+
+    Args:
+        rows: Parsed JSON rows with the patient fields and a timestamp, parsed
+            like the schemas' datetime fields
+        timestamp_field: Required timestamp of each row
+
+    Returns:
+        List[Dict[str, Any]]: Rows with ints, floats and a datetime, in the
+        same shape the Pydantic schemas produce
+
+    Raises:
+        HTTPException: 422 listing every failing row and field
+    """
+    columns, errors = find_patient_data_errors(rows)
+    values = [row.get(timestamp_field) for row in rows]
+    try:
+        timestamps = _TIMESTAMPS.validate_python(values)
+    except ValidationError as e:
+        for error in e.errors():
+            i = error["loc"][0]
+            errors.append({
+                "row": i, "field": timestamp_field, "value": values[i],
+                "message": "Field required" if values[i] is None else error["msg"],
+            })
+    if errors:
+        errors.sort(key=lambda error: error["row"])
+        raise HTTPException(status_code=422, detail=errors)
+    return [
+        {**{field: column[i] for field, column in columns.items()}, timestamp_field: timestamps[i]}
+        for i in range(len(rows))
+    ]
+
+
 def validate_age_not_zero(age: int) -> None:
     """
     Validate that age is not zero to prevent division errors
@@ -228,3 +301,81 @@ def validate_username(username: str) -> None:
             status_code=422,
             detail="Validation error: Username can only contain letters, numbers, and underscores"
         )
+
+
+def validate_series_metric(metric: str) -> str:
+    """
+    Check the `metric=` of GET /records/series
+
+    Args:
+        metric: A patient feature such as "glucose", or "risk_<model>"
+
+    Returns:
+        str: The metric, lowercased
+
+    Raises:
+        HTTPException: If it is not one of SERIES_METRICS
+    """
+    metric = metric.strip().lower()
+    if metric not in SERIES_METRICS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Validation error: Unknown metric: {metric}. Choose from: {', '.join(SERIES_METRICS)}"
+        )
+    return metric
+
+
+def validate_model_names(models: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated `models=` subset such as "xgboost,svc"
+
+    Args:
+        models: Raw query value; None, empty or "all" selects every model
+
+    Returns:
+        Optional[List[str]]: Requested model names in canonical order, or None for all
+
+    Raises:
+        HTTPException: If a name is not one of the served models
+    """
+    if models is None or models.strip().lower() in ("", "all"):
+        return None
+    requested = {name.strip().lower() for name in models.split(",") if name.strip()}
+    unknown = sorted(requested - set(model_files))
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Validation error: Unknown model(s): {', '.join(unknown)}. "
+                   f"Choose from: {', '.join(model_files)}"
+        )
+    return [name for name in model_files if name in requested]
+
+
+def validate_record_ids(record_ids: List[int], max_records: int = MAX_BATCH_RECORDS) -> List[int]:
+    """
+    Check the record IDs of a batch edit or delete
+
+    Args:
+        record_ids: IDs as sent by the client
+        max_records: Most IDs accepted in one batch
+
+    Returns:
+        List[int]: The same IDs
+
+    Raises:
+        HTTPException: If the batch is empty, too large or names a record twice
+    """
+    if not record_ids:
+        raise HTTPException(status_code=422, detail="Validation error: No records given")
+    if len(record_ids) > max_records:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Validation error: At most {max_records} records per batch"
+        )
+    duplicates = sorted(record_id for record_id, count in Counter(record_ids).items() if count > 1)
+    if duplicates:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Validation error: Duplicate record id(s): {', '.join(map(str, duplicates))}"
+        )
+    return record_ids
@@ -0,0 +1,216 @@
+"""
+Startup warm-up and readiness state
+
+At startup a background thread loads the models, pushes a few synthetic
+batches and single rows through each of them (so sklearn/xgboost finish
+their lazy initialisation before real traffic), and opens the first
+database connections. /health/ready stays 503 until that has finished.
+
+A failed step (e.g. the database not accepting connections yet) is
+retried with exponential backoff, up to WARMUP_RETRY_MAX_SECONDS apart,
+until it succeeds, so a transient error at boot does not keep the
+instance out of rotation until it restarts. WARMUP_MAX_ATTEMPTS > 0
+gives up after that many attempts.
+"""
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from .database import get_engine
+from .ml import inferences
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() != "false"
+WARMUP_BATCHES = int(os.getenv("WARMUP_BATCHES", "3"))
+WARMUP_BATCH_SIZE = int(os.getenv("WARMUP_BATCH_SIZE", "64"))
+WARMUP_SINGLE_ROWS = int(os.getenv("WARMUP_SINGLE_ROWS", "50"))
+WARMUP_DB_CONNECTIONS = int(os.getenv("WARMUP_DB_CONNECTIONS", "2"))
+WARMUP_MAX_ATTEMPTS = int(os.getenv("WARMUP_MAX_ATTEMPTS", "0"))  # 0 retries until it succeeds
+WARMUP_RETRY_INITIAL_SECONDS = float(os.getenv("WARMUP_RETRY_INITIAL_SECONDS", "1"))
+WARMUP_RETRY_MAX_SECONDS = float(os.getenv("WARMUP_RETRY_MAX_SECONDS", "60"))
+
+
+def synthetic_rows(count: int, seed: int = 0) -> List[dict]:
+    """
+    Plausible patient rows for exercising the models; never stored or
+    fed to the drift monitor
+    """
+    rng = random.Random(seed)
+    return [
+        {
+            "pregnancies": rng.randint(0, 10),
+            "glucose": rng.uniform(70, 200),
+            "blood_pressure": rng.uniform(50, 100),
+            "insulin": rng.uniform(0, 300),
+            "bmi": rng.uniform(18, 45),
+            "diabetic_family": rng.randint(0, 1),
+            "age": rng.randint(21, 70),
+        }
+        for _ in range(count)
+    ]
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def warm_models(models: dict, batches: int, batch_size: int, single_rows: int) -> Dict[str, dict]:
+    """
+    Run synthetic batches, then single rows, through every model
+
+    Returns:
+        dict: Per model, the mean batch time and the p50/p99 single-row
+        latency measured once warm (all in ms)
+    """
+    batch_matrix = inferences.feature_matrix(synthetic_rows(batch_size))
+    single_matrices = [inferences.feature_matrix([row]) for row in synthetic_rows(single_rows, seed=1)]
+    report = {}
+    for name, model in models.items():
+        batch_times = []
+        for _ in range(batches):
+            started = time.perf_counter()
+            model.predict_proba(batch_matrix)
+            batch_times.append(time.perf_counter() - started)
+        single_times = []
+        for X in single_matrices:
+            started = time.perf_counter()
+            model.predict_proba(X)
+            single_times.append(time.perf_counter() - started)
+        report[name] = {
+            "batch_mean_ms": round(sum(batch_times) / len(batch_times) * 1000, 3) if batch_times else None,
+            "p50_ms": round(_percentile(single_times, 0.5) * 1000, 3) if single_times else None,
+            "p99_ms": round(_percentile(single_times, 0.99) * 1000, 3) if single_times else None,
+        }
+    return report
+
+
+def prime_database(engine, connections: int) -> None:
+    # Hold several connections at once so the pool really opens that many
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            conn.close()
+
+
+def retry_delay(attempt: int, initial: float, maximum: float) -> float:
+    # Seconds to wait after failed attempt number `attempt` (1-based): initial, 2x, 4x, ... capped at maximum
+    return min(maximum, initial * 2 ** (attempt - 1))
+
+
+class Warmup:
+    """
+    Runs the startup warm-up in a daemon thread, retrying failed steps
+    with backoff, and records what happened for the readiness endpoint
+    """
+
+    def __init__(
+        self,
+        load_models: Callable[[], dict] = inferences.load_models,
+        engine_factory: Callable = get_engine,
+        max_attempts: int = WARMUP_MAX_ATTEMPTS,
+        retry_initial: float = WARMUP_RETRY_INITIAL_SECONDS,
+        retry_max: float = WARMUP_RETRY_MAX_SECONDS,
+    ):
+        self.load_models = load_models
+        self.engine_factory = engine_factory
+        self.max_attempts = max_attempts
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+        self.done = threading.Event()
+        self.report: dict = {"status": "pending", "models": None, "database": None, "attempts": 0}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="startup-warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        # Ends the retry wait early; the report keeps the last failure
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.done.wait(timeout)
+
+    def run(self) -> dict:
+        """
+        Warm up until both steps succeed, the attempts run out or stop() is called
+
+        Returns:
+            dict: The report; status is "ready", or "failed" if it gave up
+        """
+        started = time.perf_counter()
+        self.report["started_at"] = datetime.utcnow().isoformat()
+        try:
+            while True:
+                self.report["attempts"] += 1
+                # Only the steps that have not succeeded yet are run again
+                if not self._ok("models"):
+                    self.report["models"] = self._warm_models()
+                if not self._ok("database"):
+                    self.report["database"] = self._prime_database()
+                if self._ok("models") and self._ok("database"):
+                    self.report["status"] = "ready"
+                    break
+                if self.max_attempts and self.report["attempts"] >= self.max_attempts:
+                    self.report["status"] = "failed"
+                    break
+                delay = retry_delay(self.report["attempts"], self.retry_initial, self.retry_max)
+                self.report["status"] = "retrying"
+                self.report["next_retry_in_s"] = delay
+                print(f"Startup warm-up attempt {self.report['attempts']} failed, retrying in {delay}s")
+                if self._stop.wait(delay):
+                    self.report["status"] = "failed"
+                    break
+            self.report.pop("next_retry_in_s", None)
+        finally:
+            self.report["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            self.done.set()
+        print(f"Startup warm-up {self.report['status']} in {self.report['duration_ms']} ms")
+        return self.report
+
+    def _ok(self, step: str) -> bool:
+        return (self.report[step] or {}).get("status") == "ok"
+
+    def _warm_models(self) -> dict:
+        started = time.perf_counter()
+        try:
+            models = self.load_models()
+            if inferences.SERVING_MODE == "student":
+                models = {**models, "student": inferences.load_student()}
+            load_ms = round((time.perf_counter() - started) * 1000, 3)
+            timings = warm_models(models, WARMUP_BATCHES, WARMUP_BATCH_SIZE, WARMUP_SINGLE_ROWS)
+        except Exception as e:
+            return {"status": "error", "error": str(e)}
+        return {"status": "ok", "load_ms": load_ms, "warmup": timings}
+
+    def _prime_database(self) -> dict:
+        started = time.perf_counter()
+        try:
+            prime_database(self.engine_factory(), WARMUP_DB_CONNECTIONS)
+        except Exception as e:
+            return {"status": "error", "error": str(e)}
+        return {
+            "status": "ok",
+            "connections": WARMUP_DB_CONNECTIONS,
+            "ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    def readiness(self) -> Tuple[bool, dict]:
+        return self.report["status"] == "ready", dict(self.report)
+
+
+startup_warmup = Warmup()
@@ -0,0 +1,132 @@
+"""
+Shared setup for the benchmark suite: environment, in-memory database,
+authenticated test client and synthetic patient rows
+"""
+import os
+import random
+import statistics
+import time
+import warnings
+from datetime import date, datetime, timedelta
+from uuid import uuid4
+
+# The app reads these at import time; benchmarks never reach Postgres or SMTP
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-not-for-production")
+os.environ.setdefault("DB_PORT", "5432")
+os.environ.setdefault("SMTP_PORT", "587")
+os.environ.setdefault("TOKEN_SWEEP_ENABLED", "false")
+warnings.filterwarnings("ignore")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from passlib.hash import bcrypt  # noqa: E402
+from sqlmodel import Session, SQLModel, create_engine  # noqa: E402
+from sqlmodel.pool import StaticPool  # noqa: E402
+
+from app.database import get_session  # noqa: E402
+from app.main import app  # noqa: E402
+from app.ml.inferences import predict_risk_batch, stored_risks  # noqa: E402
+from app.models import health_records, users  # noqa: E402
+from app.rate_limit import limiter  # noqa: E402
+
+PASSWORD = "benchmark123"
+
+
+def patient_rows(count: int, seed: int = 42, with_created_at: bool = False) -> list:
+    """Deterministic synthetic rows within the API validation ranges"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        row = {
+            "pregnancies": rng.randint(0, 12),
+            "glucose": rng.randint(60, 200),
+            "blood_pressure": rng.randint(40, 110),
+            "insulin": rng.randint(0, 400),
+            "bmi": round(rng.uniform(18, 50), 1),
+            "diabetic_family": rng.randint(0, 1),
+            "age": rng.randint(21, 80),
+        }
+        if with_created_at:
+            row["created_at"] = (start + timedelta(hours=i)).isoformat()
+        rows.append(row)
+    return rows
+
+
+class BenchApp:
+    """A fresh in-memory SQLite database wired into the FastAPI app"""
+
+    def __init__(self):
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        SQLModel.metadata.create_all(self.engine)
+
+        def get_bench_session():
+            with Session(self.engine) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = get_bench_session
+        limiter.enabled = False
+        self.client = TestClient(app)
+
+        with Session(self.engine) as session:
+            self.user_id = uuid4()
+            user = users(
+                user_id=self.user_id,
+                email="bench@example.com",
+                username="bench",
+                first_name="Bench",
+                last_name="User",
+                password_hash=bcrypt.hash(PASSWORD),
+                phone_number="1234567890",
+                date_of_birth=date(1990, 1, 1),
+                is_verified=True,
+            )
+            session.add(user)
+            session.commit()
+
+        response = self.client.post("/auth/login", json={"email": "bench@example.com", "password": PASSWORD})
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def seed_records(self, count: int) -> None:
+        """Insert `count` records for the bench user directly, predicted in one batch"""
+        rows = patient_rows(count, seed=7)
+        predictions = predict_risk_batch(rows)
+        start = datetime(2020, 1, 1)
+        with Session(self.engine) as session:
+            session.add_all([
+                health_records(**row, **stored_risks(prediction), user_id=self.user_id, created_at=start + timedelta(hours=i))
+                for i, (row, prediction) in enumerate(zip(rows, predictions))
+            ])
+            session.commit()
+
+    def close(self):
+        app.dependency_overrides.clear()
+        self.engine.dispose()
+
+
+def measure(fn, repeat: int, warmup: int = 1) -> dict:
+    """
+    Time `fn` and summarise in milliseconds
+
+    Returns:
+        dict: min/median/mean/p95/max over `repeat` runs after `warmup` runs
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "repeat": repeat,
+        "min_ms": round(samples[0], 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(0.95 * len(samples)))], 4),
+        "max_ms": round(samples[-1], 4),
+    }
@@ -0,0 +1,104 @@
+"""
+`python -X importtime` report for the application import
+
+Each run imports the module in a fresh interpreter; the per-module
+timings kept are the minimum over all runs, since import time is noisy.
+
+Usage (from backend/):
+    python -m benchmarks.importtime --output importtime.json
+    python -m benchmarks.importtime --compare importtime.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Packages whose presence after `import app.main` means startup got slower
+HEAVY_PACKAGES = ("sklearn", "xgboost", "scipy", "joblib", "pandas", "numpy", "psycopg2")
+
+
+def parse_importtime(stderr: str) -> dict:
+    """
+    Parse `-X importtime` output
+
+    Returns:
+        dict: Module name to {"self_us", "cumulative_us"}
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = {"self_us": int(self_us), "cumulative_us": int(cumulative_us)}
+    return modules
+
+
+def measure_import(module: str, repeat: int) -> dict:
+    env = dict(os.environ)
+    env.setdefault("SECRET_KEY", "importtime-secret")
+    best: dict = {}
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, env=env, check=True,
+        )
+        for name, timing in parse_importtime(proc.stderr).items():
+            if name not in best or timing["cumulative_us"] < best[name]["cumulative_us"]:
+                best[name] = timing
+    return {
+        "module": module,
+        "total_ms": round(best.get(module, {"cumulative_us": 0})["cumulative_us"] / 1000, 1),
+        "heavy_packages": [name for name in HEAVY_PACKAGES if name in best],
+        "modules": best,
+    }
+
+
+def top_packages(report: dict, limit: int) -> list:
+    # Top-level packages only, so nested submodules are not counted twice
+    packages = {name: t["cumulative_us"] for name, t in report["modules"].items() if "." not in name}
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def print_report(report: dict, limit: int) -> None:
+    print(f"import {report['module']}: {report['total_ms']} ms")
+    print(f"heavy packages loaded: {', '.join(report['heavy_packages']) or 'none'}")
+    for name, cumulative_us in top_packages(report, limit):
+        print(f"  {name:<30} {cumulative_us / 1000:>9.1f} ms")
+
+
+def print_comparison(current: dict, baseline: dict, limit: int) -> None:
+    print(f"import {current['module']}: {baseline['total_ms']} ms -> {current['total_ms']} ms")
+    names = [name for name, _ in top_packages(baseline, limit)]
+    names += [name for name, _ in top_packages(current, limit) if name not in names]
+    print(f"  {'package':<30} {'before':>10} {'after':>10}")
+    for name in names:
+        before = baseline["modules"].get(name, {}).get("cumulative_us")
+        after = current["modules"].get(name, {}).get("cumulative_us")
+        fmt = lambda us: "-" if us is None else f"{us / 1000:.1f} ms"
+        print(f"  {name:<30} {fmt(before):>10} {fmt(after):>10}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Report -X importtime for the backend")
+    parser.add_argument("--module", default="app.main", help="Module to import (default app.main)")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters to take the minimum over")
+    parser.add_argument("--top", type=int, default=15, help="Number of top-level packages to list")
+    parser.add_argument("--output", help="Write the report JSON to this file")
+    parser.add_argument("--compare", help="Earlier report JSON to compare against")
+    args = parser.parse_args(argv)
+
+    report = measure_import(args.module, args.repeat)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(report, json.load(f), args.top)
+    else:
+        print_report(report, args.top)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""
+Benchmarks for the backend hot paths, run against the real pickled models
+and an in-memory SQLite database
+
+Usage (from backend/):
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --quick --compare baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+from benchmarks.harness import BenchApp, PASSWORD, measure, patient_rows
+from app.ml.inferences import predict_risk, predict_risk_batch, predict_student
+
+
+def bench_predict_single(quick: bool) -> dict:
+    row = patient_rows(1)[0]
+    repeat = 20 if quick else 200
+    return {
+        "predict_risk/single": measure(lambda: predict_risk(row), repeat=repeat, warmup=5),
+        "predict_risk/single[xgboost]": measure(lambda: predict_risk(row, names=["xgboost"]), repeat=repeat, warmup=5),
+        "predict_student/single": measure(lambda: predict_student(row), repeat=repeat, warmup=5),
+    }
+
+
+def bench_predict_batch(quick: bool) -> dict:
+    results = {}
+    for size in (1, 100, 10000):
+        rows = patient_rows(size)
+        repeat = 3 if size == 10000 else (10 if quick else 50)
+        results[f"predict_risk_batch/{size}"] = measure(lambda: predict_risk_batch(rows), repeat=repeat)
+    return results
+
+
+def bench_records_bulk(quick: bool) -> dict:
+    results = {}
+    sizes = (10, 100) if quick else (10, 100, 1000)
+    for size in sizes:
+        uploads = iter(range(1000))
+        bench = BenchApp()
+
+        def upload():
+            # A new seed per upload; repeating the same rows would only measure duplicate skipping
+            rows = patient_rows(size, seed=next(uploads), with_created_at=True)
+            response = bench.client.post("/records/bulk", headers=bench.headers, json=rows)
+            assert response.status_code == 200 and response.json()["skipped"] == 0, response.text
+
+        results[f"records_bulk/{size}"] = measure(upload, repeat=3 if size >= 1000 else 5)
+        bench.close()
+    return results
+
+
+def bench_validate_bulk(quick: bool) -> dict:
+    # Columnar validation of a bulk upload against one Pydantic model per row
+    from typing import List
+    from pydantic import TypeAdapter
+    from app.schemas import PatientDataWithCreatedAt
+    from app.validators import validate_bulk_records
+
+    adapter = TypeAdapter(List[PatientDataWithCreatedAt])
+    results = {}
+    for size in ((1000,) if quick else (1000, 50000)):
+        rows = patient_rows(size, with_created_at=True)
+        repeat = 3 if size >= 50000 else 10
+        results[f"validate_bulk/columnar/{size}"] = measure(lambda: validate_bulk_records(rows), repeat=repeat)
+        results[f"validate_bulk/pydantic/{size}"] = measure(
+            lambda: [record.dict() for record in adapter.validate_python(rows)], repeat=repeat)
+    return results
+
+
+def bench_prediction_storage(quick: bool) -> dict:
+    # health_records size and full prediction scan, old outcome_/prediction_prob_ layout vs risk_ SMALLINT
+    import os
+    import tempfile
+    from datetime import timedelta
+    from sqlalchemy import create_engine, text
+    from sqlmodel import SQLModel
+    from app.migrate_predictions import migrate, relation_sizes, scan_seconds
+    from app.ml.inferences import model_files
+
+    results = {}
+    for size in ((10000,) if quick else (10000, 100000)):
+        rows = patient_rows(size)
+        predictions = predict_risk_batch(rows, observe_drift=False)
+        with tempfile.TemporaryDirectory() as directory:
+            engine = create_engine(f"sqlite:///{os.path.join(directory, 'storage.db')}")
+            SQLModel.metadata.create_all(engine)
+            with engine.begin() as connection:
+                # Recreate the old prediction columns, then fill them as the API used to
+                for name in model_files:
+                    connection.execute(text(f"ALTER TABLE health_records DROP COLUMN risk_{name}"))
+                    connection.execute(text(f"ALTER TABLE health_records ADD COLUMN outcome_{name} VARCHAR"))
+                    connection.execute(text(f"ALTER TABLE health_records ADD COLUMN prediction_prob_{name} FLOAT"))
+                start = datetime(2020, 1, 1)
+                columns = list(rows[0]) + list(predictions[0])
+                connection.execute(
+                    text(f"INSERT INTO health_records (user_id, prediction_status, created_at, {', '.join(columns)}) "
+                         f"VALUES (:user_id, 'complete', :created_at, {', '.join(':' + c for c in columns)})"),
+                    [{**row, **prediction, "user_id": "0" * 32, "created_at": start + timedelta(hours=i)}
+                     for i, (row, prediction) in enumerate(zip(rows, predictions))]
+                )
+            for layout in ("legacy", "compact"):
+                if layout == "compact":
+                    migrate(engine)
+                with engine.connect() as connection:
+                    connection.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+                results[f"prediction_storage/{layout}/{size}"] = {
+                    **measure(lambda: scan_seconds(engine), repeat=5 if size >= 100000 else 20),
+                    **relation_sizes(engine),
+                }
+            engine.dispose()
+    return results
+
+
+def bench_my_records(quick: bool) -> dict:
+    results = {}
+    lengths = (10, 100, 1000) if quick else (10, 100, 1000, 5000)
+    for length in lengths:
+        bench = BenchApp()
+        bench.seed_records(length)
+
+        def fetch():
+            response = bench.client.get("/records/my-records", headers=bench.headers)
+            assert response.status_code == 200
+
+        results[f"my_records/{length}"] = measure(fetch, repeat=5 if length >= 1000 else 20)
+
+        etag = bench.client.get("/records/my-records", headers=bench.headers).headers["etag"]
+
+        def revalidate():
+            response = bench.client.get("/records/my-records", headers={**bench.headers, "If-None-Match": etag})
+            assert response.status_code == 304
+
+        results[f"my_records_304/{length}"] = measure(revalidate, repeat=20)
+        bench.close()
+    return results
+
+
+def bench_records_json(quick: bool) -> dict:
+    # my-records body: ORM objects through jsonable_encoder vs row tuples through app.responses.dumps,
+    # then the whole endpoint per Accept-Encoding (with the body size sent)
+    import json
+    from fastapi.encoders import jsonable_encoder
+    from sqlmodel import Session, select
+    from app.models import health_records
+    from app.responses import brotli
+    from app.routes.records import RECORD_COLUMNS, record_response, records_json
+
+    results = {}
+    for size in ((1000,) if quick else (1000, 50000)):
+        bench = BenchApp()
+        bench.seed_records(size)
+        repeat = 3 if size >= 50000 else 10
+        with Session(bench.engine) as session:
+            query = select(health_records).where(health_records.user_id == bench.user_id)
+            results[f"records_json/jsonable_encoder/{size}"] = measure(lambda: json.dumps(jsonable_encoder(
+                [record_response(record) for record in session.exec(query).all()])).encode(), repeat=repeat)
+            query = select(*RECORD_COLUMNS).where(health_records.user_id == bench.user_id)
+            results[f"records_json/tuples/{size}"] = measure(
+                lambda: records_json(session.connection().execute(query).all(), bench.user_id), repeat=repeat)
+
+        for coding in ("identity", "gzip") + (("br",) if brotli is not None else ()):
+            headers = {**bench.headers, "Accept-Encoding": coding}
+            sent = {}
+
+            def fetch():
+                response = bench.client.get("/records/my-records", headers=headers)
+                assert response.status_code == 200
+                sent["bytes"] = int(response.headers.get("content-length", 0))
+
+            results[f"records_json/http[{coding}]/{size}"] = {**measure(fetch, repeat=repeat), **sent}
+        bench.close()
+    return results
+
+
+def bench_series(quick: bool) -> dict:
+    # What a chart downloads: every record from my-records vs one glucose point per bucket from /records/series
+    results = {}
+    for size in ((1000,) if quick else (1000, 50000)):
+        bench = BenchApp()
+        bench.seed_records(size)
+        repeat = 3 if size >= 50000 else 10
+        urls = {"my_records": "/records/my-records"}
+        urls.update({f"buckets={n}": f"/records/series?metric=glucose&buckets={n}" for n in (200, 1000)})
+        for label, url in urls.items():
+            sent = {}
+
+            def fetch():
+                response = bench.client.get(url, headers={**bench.headers, "Accept-Encoding": "identity"})
+                assert response.status_code == 200
+                sent["bytes"] = int(response.headers.get("content-length", 0))
+
+            results[f"series/{label}/{size}"] = {**measure(fetch, repeat=repeat), **sent}
+        bench.close()
+    return results
+
+
+def bench_login(quick: bool) -> dict:
+    bench = BenchApp()
+
+    def login():
+        response = bench.client.post("/auth/login", json={"email": "bench@example.com", "password": PASSWORD})
+        assert response.status_code == 200
+
+    result = {"login": measure(login, repeat=5 if quick else 20)}
+    bench.close()
+    return result
+
+
+BENCHMARKS = {
+    "predict_single": bench_predict_single,
+    "predict_batch": bench_predict_batch,
+    "records_bulk": bench_records_bulk,
+    "validate_bulk": bench_validate_bulk,
+    "prediction_storage": bench_prediction_storage,
+    "my_records": bench_my_records,
+    "records_json": bench_records_json,
+    "series": bench_series,
+    "login": bench_login,
+}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    Compare median timings against a baseline run
+
+    Returns:
+        list: (name, baseline_ms, current_ms, change) for every benchmark slower than `threshold`
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base["median_ms"]:
+            continue
+        change = result["median_ms"] / base["median_ms"] - 1
+        if change > threshold:
+            regressions.append((name, base["median_ms"], result["median_ms"], change))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run backend benchmarks")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Relative median slowdown that counts as a regression (default 0.15)")
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS), help="Run a subset of benchmarks")
+    parser.add_argument("--quick", action="store_true", help="Fewer repeats and smaller sizes")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        print(f"Running {name}...", file=sys.stderr)
+        results.update(BENCHMARKS[name](args.quick))
+
+    report = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "results": results,
+    }
+
+    for name, result in results.items():
+        print(f"{name:32s} median {result['median_ms']:10.3f} ms   p95 {result['p95_ms']:10.3f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for name, base_ms, current_ms, change in regressions:
+            print(f"REGRESSION {name}: {base_ms:.3f} ms -> {current_ms:.3f} ms (+{change:.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
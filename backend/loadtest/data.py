@@ -0,0 +1,54 @@
+"""
+Synthetic patient rows drawn from the training data (kept free of model
+imports so the load runner starts instantly)
+"""
+import csv
+import os
+import random
+import statistics
+
+from app.features import FEATURES
+from app.ml.drift import PEDIGREE_THRESHOLD
+
+DEFAULT_CSV = os.path.join(os.path.dirname(__file__), "..", "..", "notebook", "diabetes.csv")
+PASSWORD = "loadtest123"
+
+# CSV column -> (API field, validation bounds from app/features.py)
+CSV_FIELDS = {
+    "Pregnancies": "pregnancies",
+    "Glucose": "glucose",
+    "BloodPressure": "blood_pressure",
+    "Insulin": "insulin",
+    "BMI": "bmi",
+    "Age": "age",
+}
+_BOUNDS = {feature.name: (feature.min, feature.max) for feature in FEATURES}
+COLUMNS = {column: (field, *_BOUNDS[field]) for column, field in CSV_FIELDS.items()}
+
+
+class PatientSampler:
+    """
+    Resamples whole rows of the training CSV. Zero BMI (a missing value in
+    the Pima data) is replaced by the column median, like the notebook's
+    imputation, so every row passes API validation.
+    """
+
+    def __init__(self, csv_path: str, seed: int = 0):
+        with open(csv_path, newline="") as f:
+            raw = list(csv.DictReader(f))
+        bmi_median = statistics.median(float(r["BMI"]) for r in raw if float(r["BMI"]) > 0)
+        self.rows = []
+        for r in raw:
+            row = {}
+            for column, (field, low, high) in COLUMNS.items():
+                value = float(r[column])
+                if field == "bmi" and value == 0:
+                    value = bmi_median
+                value = min(max(value, low), high)
+                row[field] = round(value, 1) if field == "bmi" else int(value)
+            row["diabetic_family"] = 1 if float(r["DiabetesPedigreeFunction"]) >= PEDIGREE_THRESHOLD else 0
+            self.rows.append(row)
+        self.rng = random.Random(seed)
+
+    def sample(self) -> dict:
+        return dict(self.rng.choice(self.rows))
@@ -0,0 +1,89 @@
+"""
+Create synthetic verified users and health records for load testing
+
+Rows are resampled from notebook/diabetes.csv so feature distributions and
+correlations match the training data. Users are inserted directly with the
+verification flag set, so no email is sent. Access tokens are minted with
+the app's SECRET_KEY and written to a JSON file for loadtest.run.
+
+Usage (from backend/, with the same env as the server):
+    DATABASE_URL=sqlite:///loadtest.db python -m loadtest.generate --users 50 --records 200
+"""
+import argparse
+import json
+import sys
+from datetime import date, datetime, timedelta
+from uuid import uuid4
+
+from passlib.hash import bcrypt
+from sqlmodel import Session
+
+from app.database import get_engine, init_db
+from app.ml.inferences import predict_risk_batch, stored_risks
+from app.models import health_records, users
+from app.routes.auth import create_access_token
+from loadtest.data import DEFAULT_CSV, PASSWORD, PatientSampler
+
+def generate(user_count: int, records_per_user: int, csv_path: str, seed: int = 0) -> list:
+    """
+    Insert users and their records
+
+    Returns:
+        list: One dict per user with email, password and a long-lived access token
+    """
+    sampler = PatientSampler(csv_path, seed)
+    # One bcrypt hash shared by every synthetic user keeps setup fast
+    password_hash = bcrypt.hash(PASSWORD)
+    run_tag = uuid4().hex[:8]
+    start = datetime.utcnow() - timedelta(days=records_per_user)
+    credentials = []
+
+    with Session(get_engine()) as session:
+        for i in range(user_count):
+            user_id = uuid4()
+            email = f"load_{run_tag}_{i}@example.com"
+            session.add(users(
+                user_id=user_id,
+                email=email,
+                username=f"load_{run_tag}_{i}",
+                first_name="Load",
+                last_name=f"User{i}",
+                password_hash=password_hash,
+                phone_number="1234567890",
+                date_of_birth=date(1990, 1, 1),
+                is_verified=True,
+            ))
+            rows = [sampler.sample() for _ in range(records_per_user)]
+            predictions = predict_risk_batch(rows)
+            session.add_all([
+                health_records(**row, **stored_risks(prediction), user_id=user_id, created_at=start + timedelta(days=n))
+                for n, (row, prediction) in enumerate(zip(rows, predictions))
+            ])
+            session.commit()
+            credentials.append({
+                "email": email,
+                "password": PASSWORD,
+                "access_token": create_access_token({"sub": str(user_id)}, timedelta(days=1)),
+            })
+    return credentials
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic users and records")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--records", type=int, default=100, help="Records per user")
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="Training CSV to sample from")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="loadtest_users.json", help="Where to write credentials")
+    args = parser.parse_args(argv)
+
+    init_db()
+    credentials = generate(args.users, args.records, args.csv, args.seed)
+    with open(args.output, "w") as f:
+        json.dump(credentials, f, indent=2)
+    print(f"Created {len(credentials)} users with {args.records} records each; credentials in {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Open-loop load generator replaying a weighted mix of API calls
+
+Requests are started on a fixed schedule at the target rate whether or not
+earlier ones have finished, so server slowdowns show up as latency instead
+of silently lowering the offered load. Latency is measured from each
+request's scheduled send time, so time spent waiting for a free slot
+(--max-in-flight) or a late event loop counts too (no coordinated omission).
+Requests that could not be sent on time are reported as "late".
+
+Usage (from backend/):
+    python -m loadtest.run --base-url http://127.0.0.1:8000 --rps 50 --duration 60
+
+Start the server with RATE_LIMIT_ENABLED=false, or login traffic will be
+throttled per IP and reported as 429s.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+from loadtest.data import DEFAULT_CSV, PatientSampler
+
+DEFAULT_MIX = {"predict": 40, "add_record": 20, "my_records": 30, "login": 10}
+
+# A request sent this long after its scheduled time counts as late
+LATE_MS = 10.0
+
+
+class Scenario:
+    def __init__(self, credentials: list, sampler: PatientSampler, seed: int = 0):
+        self.credentials = credentials
+        self.sampler = sampler
+        self.rng = random.Random(seed)
+
+    def request(self, kind: str) -> tuple:
+        """Return (endpoint label, method, path, kwargs) for one call of the given kind"""
+        user = self.rng.choice(self.credentials)
+        auth = {"Authorization": f"Bearer {user['access_token']}"}
+        if kind == "predict":
+            return "POST /predict/", "POST", "/predict/", {"json": self.sampler.sample()}
+        if kind == "add_record":
+            return "POST /records/", "POST", "/records/", {"json": self.sampler.sample(), "headers": auth}
+        if kind == "my_records":
+            return "GET /records/my-records", "GET", "/records/my-records", {"headers": auth}
+        if kind == "login":
+            body = {"email": user["email"], "password": user["password"]}
+            return "POST /auth/login", "POST", "/auth/login", {"json": body}
+        raise ValueError(f"Unknown request kind: {kind}")
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def summarise(latencies: dict, statuses: dict, errors: dict, elapsed: float, waits: dict = None) -> dict:
+    # latencies are from the scheduled send time; waits are how long after it each request was actually sent
+    waits = waits or {}
+    report = {}
+    for endpoint in sorted(set(latencies) | set(errors)):
+        values = sorted(latencies.get(endpoint, []))
+        delays = sorted(waits.get(endpoint, []))
+        report[endpoint] = {
+            "requests": len(values) + errors.get(endpoint, 0),
+            "rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 0.50), 2),
+            "p90_ms": round(percentile(values, 0.90), 2),
+            "p99_ms": round(percentile(values, 0.99), 2),
+            "max_ms": round(values[-1], 2) if values else 0.0,
+            "late": sum(1 for delay in delays if delay >= LATE_MS),
+            "p99_send_delay_ms": round(percentile(delays, 0.99), 2),
+            "status": dict(statuses.get(endpoint, {})),
+            "transport_errors": errors.get(endpoint, 0),
+        }
+    return report
+
+
+async def run(base_url: str, rps: float, duration: float, mix: dict, scenario: Scenario,
+              max_in_flight: int = 200, timeout: float = 30.0) -> dict:
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    errors = defaultdict(int)
+    waits = defaultdict(list)
+    in_flight = asyncio.Semaphore(max_in_flight)
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def one(kind, due):
+            # Timed from `due`, not from when a slot freed up: queueing here is part of the latency
+            endpoint, method, path, kwargs = scenario.request(kind)
+            async with in_flight:
+                waits[endpoint].append((time.perf_counter() - due) * 1000)
+                try:
+                    response = await client.request(method, path, **kwargs)
+                except httpx.HTTPError:
+                    errors[endpoint] += 1
+                    return
+                latencies[endpoint].append((time.perf_counter() - due) * 1000)
+                statuses[endpoint][str(response.status_code)] += 1
+
+        tasks = []
+        interval = 1.0 / rps
+        started = time.perf_counter()
+        n = 0
+        while True:
+            due = started + n * interval
+            if due - started >= duration:
+                break
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            kind = scenario.rng.choices(kinds, weights)[0]
+            tasks.append(asyncio.create_task(one(kind, due)))
+            n += 1
+        issued = time.perf_counter() - started
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    return {
+        "target_rps": rps,
+        "achieved_rps": round(n / issued, 2),
+        "duration_s": round(elapsed, 2),
+        "endpoints": summarise(latencies, statuses, errors, elapsed, waits),
+    }
+
+
+def parse_mix(text: str) -> dict:
+    # "predict=40,my_records=60"
+    mix = {}
+    for part in text.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a realistic API traffic mix at a target rate")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users-file", default="loadtest_users.json", help="Output of loadtest.generate")
+    parser.add_argument("--csv", default=DEFAULT_CSV)
+    parser.add_argument("--rps", type=float, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Weights, e.g. predict=40,add_record=20,my_records=30,login=10")
+    parser.add_argument("--max-in-flight", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report JSON to this file")
+    args = parser.parse_args(argv)
+
+    with open(args.users_file) as f:
+        credentials = json.load(f)
+    scenario = Scenario(credentials, PatientSampler(args.csv, args.seed), args.seed)
+
+    report = asyncio.run(run(args.base_url, args.rps, args.duration, args.mix, scenario, args.max_in_flight))
+
+    print(f"target {report['target_rps']} rps, achieved {report['achieved_rps']} rps over {report['duration_s']}s")
+    print(f"{'endpoint':28s} {'reqs':>6s} {'p50':>9s} {'p90':>9s} {'p99':>9s} {'late':>6s}  status")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:28s} {stats['requests']:6d} {stats['p50_ms']:9.1f} {stats['p90_ms']:9.1f} "
+              f"{stats['p99_ms']:9.1f} {stats['late']:6d}  {stats['status']} errors={stats['transport_errors']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
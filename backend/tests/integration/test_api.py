@@ -1,13 +1,21 @@
 import pytest
+from collections import deque
 from fastapi.testclient import TestClient
 from unittest.mock import Mock, patch, MagicMock
 from datetime import datetime, date
-from uuid import uuid4
+from uuid import UUID, uuid4
 from sqlmodel import Session, create_engine, SQLModel
 from sqlmodel.pool import StaticPool
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
 from app.main import app
 from app.database import get_session
-from app.models import users, health_records
+from app.models import users, health_records, prediction_jobs
+from app.rate_limit import limiter
+from app.warmup import Warmup
+from app.jobs import PredictionJobPool
+from app.routes import records as records_routes
+from app.ml.inferences import model_files, risk_label
 from passlib.hash import bcrypt
 
 
@@ -33,6 +41,7 @@ def client_fixture(test_db_session: Session):
         yield test_db_session
 
     app.dependency_overrides[get_session] = get_test_session
+    limiter.reset()
     client = TestClient(app)
     yield client
     app.dependency_overrides.clear()
@@ -175,6 +184,76 @@ class TestAuthEndpoints:
             assert response.status_code == 400
             assert "Username already registered" in response.json()["detail"]
 
+    def test_signup_duplicate_skips_password_hash(self, client: TestClient, test_user):
+        """Test that a duplicate signup is turned away before the password is hashed"""
+        with patch('app.routes.auth.send_verification_email', return_value=(True, "http://verify-link")), \
+                patch('app.routes.auth.bcrypt.hash') as hash_password:
+            response = client.post(
+                "/auth/signup",
+                json={
+                    "email": "testuser@example.com",
+                    "password": "password123",
+                    "first_name": "Test",
+                    "last_name": "User",
+                    "username": "differentuser",
+                    "phone_number": "1234567890",
+                    "date_of_birth": "1990-01-01"
+                }
+            )
+
+        assert response.status_code == 400
+        hash_password.assert_not_called()
+
+    @patch('app.routes.auth.send_verification_email')
+    def test_signup_single_insert(self, mock_email, client: TestClient, test_db_session: Session):
+        """Test that signup relies on unique constraints instead of a pre-check query"""
+        mock_email.return_value = (True, "http://verify-link")
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split()[0].upper())
+
+        engine = test_db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.post(
+                "/auth/signup",
+                json={
+                    "email": "single@example.com",
+                    "password": "securepass123",
+                    "first_name": "Single",
+                    "last_name": "Insert",
+                    "username": "singleinsert",
+                    "phone_number": "5555555555",
+                    "date_of_birth": "2000-01-01"
+                }
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert response.status_code == 200
+        assert statements.index("INSERT") < statements.index("SELECT")
+
+    @patch('app.routes.auth.send_verification_email')
+    def test_signup_unrecognised_violation_not_reported_as_duplicate(self, mock_email, client: TestClient, test_user):
+        """Test that an integrity error on some other constraint is raised, not turned into a 400"""
+        mock_email.return_value = (True, "http://verify-link")
+
+        with patch('app.routes.auth.conflicting_column', return_value="user_id"):
+            with pytest.raises(IntegrityError):
+                client.post(
+                    "/auth/signup",
+                    json={
+                        "email": "testuser@example.com",
+                        "password": "password123",
+                        "first_name": "Test",
+                        "last_name": "User",
+                        "username": "anotheruser",
+                        "phone_number": "1234567890",
+                        "date_of_birth": "1990-01-01"
+                    }
+                )
+
     def test_login_success(self, client: TestClient, test_user):
         """Test successful login"""
         response = client.post(
@@ -270,6 +349,113 @@ class TestAuthEndpoints:
         assert response.status_code == 400
         assert "already verified" in response.json()["detail"]
 
+    def test_login_returns_refresh_token(self, client: TestClient, test_user):
+        """Test that login issues a refresh token alongside the access token"""
+        response = client.post(
+            "/auth/login",
+            json={
+                "email": "testuser@example.com",
+                "password": "password123"
+            }
+        )
+
+        assert response.status_code == 200
+        assert response.json()["refresh_token"]
+
+    def test_refresh_rotates_token(self, client: TestClient, test_user):
+        """Test that a refresh returns a working access token and a new refresh token"""
+        login = client.post("/auth/login", json={"email": "testuser@example.com", "password": "password123"})
+        old_refresh = login.json()["refresh_token"]
+
+        response = client.post("/auth/refresh", json={"refresh_token": old_refresh})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["token_type"] == "bearer"
+        assert data["refresh_token"] != old_refresh
+
+        records = client.get("/records/my-records", headers={"Authorization": f"Bearer {data['access_token']}"})
+        assert records.status_code == 200
+
+    def test_refresh_reuse_revokes_family(self, client: TestClient, test_user):
+        """Test that replaying a rotated refresh token revokes every token of the user"""
+        login = client.post("/auth/login", json={"email": "testuser@example.com", "password": "password123"})
+        old_refresh = login.json()["refresh_token"]
+        new_refresh = client.post("/auth/refresh", json={"refresh_token": old_refresh}).json()["refresh_token"]
+
+        replay = client.post("/auth/refresh", json={"refresh_token": old_refresh})
+        assert replay.status_code == 401
+
+        response = client.post("/auth/refresh", json={"refresh_token": new_refresh})
+        assert response.status_code == 401
+
+    @pytest.mark.parametrize("change", ["unverify", "delete"])
+    def test_refresh_requires_active_account(self, client: TestClient, test_user, test_db_session, change):
+        """Test that a refresh token stops working once its user is unverified or deleted"""
+        login = client.post("/auth/login", json={"email": "testuser@example.com", "password": "password123"})
+        if change == "unverify":
+            test_user.is_verified = False
+            test_db_session.add(test_user)
+        else:
+            test_db_session.delete(test_user)
+        test_db_session.commit()
+
+        response = client.post("/auth/refresh", json={"refresh_token": login.json()["refresh_token"]})
+
+        assert response.status_code == 401
+
+    def test_refresh_invalid_token(self, client: TestClient):
+        """Test refresh with an unknown token"""
+        response = client.post("/auth/refresh", json={"refresh_token": "not-a-real-token"})
+
+        assert response.status_code == 401
+        assert "Invalid refresh token" in response.json()["detail"]
+
+    def test_login_throttled_per_account(self, client: TestClient, test_user):
+        """Test that repeated failed logins for one account are rejected with 429"""
+        for _ in range(10):
+            client.post("/auth/login", json={"email": "testuser@example.com", "password": "wrongpassword"})
+
+        response = client.post(
+            "/auth/login",
+            json={
+                "email": "testuser@example.com",
+                "password": "password123"
+            }
+        )
+
+        assert response.status_code == 429
+        assert "Retry-After" in response.headers
+
+    def test_login_flood_does_not_lock_out_other_clients(self, client: TestClient, test_user):
+        """Test that the owner can still log in from another IP while an attacker floods the account"""
+        attacker = TestClient(app, client=("203.0.113.7", 40000))
+        for _ in range(12):
+            attacker.post("/auth/login", json={"email": "testuser@example.com", "password": "wrongpassword"})
+        assert attacker.post(
+            "/auth/login", json={"email": "testuser@example.com", "password": "password123"}
+        ).status_code == 429
+
+        owner = TestClient(app, client=("198.51.100.20", 40000))
+        response = owner.post("/auth/login", json={"email": "testuser@example.com", "password": "password123"})
+
+        assert response.status_code == 200
+        assert "access_token" in response.json()
+
+    def test_login_throttled_per_ip_skips_database(self, client: TestClient):
+        """Test that IP-throttled requests are rejected before a DB session is opened"""
+        for i in range(20):
+            client.post("/auth/login", json={"email": f"user{i}@example.com", "password": "password123"})
+
+        def failing_session():
+            raise AssertionError("database session requested for a throttled request")
+            yield
+
+        app.dependency_overrides[get_session] = failing_session
+        response = client.post("/auth/login", json={"email": "other@example.com", "password": "password123"})
+
+        assert response.status_code == 429
+
 
 class TestPredictionEndpoints:
     """Test suite for prediction endpoints"""
@@ -313,6 +499,33 @@ class TestPredictionEndpoints:
         assert "outcome_logisticregression" in predictions
         assert "prediction_prob_logisticregression" in predictions
 
+    @patch('app.ml.inferences.models')
+    def test_predict_stats(self, mock_models, client: TestClient):
+        """Test that prediction stats report model latency and feature summaries"""
+        mock_model = Mock()
+        mock_model.predict_proba.return_value = [[0.3, 0.7]]
+        mock_models.items.return_value = [("xgboost", mock_model)]
+
+        client.post(
+            "/predict/",
+            json={
+                "pregnancies": 2,
+                "glucose": 120,
+                "blood_pressure": 80,
+                "insulin": 100,
+                "bmi": 25.5,
+                "diabetic_family": 0,
+                "age": 35
+            }
+        )
+        response = client.get("/predict/stats")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["models"]["xgboost"]["calls"] >= 1
+        assert data["features"]["glucose"]["count"] >= 1
+        assert "psi" in data["features"]["glucose"]
+
     def test_predict_invalid_data(self, client: TestClient):
         """Test prediction with invalid/missing data"""
         response = client.post(
@@ -327,6 +540,61 @@ class TestPredictionEndpoints:
         assert response.status_code == 422  # Validation error
 
 
+class TestStudentServingMode:
+    """Test suite for serving /predict from the distilled student"""
+
+    PATIENT = {
+        "pregnancies": 2, "glucose": 120, "blood_pressure": 80,
+        "insulin": 100, "bmi": 25.5, "diabetic_family": 0, "age": 35
+    }
+
+    @patch('app.ml.inferences.SERVING_MODE', 'student')
+    def test_student_only_by_default(self, client: TestClient):
+        """Test that student mode skips the six models"""
+        with patch('app.routes.prediction.predict_risk') as mock_predict:
+            response = client.post("/predict/", json=self.PATIENT)
+
+        assert response.status_code == 200
+        result = response.json()[0]
+        assert set(result) == {"outcome_student", "prediction_prob_student"}
+        mock_predict.assert_not_called()
+
+    @patch('app.ml.inferences.SERVING_MODE', 'student')
+    def test_breakdown_adds_all_models(self, client: TestClient):
+        """Test that breakdown=true also returns the six-model results"""
+        response = client.post("/predict/?breakdown=true", json=self.PATIENT)
+
+        assert response.status_code == 200
+        result = response.json()[0]
+        assert "prediction_prob_student" in result
+        assert all(f"prediction_prob_{name}" in result for name in model_files)
+
+    @patch('app.ml.inferences.SERVING_MODE', 'student')
+    def test_breakdown_observes_drift_once(self, client: TestClient):
+        """Test that the student plus the breakdown models count the input once in the drift stats"""
+        for query in ("?breakdown=true", "?models=xgboost", ""):
+            with patch('app.ml.inferences.drift_monitor.observe') as observe:
+                response = client.post(f"/predict/{query}", json=self.PATIENT)
+
+            assert response.status_code == 200
+            assert observe.call_count == 1, query
+
+    def test_predict_model_subset(self, client: TestClient):
+        """Test that /predict evaluates only the requested models"""
+        response = client.post("/predict/?models=xgboost,svc", json=self.PATIENT)
+
+        assert response.status_code == 200
+        assert set(response.json()[0]) == {
+            "outcome_svc", "prediction_prob_svc", "outcome_xgboost", "prediction_prob_xgboost"
+        }
+
+    def test_ensemble_mode_unchanged(self, client: TestClient):
+        """Test that the default mode still returns the six models only"""
+        response = client.post("/predict/", json=self.PATIENT)
+
+        assert "prediction_prob_student" not in response.json()[0]
+
+
 class TestHealthRecordsEndpoints:
     """Test suite for health records endpoints"""
 
@@ -364,6 +632,123 @@ class TestHealthRecordsEndpoints:
         assert data["glucose"] == 120
         assert "outcome_logisticregression" in data
 
+    def test_add_record_stores_model_version(self, client: TestClient, auth_headers):
+        """Test that a stored record names the model version that scored it"""
+        response = client.post(
+            "/records/",
+            headers=auth_headers,
+            json={
+                "pregnancies": 2,
+                "glucose": 120,
+                "blood_pressure": 80,
+                "insulin": 100,
+                "bmi": 25.5,
+                "diabetic_family": 0,
+                "age": 35
+            }
+        )
+
+        assert response.status_code == 200
+        assert response.json()["model_version"] == "bundled"
+
+    def test_add_record_with_model_subset(self, client: TestClient, auth_headers):
+        """Test that only the requested models are stored; the rest stay null"""
+        response = client.post("/records/?models=xgboost", headers=auth_headers, json={
+            "pregnancies": 2, "glucose": 120, "blood_pressure": 80,
+            "insulin": 100, "bmi": 25.5, "diabetic_family": 0, "age": 35
+        })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["prediction_prob_xgboost"] is not None
+        assert data["prediction_prob_svc"] is None
+        assert data["outcome_logisticregression"] is None
+
+    def test_predictions_stored_as_small_ints(self, client: TestClient, auth_headers, test_db_session):
+        """Test that only risk_ columns are stored and the response derives label and percentage from them"""
+        data = client.post("/records/", headers=auth_headers, json={
+            "pregnancies": 2, "glucose": 120, "blood_pressure": 80,
+            "insulin": 100, "bmi": 25.5, "diabetic_family": 0, "age": 35
+        }).json()
+
+        stored = test_db_session.get(health_records, data["record_id"])
+        for name in model_files:
+            assert getattr(stored, f"risk_{name}") == round(data[f"prediction_prob_{name}"] * 100)
+            assert data[f"outcome_{name}"] == risk_label(getattr(stored, f"risk_{name}") / 10000)
+        assert not any(key.startswith("risk_") for key in data)
+
+    def test_skipped_models_filled_in_by_post(self, client: TestClient, auth_headers):
+        """Test that filling a skipped model computes and stores it, and reading never does"""
+        record_id = client.post("/records/?models=xgboost", headers=auth_headers, json={
+            "pregnancies": 2, "glucose": 120, "blood_pressure": 80,
+            "insulin": 100, "bmi": 25.5, "diabetic_family": 0, "age": 35
+        }).json()["record_id"]
+
+        read = client.get(f"/records/{record_id}?models=svc", headers=auth_headers).json()
+        response = client.post("/records/predictions/fill?models=svc", headers=auth_headers, json=[record_id])
+        filled = client.get(f"/records/{record_id}", headers=auth_headers).json()
+
+        assert read["prediction_prob_svc"] is None
+        assert response.status_code == 200
+        assert response.json()["filled"] == 1
+        assert filled["prediction_prob_svc"] is not None
+        assert filled["prediction_prob_knn"] is None
+
+    def test_fill_keeps_complete_records(self, client: TestClient, auth_headers):
+        """Test that filling every model touches only the records missing some"""
+        patient = {"pregnancies": 2, "glucose": 120, "blood_pressure": 80,
+                   "insulin": 100, "bmi": 25.5, "diabetic_family": 0, "age": 35}
+        client.post("/records/", headers=auth_headers, json=patient)
+        client.post("/records/?models=knn", headers=auth_headers, json=patient)
+
+        response = client.post("/records/predictions/fill?models=all", headers=auth_headers)
+        records = client.get("/records/my-records", headers=auth_headers).json()
+
+        assert response.json()["filled"] == 1
+        assert len(records) == 2
+        assert all(r["prediction_prob_svc"] is not None and r["glucose"] == 120 for r in records)
+
+    def test_fill_stamps_one_model_version(self, client: TestClient, auth_headers, test_db_session):
+        """Test that a row scored by an older version is re-scored whole, and a current one only filled"""
+        patient = {"pregnancies": 2, "glucose": 120, "blood_pressure": 80,
+                   "insulin": 100, "bmi": 25.5, "diabetic_family": 0, "age": 35}
+        old_id = client.post("/records/?models=xgboost", headers=auth_headers, json=patient).json()["record_id"]
+        current_id = client.post("/records/?models=xgboost", headers=auth_headers, json=patient).json()["record_id"]
+        for record_id, version in ((old_id, "v-old"), (current_id, "bundled")):
+            record = test_db_session.get(health_records, record_id)
+            record.risk_xgboost, record.model_version = 1, version
+        test_db_session.commit()
+
+        client.post("/records/predictions/fill?models=svc", headers=auth_headers)
+        old = client.get(f"/records/{old_id}", headers=auth_headers).json()
+        current = client.get(f"/records/{current_id}", headers=auth_headers).json()
+
+        assert old["model_version"] == current["model_version"] == "bundled"
+        assert old["prediction_prob_xgboost"] != 0.01
+        assert current["prediction_prob_xgboost"] == 0.01
+        assert old["prediction_prob_svc"] == current["prediction_prob_svc"] is not None
+
+    def test_fill_leaves_pending_rows_and_checks_ids(self, client: TestClient, auth_headers):
+        """Test that rows waiting for a background job are skipped and unknown IDs are a 404"""
+        client.post("/records/bulk?background=true", headers=auth_headers, json=BULK_ROWS)
+
+        response = client.post("/records/predictions/fill", headers=auth_headers)
+        missing = client.post("/records/predictions/fill", headers=auth_headers, json=[99999])
+        unknown = client.post("/records/predictions/fill?models=lightgbm", headers=auth_headers)
+
+        assert response.json()["filled"] == 0
+        assert missing.status_code == 404
+        assert unknown.status_code == 422
+
+    def test_unknown_model_subset(self, client: TestClient, auth_headers):
+        """Test that an unknown model name is a validation error"""
+        response = client.post("/records/?models=lightgbm", headers=auth_headers, json={
+            "pregnancies": 2, "glucose": 120, "blood_pressure": 80,
+            "insulin": 100, "bmi": 25.5, "diabetic_family": 0, "age": 35
+        })
+
+        assert response.status_code == 422
+
     def test_add_record_unauthorized(self, client: TestClient):
         """Test adding record without authentication"""
         response = client.post(
@@ -467,6 +852,712 @@ class TestHealthRecordsEndpoints:
         assert response.status_code == 404
 
 
+BULK_ROWS = [
+    {
+        "pregnancies": i % 5, "glucose": 90 + i, "blood_pressure": 70, "insulin": 80,
+        "bmi": 24.5, "diabetic_family": i % 2, "age": 30 + i,
+        "created_at": f"2025-01-{i + 1:02d}T08:00:00",
+    }
+    for i in range(12)
+]
+
+
+@pytest.fixture(name="job_pool")
+def job_pool_fixture(test_db_session: Session, monkeypatch):
+    """Job pool on the test database, not started until the test says so"""
+    pool = PredictionJobPool(engine_factory=test_db_session.get_bind, workers=1, batch_size=5)
+    monkeypatch.setattr(records_routes, "job_pool", pool)
+    yield pool
+    pool.stop()
+
+
+class TestBulkImport:
+    """Test suite for bulk record uploads and background prediction jobs"""
+
+    def test_bulk_predicts_inline(self, client: TestClient, auth_headers):
+        """Test that a plain bulk upload stores every row with its predictions"""
+        response = client.post("/records/bulk", headers=auth_headers, json=BULK_ROWS)
+
+        assert response.status_code == 200
+        records = client.get("/records/my-records", headers=auth_headers).json()
+        assert len(records) == len(BULK_ROWS)
+        assert all(r["prediction_status"] == "complete" for r in records)
+        assert all(r[f"prediction_prob_{name}"] is not None for r in records for name in model_files)
+
+    def test_background_bulk_returns_job(self, client: TestClient, auth_headers, job_pool):
+        """Test that a background upload stores the rows as pending and returns a job"""
+        response = client.post("/records/bulk?background=true", headers=auth_headers, json=BULK_ROWS)
+
+        assert response.status_code == 202
+        data = response.json()
+        assert data["status_url"] == f"/records/jobs/{data['job_id']}"
+        records = client.get("/records/my-records", headers=auth_headers).json()
+        assert len(records) == len(BULK_ROWS)
+        assert all(r["prediction_status"] == "pending" and r["prediction_prob_xgboost"] is None for r in records)
+        job = client.get(data["status_url"], headers=auth_headers).json()
+        assert job["status"] == "queued"
+        assert job["total"] == len(BULK_ROWS)
+        assert job["pending"] == len(BULK_ROWS)
+        assert job["progress"] == 0.0
+
+    def test_background_job_fills_predictions(self, client: TestClient, auth_headers, job_pool):
+        """Test that the workers predict every pending row and the job reports completion"""
+        response = client.post("/records/bulk?background=true&models=xgboost", headers=auth_headers, json=BULK_ROWS)
+        job_pool.start()
+        assert job_pool.join(timeout=60)
+
+        job = client.get(response.json()["status_url"], headers=auth_headers).json()
+        assert job["status"] == "complete"
+        assert job["completed"] == len(BULK_ROWS)
+        assert job["progress"] == 100.0
+        records = client.get("/records/my-records", headers=auth_headers).json()
+        assert all(r["prediction_status"] == "complete" for r in records)
+        assert all(r["prediction_prob_xgboost"] is not None and r["prediction_prob_svc"] is None for r in records)
+
+    def test_job_of_other_user_not_found(self, client: TestClient, auth_headers, job_pool, test_db_session):
+        """Test that a job id of another user, or an unknown one, answers 404"""
+        response = client.post("/records/bulk?background=true", headers=auth_headers, json=BULK_ROWS[:1])
+        job = test_db_session.get(prediction_jobs, UUID(response.json()["job_id"]))
+        job.user_id = uuid4()
+        test_db_session.add(job)
+        test_db_session.commit()
+
+        assert client.get(f"/records/jobs/{job.job_id}", headers=auth_headers).status_code == 404
+        assert client.get(f"/records/jobs/{uuid4()}", headers=auth_headers).status_code == 404
+
+    def test_reupload_skips_stored_rows(self, client: TestClient, auth_headers):
+        """Test that uploading the same rows again stores and predicts nothing"""
+        client.post("/records/bulk", headers=auth_headers, json=BULK_ROWS)
+
+        with patch("app.routes.records.predict_risk_batch") as mock_batch:
+            response = client.post("/records/bulk", headers=auth_headers, json=BULK_ROWS)
+
+        assert response.status_code == 200
+        assert response.json()["inserted"] == 0
+        assert response.json()["skipped"] == len(BULK_ROWS)
+        mock_batch.assert_not_called()
+        assert len(client.get("/records/my-records", headers=auth_headers).json()) == len(BULK_ROWS)
+
+    def test_partly_new_upload(self, client: TestClient, auth_headers):
+        """Test that only rows not stored yet are inserted, and repeats within one upload count once"""
+        client.post("/records/bulk", headers=auth_headers, json=BULK_ROWS[:5])
+
+        response = client.post("/records/bulk", headers=auth_headers, json=BULK_ROWS + BULK_ROWS[-2:])
+
+        data = response.json()
+        assert data["inserted"] == len(BULK_ROWS) - 5
+        assert data["skipped"] == 7
+        assert "7 duplicates skipped" in data["message"]
+        assert len(client.get("/records/my-records", headers=auth_headers).json()) == len(BULK_ROWS)
+
+    def test_background_reupload_needs_no_job(self, client: TestClient, auth_headers, job_pool):
+        """Test that a background upload with nothing new answers at once without a job"""
+        client.post("/records/bulk", headers=auth_headers, json=BULK_ROWS)
+
+        response = client.post("/records/bulk?background=true", headers=auth_headers, json=BULK_ROWS)
+
+        assert response.status_code == 200
+        assert response.json()["inserted"] == 0
+        assert job_pool.queued == 0
+
+    def test_edited_row_can_be_uploaded_again(self, client: TestClient, auth_headers):
+        """Test that editing a row releases its fingerprint, so the original can be re-imported"""
+        client.post("/records/bulk", headers=auth_headers, json=BULK_ROWS[:2])
+        record = client.get("/records/my-records", headers=auth_headers).json()[0]
+        client.put(f"/records/{record['record_id']}", headers=auth_headers, json={"glucose": 200})
+
+        response = client.post("/records/bulk", headers=auth_headers, json=BULK_ROWS[:2])
+
+        assert response.json()["inserted"] == 1
+
+    def test_fingerprint_depends_on_user_and_created_at(self):
+        """Test that the same features of another user or time are a different row"""
+        row = {**BULK_ROWS[0], "created_at": datetime(2025, 1, 1, 8, 0)}
+        user_id = uuid4()
+
+        fingerprint = records_routes.record_fingerprint(user_id, row)
+
+        assert fingerprint == records_routes.record_fingerprint(user_id, dict(row))
+        assert fingerprint != records_routes.record_fingerprint(uuid4(), row)
+        assert fingerprint != records_routes.record_fingerprint(user_id, {**row, "created_at": datetime(2025, 1, 2)})
+
+    def test_bulk_accepts_browser_timestamps(self, client: TestClient, auth_headers):
+        """Test that created_at as sent by the frontend (toISOString(), with a Z suffix) is accepted"""
+        rows = [{**row, "created_at": row["created_at"] + ".123Z"} for row in BULK_ROWS[:3]]
+
+        response = client.post("/records/bulk", headers=auth_headers, json=rows)
+
+        assert response.status_code == 200
+        assert len(client.get("/records/my-records", headers=auth_headers).json()) == 3
+
+    def test_bulk_reports_all_invalid_rows(self, client: TestClient, auth_headers):
+        """Test that every invalid row and field is reported and nothing is stored"""
+        rows = [dict(row) for row in BULK_ROWS[:4]]
+        rows[1]["glucose"] = 400
+        rows[3]["age"] = 0
+        rows[3]["created_at"] = "not a date"
+
+        response = client.post("/records/bulk", headers=auth_headers, json=rows)
+
+        assert response.status_code == 422
+        assert [(e["row"], e["field"]) for e in response.json()["detail"]] == [
+            (1, "glucose"), (3, "age"), (3, "created_at")
+        ]
+        assert client.get("/records/my-records", headers=auth_headers).json() == []
+
+    def test_background_bulk_rejects_unknown_model(self, client: TestClient, auth_headers, job_pool):
+        """Test that models= is validated before anything is stored"""
+        response = client.post("/records/bulk?background=true&models=nope", headers=auth_headers, json=BULK_ROWS)
+
+        assert response.status_code == 422
+        assert client.get("/records/my-records", headers=auth_headers).json() == []
+
+
+class TestUpdateRecord:
+    """Test suite for partial record updates"""
+
+    PATIENT = {"pregnancies": 2, "glucose": 120, "blood_pressure": 80,
+               "insulin": 100, "bmi": 25.5, "diabetic_family": 0, "age": 35}
+
+    def create(self, client, auth_headers, query=""):
+        return client.post(f"/records/{query}", headers=auth_headers, json=self.PATIENT).json()
+
+    def test_partial_update_predicts_from_merged_features(self, client: TestClient, auth_headers):
+        """Test that a one-field update is scored with the stored values of the other fields"""
+        record = self.create(client, auth_headers)
+        expected = client.post("/records/", headers=auth_headers, json={**self.PATIENT, "glucose": 190}).json()
+
+        response = client.put(f"/records/{record['record_id']}", headers=auth_headers, json={"glucose": 190})
+
+        assert response.status_code == 200
+        updated = response.json()
+        assert updated["glucose"] == 190
+        assert updated["age"] == 35
+        for name in model_files:
+            assert updated[f"prediction_prob_{name}"] == expected[f"prediction_prob_{name}"]
+
+    def test_created_at_only_update_skips_prediction(self, client: TestClient, auth_headers):
+        """Test that editing only created_at keeps the predictions without running the models"""
+        record = self.create(client, auth_headers)
+
+        with patch("app.routes.records.predict_risk_batch") as mock_batch:
+            response = client.put(f"/records/{record['record_id']}", headers=auth_headers,
+                                  json={"created_at": "2025-03-01T09:30:00"})
+
+        assert response.status_code == 200
+        mock_batch.assert_not_called()
+        updated = response.json()
+        assert updated["created_at"].startswith("2025-03-01T09:30:00")
+        assert updated["prediction_prob_xgboost"] == record["prediction_prob_xgboost"]
+
+    def test_unchanged_values_skip_prediction(self, client: TestClient, auth_headers):
+        """Test that sending the stored values again does not re-run the models"""
+        record = self.create(client, auth_headers)
+
+        with patch("app.routes.records.predict_risk_batch") as mock_batch:
+            response = client.put(f"/records/{record['record_id']}", headers=auth_headers,
+                                  json={"glucose": 120, "bmi": 25.5})
+
+        assert response.status_code == 200
+        mock_batch.assert_not_called()
+
+    def test_explicit_null_is_ignored(self, client: TestClient, auth_headers):
+        """Test that a null field leaves the stored value in place"""
+        record = self.create(client, auth_headers)
+
+        response = client.put(f"/records/{record['record_id']}", headers=auth_headers, json={"glucose": None})
+
+        assert response.status_code == 200
+        assert response.json()["glucose"] == 120
+
+    def test_partial_update_with_model_subset(self, client: TestClient, auth_headers):
+        """Test that models= on an update evaluates those models and clears the others"""
+        record = self.create(client, auth_headers)
+
+        updated = client.put(f"/records/{record['record_id']}?models=svc", headers=auth_headers,
+                             json={"age": 60}).json()
+
+        assert updated["prediction_prob_svc"] is not None
+        assert updated["prediction_prob_xgboost"] is None
+
+    def test_unchanged_update_fills_requested_models(self, client: TestClient, auth_headers):
+        """Test that models= on an update without feature changes only fills missing models"""
+        record = self.create(client, auth_headers, "?models=xgboost")
+
+        updated = client.put(f"/records/{record['record_id']}?models=svc", headers=auth_headers,
+                             json={"created_at": "2025-03-01T09:30:00"}).json()
+
+        assert updated["prediction_prob_svc"] is not None
+        assert updated["prediction_prob_xgboost"] == record["prediction_prob_xgboost"]
+        assert updated["prediction_prob_knn"] is None
+
+    def test_update_nonexistent_record(self, client: TestClient, auth_headers):
+        """Test updating a record that doesn't exist"""
+        response = client.put("/records/99999", headers=auth_headers, json={"glucose": 150})
+
+        assert response.status_code == 404
+
+
+class TestBatchRecordEdits:
+    """Test suite for PATCH and DELETE /records/batch"""
+
+    PATIENT = {"pregnancies": 2, "glucose": 120, "blood_pressure": 80,
+               "insulin": 100, "bmi": 25.5, "diabetic_family": 0, "age": 35}
+
+    def create(self, client, auth_headers, count=3):
+        return [client.post("/records/", headers=auth_headers, json=self.PATIENT).json() for _ in range(count)]
+
+    def other_users_record(self, test_db_session):
+        record = health_records(user_id=uuid4(), **self.PATIENT)
+        test_db_session.add(record)
+        test_db_session.commit()
+        return record.record_id
+
+    def test_patch_batch_merges_and_repredicts(self, client: TestClient, auth_headers):
+        """Test that changed rows are re-predicted from their merged features in one pass"""
+        first, second, third = self.create(client, auth_headers)
+        expected = client.post("/records/", headers=auth_headers, json={**self.PATIENT, "glucose": 190}).json()
+
+        with patch("app.routes.records.predict_risk_batch", wraps=records_routes.predict_risk_batch) as batch:
+            response = client.patch("/records/batch", headers=auth_headers, json=[
+                {"record_id": first["record_id"], "glucose": 190},
+                {"record_id": second["record_id"], "glucose": 190},
+                {"record_id": third["record_id"], "created_at": "2024-12-31T10:00:00"},
+            ])
+
+        assert response.status_code == 200
+        batch.assert_called_once()
+        assert len(batch.call_args.args[0]) == 2
+        updated = {r["record_id"]: r for r in response.json()}
+        assert len(updated) == 3
+        for record in (first, second):
+            assert updated[record["record_id"]]["glucose"] == 190
+            assert updated[record["record_id"]]["age"] == 35
+            assert updated[record["record_id"]]["prediction_prob_svc"] == expected["prediction_prob_svc"]
+        assert updated[third["record_id"]]["created_at"].startswith("2024-12-31T10:00:00")
+        assert updated[third["record_id"]]["prediction_prob_svc"] == third["prediction_prob_svc"]
+
+    def test_patch_batch_model_subset(self, client: TestClient, auth_headers):
+        """Test that models= evaluates only those models on the re-predicted rows"""
+        record, = self.create(client, auth_headers, count=1)
+
+        updated = client.patch("/records/batch?models=xgboost", headers=auth_headers,
+                               json=[{"record_id": record["record_id"], "age": 60}]).json()
+
+        assert updated[0]["prediction_prob_xgboost"] is not None
+        assert updated[0]["prediction_prob_knn"] is None
+
+    def test_patch_batch_other_users_record_changes_nothing(self, client: TestClient, auth_headers,
+                                                          test_db_session):
+        """Test that a batch naming a record of another user fails as a whole"""
+        record, = self.create(client, auth_headers, count=1)
+        foreign_id = self.other_users_record(test_db_session)
+
+        response = client.patch("/records/batch", headers=auth_headers, json=[
+            {"record_id": record["record_id"], "glucose": 190},
+            {"record_id": foreign_id, "glucose": 190},
+        ])
+
+        assert response.status_code == 404
+        assert str(foreign_id) in response.json()["detail"]
+        assert client.get(f"/records/{record['record_id']}", headers=auth_headers).json()["glucose"] == 120
+
+    def test_patch_batch_duplicate_ids(self, client: TestClient, auth_headers):
+        """Test that naming a record twice is a validation error"""
+        record, = self.create(client, auth_headers, count=1)
+
+        response = client.patch("/records/batch", headers=auth_headers, json=[
+            {"record_id": record["record_id"], "glucose": 130},
+            {"record_id": record["record_id"], "glucose": 140},
+        ])
+
+        assert response.status_code == 422
+
+    def test_delete_batch(self, client: TestClient, auth_headers):
+        """Test that many records are deleted in one request"""
+        records = self.create(client, auth_headers)
+
+        response = client.request("DELETE", "/records/batch", headers=auth_headers,
+                                  json=[r["record_id"] for r in records[:2]])
+
+        assert response.status_code == 200
+        assert "2 records deleted" in response.json()["detail"]
+        remaining = client.get("/records/my-records", headers=auth_headers).json()
+        assert [r["record_id"] for r in remaining] == [records[2]["record_id"]]
+
+    def test_delete_batch_other_users_record_deletes_nothing(self, client: TestClient, auth_headers,
+                                                           test_db_session):
+        """Test that a delete naming a record of another user deletes nothing"""
+        records = self.create(client, auth_headers, count=2)
+        foreign_id = self.other_users_record(test_db_session)
+
+        response = client.request("DELETE", "/records/batch", headers=auth_headers,
+                                  json=[records[0]["record_id"], foreign_id])
+
+        assert response.status_code == 404
+        assert len(client.get("/records/my-records", headers=auth_headers).json()) == 2
+        assert test_db_session.get(health_records, foreign_id) is not None
+
+    def test_delete_batch_empty(self, client: TestClient, auth_headers):
+        """Test that an empty batch is a validation error"""
+        response = client.request("DELETE", "/records/batch", headers=auth_headers, json=[])
+
+        assert response.status_code == 422
+
+    def test_batch_unauthorized(self, client: TestClient):
+        """Test batch edits without authentication"""
+        assert client.patch("/records/batch", json=[{"record_id": 1, "glucose": 100}]).status_code == 401
+        assert client.request("DELETE", "/records/batch", json=[1]).status_code == 401
+
+
+class TestRecordsResponse:
+    """Test suite for the tuple-encoded, compressed record collections"""
+
+    def upload(self, client, auth_headers, models=None):
+        url = "/records/bulk" + (f"?models={models}" if models else "")
+        assert client.post(url, headers=auth_headers, json=BULK_ROWS).status_code == 200
+
+    def test_same_fields_as_single_record(self, client: TestClient, auth_headers):
+        """Test that each my-records entry equals the single-record response"""
+        self.upload(client, auth_headers, models="xgboost")
+
+        records = client.get("/records/my-records", headers=auth_headers).json()
+
+        assert len(records) == len(BULK_ROWS)
+        for record in records:
+            assert record == client.get(f"/records/{record['record_id']}", headers=auth_headers).json()
+        assert records[0]["prediction_prob_svc"] is None
+
+    def test_large_collection_compressed(self, client: TestClient, auth_headers):
+        """Test that a large body is gzipped for clients that accept it, and sent plain otherwise"""
+        self.upload(client, auth_headers)
+
+        gzipped = client.get("/records/my-records", headers={**auth_headers, "Accept-Encoding": "gzip"})
+        plain = client.get("/records/my-records", headers={**auth_headers, "Accept-Encoding": "identity"})
+
+        assert gzipped.headers["content-encoding"] == "gzip"
+        assert "content-encoding" not in plain.headers
+        assert int(gzipped.headers["content-length"]) < int(plain.headers["content-length"])
+        assert gzipped.json() == plain.json()
+        assert "Accept-Encoding" in plain.headers["vary"]
+
+    def test_small_collection_not_compressed(self, client: TestClient, auth_headers):
+        """Test that an empty record list is sent as is"""
+        response = client.get("/records/my-records", headers={**auth_headers, "Accept-Encoding": "gzip"})
+
+        assert response.json() == []
+        assert "content-encoding" not in response.headers
+
+    def test_fill_then_encode(self, client: TestClient, auth_headers):
+        """Test that filled models are encoded with the rest of the row"""
+        self.upload(client, auth_headers, models="xgboost")
+
+        client.post("/records/predictions/fill?models=svc", headers=auth_headers)
+        records = client.get("/records/my-records", headers=auth_headers).json()
+
+        assert all(r["prediction_prob_svc"] is not None and r["outcome_svc"] for r in records)
+        assert all(r["prediction_prob_knn"] is None for r in records)
+
+
+class TestConditionalGet:
+    """Test suite for ETags and 304s on my-records"""
+
+    PATIENT = {"pregnancies": 2, "glucose": 120, "blood_pressure": 80,
+               "insulin": 100, "bmi": 25.5, "diabetic_family": 0, "age": 35}
+
+    def etag(self, client, auth_headers, query=""):
+        response = client.get(f"/records/my-records{query}", headers=auth_headers)
+        assert response.status_code == 200
+        return response.headers["etag"]
+
+    def test_etag_and_cache_headers(self, client: TestClient, auth_headers):
+        """Test that the collection carries a weak ETag and must be revalidated"""
+        response = client.get("/records/my-records", headers=auth_headers)
+
+        assert response.headers["etag"].startswith('W/"')
+        assert response.headers["cache-control"] == "private, no-cache"
+
+    def test_not_modified_without_reading_rows(self, client: TestClient, auth_headers, monkeypatch):
+        """Test that a matching If-None-Match gets a 304 before any row is read or encoded"""
+        client.post("/records/", headers=auth_headers, json=self.PATIENT)
+        etag = self.etag(client, auth_headers)
+
+        def fail(*args):
+            raise AssertionError("rows serialized for a 304")
+
+        monkeypatch.setattr(records_routes, "records_json", fail)
+        response = client.get("/records/my-records", headers={**auth_headers, "If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    def test_every_write_changes_etag(self, client: TestClient, auth_headers):
+        """Test that adding, editing, deleting and bulk uploading all give a new ETag"""
+        seen = [self.etag(client, auth_headers)]
+        record_id = client.post("/records/", headers=auth_headers, json=self.PATIENT).json()["record_id"]
+        seen.append(self.etag(client, auth_headers))
+        client.put(f"/records/{record_id}", headers=auth_headers, json={"glucose": 130})
+        seen.append(self.etag(client, auth_headers))
+        client.patch("/records/batch", headers=auth_headers, json=[{"record_id": record_id, "age": 40}])
+        seen.append(self.etag(client, auth_headers))
+        client.post("/records/bulk", headers=auth_headers, json=BULK_ROWS)
+        seen.append(self.etag(client, auth_headers))
+        client.delete(f"/records/{record_id}", headers=auth_headers)
+        seen.append(self.etag(client, auth_headers))
+
+        assert len(set(seen)) == len(seen)
+
+    def test_unchanged_put_keeps_etag(self, client: TestClient, auth_headers):
+        """Test that a PUT that changes nothing does not invalidate the collection"""
+        record_id = client.post("/records/", headers=auth_headers, json=self.PATIENT).json()["record_id"]
+        etag = self.etag(client, auth_headers)
+
+        client.put(f"/records/{record_id}", headers=auth_headers, json={"glucose": 120})
+
+        assert self.etag(client, auth_headers) == etag
+
+    def test_fill_changes_etag(self, client: TestClient, auth_headers):
+        """Test that reading never changes the collection, and filling skipped models does"""
+        client.post("/records/?models=xgboost", headers=auth_headers, json=self.PATIENT)
+        etag = self.etag(client, auth_headers)
+
+        read = client.get("/records/my-records?models=svc", headers={**auth_headers, "If-None-Match": etag})
+        assert read.status_code == 304
+
+        client.post("/records/predictions/fill?models=svc", headers=auth_headers)
+        response = client.get("/records/my-records", headers={**auth_headers, "If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.json()[0]["prediction_prob_svc"] is not None
+        assert response.headers["etag"] != etag
+
+    def test_background_job_changes_etag(self, client: TestClient, auth_headers, job_pool, test_db_session):
+        """Test that predictions stored by a background job give a new ETag"""
+        client.post("/records/bulk?background=true", headers=auth_headers, json=BULK_ROWS)
+        pending = self.etag(client, auth_headers)
+
+        job_pool.start()
+        assert job_pool.join(timeout=30)
+        # The job committed through its own session; requests here share one, unlike a real server
+        test_db_session.expire_all()
+
+        assert self.etag(client, auth_headers) != pending
+
+
+class TestSeries:
+    """Test suite for the downsampled records series"""
+
+    PATIENT = {"pregnancies": 2, "glucose": 120, "blood_pressure": 80,
+               "insulin": 100, "bmi": 25.5, "diabetic_family": 0, "age": 35}
+
+    def test_series_shape(self, client: TestClient, auth_headers):
+        """Test that the series summarises the user's records per bucket"""
+        for glucose in (100, 140):
+            client.post("/records/", headers=auth_headers, json={**self.PATIENT, "glucose": glucose})
+
+        response = client.get("/records/series?metric=glucose&buckets=1", headers=auth_headers)
+
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["metric"], body["buckets"], body["count"]) == ("glucose", 1, 2)
+        point = body["points"][0]
+        assert (point["count"], point["min"], point["max"], point["mean"]) == (2, 100, 140, 120.0)
+        assert {"start", "end"} <= set(point)
+
+    def test_points_bounded_by_buckets(self, client: TestClient, auth_headers):
+        """Test that a bulk upload comes back as at most `buckets` points"""
+        client.post("/records/bulk", headers=auth_headers, json=BULK_ROWS)
+
+        body = client.get("/records/series?metric=risk_xgboost&buckets=1", headers=auth_headers).json()
+
+        assert body["count"] == len(BULK_ROWS)
+        assert len(body["points"]) == 1
+        assert 0 <= body["points"][0]["min"] <= body["points"][0]["max"] <= 100
+
+    def test_invalid_parameters(self, client: TestClient, auth_headers):
+        """Test that an unknown metric or an out of range bucket count is rejected"""
+        for query in ("metric=outcome_xgboost", "metric=glucose&buckets=0",
+                      "metric=glucose&buckets=100000", "buckets=10"):
+            response = client.get(f"/records/series?{query}", headers=auth_headers)
+            assert response.status_code == 422, query
+
+    def test_requires_auth(self, client: TestClient):
+        """Test that the series is only available to a logged-in user"""
+        assert client.get("/records/series?metric=glucose").status_code == 401
+
+    def test_conditional_get(self, client: TestClient, auth_headers):
+        """Test that the series is revalidated with the records ETag"""
+        client.post("/records/", headers=auth_headers, json=self.PATIENT)
+        etag = client.get("/records/series?metric=bmi", headers=auth_headers).headers["etag"]
+
+        response = client.get("/records/series?metric=bmi", headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == 304
+
+        other = client.get("/records/series?metric=age", headers={**auth_headers, "If-None-Match": etag})
+        assert other.status_code == 200
+
+        client.post("/records/", headers=auth_headers, json=self.PATIENT)
+        changed = client.get("/records/series?metric=bmi", headers={**auth_headers, "If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.json()["count"] == 2
+
+
+class TestMetricsEndpoint:
+    """Test suite for the Prometheus metrics endpoint"""
+
+    def test_metrics_records_route_and_status(self, client: TestClient, auth_headers):
+        """Test that requests show up by route template and status"""
+        client.get("/records/my-records", headers=auth_headers)
+        client.delete("/records/99999", headers=auth_headers)
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert 'http_responses_total{method="GET",route="/records/my-records",status="200"}' in body
+        assert 'http_responses_total{method="DELETE",route="/records/{record_id}",status="404"}' in body
+        assert 'stage_duration_seconds_count{stage="get_current_user",model=""}' in body
+        assert 'stage_duration_seconds_count{stage="db_commit",model=""}' in body
+
+
+class TestAdminProfilesEndpoint:
+    """Test suite for the profiling admin endpoint"""
+
+    def test_hidden_when_profiling_disabled(self, client: TestClient):
+        """Test that the admin endpoint is a 404 unless profiling is configured"""
+        response = client.get("/admin/profiles", headers={"X-Admin-Token": "anything"})
+
+        assert response.status_code == 404
+
+    @patch('app.routes.admin.ADMIN_TOKEN', 'admin-secret')
+    @patch('app.profiling.PROFILING_ENABLED', True)
+    def test_requires_admin_token(self, client: TestClient):
+        """Test that a wrong admin token is rejected"""
+        response = client.get("/admin/profiles", headers={"X-Admin-Token": "wrong"})
+
+        assert response.status_code == 403
+
+    @patch('app.routes.admin.ADMIN_TOKEN', 'admin-secret')
+    @patch('app.profiling.PROFILING_ENABLED', True)
+    def test_lists_stored_profiles(self, client: TestClient):
+        """Test that stored profiles are returned newest first"""
+        with patch('app.profiling.profiles', deque([{"path": "/old"}, {"path": "/new"}], maxlen=5)):
+            response = client.get("/admin/profiles", headers={"X-Admin-Token": "admin-secret"})
+
+        assert response.status_code == 200
+        assert [p["path"] for p in response.json()] == ["/new", "/old"]
+
+
+class TestAdminModelsEndpoint:
+    """Test suite for the model version admin endpoints"""
+
+    @patch('app.routes.admin.ADMIN_TOKEN', 'admin-secret')
+    def test_profiles_hidden_while_profiling_disabled(self, client: TestClient):
+        """Test that an admin token alone does not expose the profile routes"""
+        response = client.get("/admin/profiles", headers={"X-Admin-Token": "admin-secret"})
+
+        assert response.status_code == 404
+
+    @patch('app.routes.admin.ADMIN_TOKEN', 'admin-secret')
+    def test_lists_versions(self, client: TestClient):
+        """Test that the serving and stored versions are reported"""
+        response = client.get("/admin/models", headers={"X-Admin-Token": "admin-secret"})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert "bundled" in data["versions"]
+        assert data["active"] == "bundled"
+
+    @patch('app.routes.admin.ADMIN_TOKEN', 'admin-secret')
+    def test_activate_unknown_version(self, client: TestClient):
+        """Test that activating a missing version is a 404"""
+        response = client.post("/admin/models/v999/activate", headers={"X-Admin-Token": "admin-secret"})
+
+        assert response.status_code == 404
+
+    @patch('app.routes.admin.ADMIN_TOKEN', 'admin-secret')
+    def test_activate_while_swapping(self, client: TestClient):
+        """Test that a second swap request is refused while one runs"""
+        with patch('app.ml.inferences.model_swapper.activate_in_background', return_value=False):
+            response = client.post("/admin/models/bundled/activate", headers={"X-Admin-Token": "admin-secret"})
+
+        assert response.status_code == 409
+
+
+class TestAdminShadowEndpoint:
+    """Test suite for the shadow-mode admin endpoints"""
+
+    @patch('app.routes.admin.ADMIN_TOKEN', 'admin-secret')
+    def test_shadow_off_by_default(self, client: TestClient):
+        """Test that no candidate is shadowed unless configured"""
+        response = client.get("/admin/shadow", headers={"X-Admin-Token": "admin-secret"})
+
+        assert response.status_code == 200
+        assert response.json()["version"] is None
+
+    @patch('app.routes.admin.ADMIN_TOKEN', 'admin-secret')
+    def test_start_unknown_version(self, client: TestClient):
+        """Test that shadowing a missing version is a 404"""
+        response = client.post("/admin/shadow/v999", headers={"X-Admin-Token": "admin-secret"})
+
+        assert response.status_code == 404
+
+    @patch('app.routes.admin.ADMIN_TOKEN', 'admin-secret')
+    def test_shadow_bundled_against_itself(self, client: TestClient):
+        """Test that shadowing the serving models agrees fully with them"""
+        from app.ml.inferences import shadow
+        headers = {"X-Admin-Token": "admin-secret"}
+        response = client.post("/admin/shadow/bundled?sample_rate=1", headers=headers)
+        assert response.status_code == 200
+        try:
+            client.post("/predict/", json={
+                "pregnancies": 2, "glucose": 120, "blood_pressure": 80,
+                "insulin": 100, "bmi": 25.5, "diabetic_family": 0, "age": 35
+            })
+            assert shadow.drain()
+            models = client.get("/admin/shadow", headers=headers).json()["models"]
+        finally:
+            client.delete("/admin/shadow", headers=headers)
+
+        assert set(models) == set(model_files)
+        assert all(m["label_agreement"] == 1.0 for m in models.values())
+
+
+class TestHealthEndpoints:
+    """Test suite for the liveness and readiness probes"""
+
+    def test_live(self, client: TestClient):
+        """Test that liveness answers without any warm-up"""
+        response = client.get("/health/live")
+
+        assert response.status_code == 200
+        assert response.json() == {"status": "alive"}
+
+    def test_ready_is_503_until_warmed(self, client: TestClient):
+        """Test that readiness fails while the warm-up has not finished"""
+        with patch('app.warmup.startup_warmup', Warmup()):
+            response = client.get("/health/ready")
+
+        assert response.status_code == 503
+        assert response.json()["status"] == "pending"
+
+    def test_ready_after_warmup(self, client: TestClient, test_engine):
+        """Test that readiness reports model and DB timings once warm"""
+        startup = Warmup(engine_factory=lambda: test_engine)
+        with patch('app.warmup.WARMUP_SINGLE_ROWS', 5), patch('app.warmup.WARMUP_BATCHES', 1):
+            startup.run()
+        with patch('app.warmup.startup_warmup', startup):
+            response = client.get("/health/ready")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "ready"
+        assert set(data["models"]["warmup"]) == set(model_files)
+        assert data["database"]["status"] == "ok"
+
+
 class TestCORSConfiguration:
     """Test suite for CORS configuration"""
 
@@ -4,7 +4,8 @@ from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
 from uuid import UUID, uuid4
 from fastapi import HTTPException
-from app.routes.auth import create_access_token, get_current_user
+from sqlalchemy.exc import IntegrityError
+from app.routes.auth import create_access_token, get_current_user, hash_refresh_token, conflicting_column
 from app.models import users
 
 
@@ -217,3 +218,52 @@ class TestAuthHelpers:
         # But both should verify the original password
         assert bcrypt.verify(password, hash1)
         assert bcrypt.verify(password, hash2)
+
+    def test_refresh_token_hash_is_deterministic(self):
+        """Test that refresh token hashing is stable and does not store the raw token"""
+        token = "some-random-refresh-token"
+
+        assert hash_refresh_token(token) == hash_refresh_token(token)
+        assert hash_refresh_token(token) != token
+        assert hash_refresh_token(token) != hash_refresh_token(token + "x")
+
+
+class TestConflictingColumn:
+    """Test suite for naming the unique column a signup violated"""
+
+    def integrity_error(self, orig) -> IntegrityError:
+        return IntegrityError("INSERT INTO users ...", {}, orig)
+
+    def postgres_error(self, constraint_name=None, message_detail=None, column_name=None) -> IntegrityError:
+        orig = Exception("duplicate key value violates unique constraint")
+        orig.diag = Mock(constraint_name=constraint_name, message_detail=message_detail, column_name=column_name)
+        return self.integrity_error(orig)
+
+    def test_postgres_index_name(self):
+        """Test that psycopg2's constraint name is looked up among the models' indexes"""
+        error = self.postgres_error("ix_users_email", "Key (username)=(x) already exists.")
+
+        assert conflicting_column(error) == "email"
+
+    def test_postgres_constraint_named_otherwise(self):
+        """Test that a constraint the models do not name is identified by the key in the detail"""
+        error = self.postgres_error("users_username_key", "Key (username)=(testuser) already exists.")
+
+        assert conflicting_column(error) == "username"
+
+    def test_postgres_column_name(self):
+        """Test that a column named in the diagnostics is used as is"""
+        assert conflicting_column(self.postgres_error("users_email_key", column_name="email")) == "email"
+
+    def test_sqlite_column(self):
+        """Test that SQLite's message gives the column"""
+        orig = Exception("UNIQUE constraint failed: users.username")
+
+        assert conflicting_column(self.integrity_error(orig)) == "username"
+
+    def test_unrecognised(self):
+        """Test that other violations are not attributed to a column"""
+        assert conflicting_column(self.integrity_error(Exception("NOT NULL constraint failed: users.email"))) is None
+        assert conflicting_column(self.integrity_error(Exception("UNIQUE constraint failed: users.email, users.x"))) is None
+        assert conflicting_column(self.postgres_error("fk_records_user", "Key (user_id)")) is None
+        assert conflicting_column(self.postgres_error()) is None
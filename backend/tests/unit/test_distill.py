@@ -0,0 +1,96 @@
+import os
+import joblib
+import numpy as np
+import pytest
+from app.ml import inferences
+from app.ml.distill import StudentModel, distill, read_training_rows
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "..", "notebook", "diabetes.csv")
+
+
+class GlucoseTeacher:
+    """Smooth stand-in teacher: risk rises with glucose"""
+
+    def predict_proba(self, X):
+        risk = 1 / (1 + np.exp(-(np.asarray(X)[:, 1] - 140) / 20))
+        return np.column_stack([1 - risk, risk])
+
+
+@pytest.fixture(scope="module")
+def distilled():
+    """A small student fitted to the stand-in teacher"""
+    return distill({"glucose": GlucoseTeacher()}, CSV_PATH, synthetic=2000, holdout=500, n_estimators=40)
+
+
+class TestDistill:
+    """Test suite for ensemble distillation"""
+
+    def test_training_rows_are_within_api_bounds(self):
+        """Test that missing BMI/age values are lifted into the API range"""
+        rows = read_training_rows(CSV_PATH)
+
+        assert len(rows) == 768
+        assert min(r["bmi"] for r in rows) >= 10
+        assert {r["diabetic_family"] for r in rows} == {0.0, 1.0}
+
+    def test_student_tracks_teacher(self, distilled):
+        """Test that the student reproduces the teacher on held-out rows"""
+        _, report = distilled
+
+        assert report["trees"] == 40
+        assert report["mean_abs_diff"] < 0.05
+        assert report["label_agreement"] > 0.9
+
+    def test_predict_proba_shape_and_range(self, distilled):
+        """Test that the student answers like a classifier"""
+        student, _ = distilled
+        X = inferences.feature_matrix(inferences.CANARY_ROWS)
+
+        proba = student.predict_proba(X)
+
+        assert proba.shape == (len(inferences.CANARY_ROWS), 2)
+        assert np.allclose(proba.sum(axis=1), 1.0)
+        assert (proba >= 0).all() and (proba <= 1).all()
+
+    def test_single_row_matches_batch(self, distilled):
+        """Test that row-by-row and batched scoring agree"""
+        student, _ = distilled
+        X = inferences.feature_matrix(inferences.CANARY_ROWS)
+
+        batched = student.predict_proba(X)[:, 1]
+        single = [student.predict_proba(X[i:i + 1])[0, 1] for i in range(len(X))]
+
+        assert np.allclose(batched, single)
+
+    def test_pickle_round_trip(self, distilled, tmp_path):
+        """Test that a saved student loads and scores identically"""
+        student, _ = distilled
+        path = tmp_path / "student.pkl"
+        joblib.dump(student, path)
+        X = inferences.feature_matrix(inferences.CANARY_ROWS)
+
+        loaded = joblib.load(path)
+
+        assert isinstance(loaded, StudentModel)
+        assert np.array_equal(loaded.predict_proba(X), student.predict_proba(X))
+
+
+class TestBundledStudent:
+    """Test suite for the student shipped with the app"""
+
+    def test_bundled_student_agrees_with_ensemble(self):
+        """Test that the bundled student is close to the six-model mean on the canary rows"""
+        X = inferences.feature_matrix(inferences.CANARY_ROWS)
+        ensemble = np.mean([m.predict_proba(X)[:, 1] for m in inferences.load_models().values()], axis=0)
+
+        student = inferences.load_student().predict_proba(X)[:, 1]
+
+        assert np.abs(student - ensemble).max() < 0.2
+
+    def test_predict_student_output(self):
+        """Test that predict_student returns one label and probability"""
+        result = inferences.predict_student(inferences.CANARY_ROWS[1])
+
+        assert set(result) == {"outcome_student", "prediction_prob_student"}
+        assert result["outcome_student"] in ("Low Risk", "Medium Risk", "High Risk")
+        assert 0 <= result["prediction_prob_student"] <= 100
@@ -0,0 +1,112 @@
+import math
+import pytest
+from app.ml.drift import (
+    FeatureStats, DriftMonitor, FEATURE_BINS, bin_index, psi, load_reference, build_reference
+)
+
+
+class TestFeatureStats:
+    """Test suite for the streaming per-feature summary"""
+
+    def test_running_mean_and_std_match_batch(self):
+        """Test that Welford updates agree with a two-pass computation"""
+        values = [85, 120, 148, 99, 183, 137, 101]
+        stats = FeatureStats(0, 300, 15)
+        for v in values:
+            stats.observe(v)
+
+        mean = sum(values) / len(values)
+        std = math.sqrt(sum((v - mean) ** 2 for v in values) / (len(values) - 1))
+        assert stats.mean == pytest.approx(mean)
+        assert stats.std == pytest.approx(std)
+        assert sum(stats.counts) == len(values)
+
+    def test_memory_is_constant(self):
+        """Test that the histogram does not grow with observations"""
+        stats = FeatureStats(0, 20, 10)
+        for i in range(1000):
+            stats.observe(i % 25)
+
+        assert len(stats.counts) == 10
+
+
+class TestBinIndex:
+    """Test suite for fixed-bin assignment"""
+
+    def test_clamps_out_of_range(self):
+        """Test that values outside the range land in the edge bins"""
+        assert bin_index(-5, 10, 70, 12) == 0
+        assert bin_index(500, 10, 70, 12) == 11
+
+    def test_equal_width(self):
+        """Test equal-width bin assignment inside the range"""
+        assert bin_index(15, 10, 70, 12) == 1
+        assert bin_index(0.5, 0, 1, 2) == 1
+
+
+class TestPSI:
+    """Test suite for the Population Stability Index"""
+
+    def test_identical_distributions(self):
+        """Test that identical histograms have zero PSI"""
+        assert psi([10, 20, 30], [1, 2, 3]) == pytest.approx(0.0)
+
+    def test_shifted_distribution(self):
+        """Test that a clear shift gives a large PSI"""
+        assert psi([80, 15, 5], [5, 15, 80]) > 0.25
+
+    def test_empty_live_histogram(self):
+        """Test that no observations report no drift"""
+        assert psi([10, 20], [0, 0]) == 0.0
+
+
+class TestDriftMonitor:
+    """Test suite for the drift monitor"""
+
+    def test_summary_reports_reference_and_live(self):
+        """Test that summaries include live and reference stats for every feature"""
+        monitor = DriftMonitor(load_reference())
+        monitor.observe({
+            "pregnancies": 2, "glucose": 120, "blood_pressure": 80, "insulin": 100,
+            "bmi": 25.5, "diabetic_family": 0, "age": 35
+        })
+
+        summary = monitor.summary()
+
+        assert set(summary) == set(FEATURE_BINS)
+        assert summary["glucose"]["count"] == 1
+        assert summary["glucose"]["mean"] == 120
+        assert summary["glucose"]["reference_mean"] is not None
+
+    def test_render_metrics(self):
+        """Test that gauges are rendered per feature"""
+        monitor = DriftMonitor({})
+        text = "\n".join(monitor.render_metrics())
+
+        assert 'feature_drift_psi{feature="bmi"}' in text
+        assert 'feature_observations_total{feature="age"} 0' in text
+
+
+class TestReference:
+    """Test suite for the shipped reference statistics"""
+
+    def test_reference_matches_training_csv(self, tmp_path):
+        """Test that the reference summary is computed from the raw CSV columns"""
+        csv_path = tmp_path / "diabetes.csv"
+        csv_path.write_text(
+            "Pregnancies,Glucose,BloodPressure,SkinThickness,Insulin,BMI,DiabetesPedigreeFunction,Age,Outcome\n"
+            "6,148,72,35,0,33.6,0.627,50,1\n"
+            "1,85,66,29,0,26.6,0.351,31,0\n"
+        )
+
+        reference = build_reference(str(csv_path))
+
+        assert reference["glucose"]["mean"] == pytest.approx(116.5)
+        assert reference["diabetic_family"]["histogram"] == [1, 1]
+
+    def test_shipped_reference_covers_all_features(self):
+        """Test that the committed reference file has every feature"""
+        reference = load_reference()
+
+        assert set(reference) == set(FEATURE_BINS)
+        assert sum(reference["age"]["histogram"]) == 768
@@ -0,0 +1,93 @@
+import pytest
+from datetime import date
+from uuid import uuid4
+from app.etags import CACHE_CONTROL, bump_records_version, etag_matches, not_modified, records_etag
+from app.models import users
+
+
+def make_user(session, **fields):
+    user = users(email=f"{uuid4().hex}@example.com", username=uuid4().hex[:12], password_hash="x",
+                 first_name="A", last_name="B", phone_number="1234567890", date_of_birth=date(1990, 1, 1), **fields)
+    session.add(user)
+    session.commit()
+    return user
+
+
+class TestRecordsVersion:
+    """Test suite for the per-user change counter"""
+
+    def test_new_user_starts_at_zero(self, session):
+        """Test that a new user has records_version 0"""
+        assert make_user(session).records_version == 0
+
+    def test_bump_increments_only_that_user(self, session):
+        """Test that a bump adds one to the given user and leaves others alone"""
+        user, other = make_user(session), make_user(session)
+
+        bump_records_version(session, user.user_id)
+        bump_records_version(session, user.user_id)
+        session.commit()
+        session.refresh(user)
+        session.refresh(other)
+
+        assert user.records_version == 2
+        assert other.records_version == 0
+
+    def test_bump_updates_loaded_user(self, session):
+        """Test that the user object already in the session sees the new version without a reload"""
+        user = make_user(session)
+        session.expire_on_commit = False
+
+        bump_records_version(session, user.user_id)
+        session.commit()
+
+        assert user.records_version == 1
+
+
+class TestRecordsEtag:
+    """Test suite for collection ETags"""
+
+    def test_weak_and_stable(self):
+        """Test that the same user, version and variant give the same weak ETag"""
+        user = users(user_id=uuid4(), records_version=3)
+
+        assert records_etag(user).startswith('W/"')
+        assert records_etag(user) == records_etag(user)
+
+    def test_changes_with_version_user_and_variant(self):
+        """Test that the version, the user and the variant all change the ETag"""
+        user_id = uuid4()
+        etag = records_etag(users(user_id=user_id, records_version=3))
+
+        assert records_etag(users(user_id=user_id, records_version=4)) != etag
+        assert records_etag(users(user_id=uuid4(), records_version=3)) != etag
+        assert records_etag(users(user_id=user_id, records_version=3), "glucose", 100) != etag
+
+
+class TestEtagMatches:
+    """Test suite for If-None-Match comparison"""
+
+    ETAG = 'W/"abc"'
+
+    @pytest.mark.parametrize("header, expected", [
+        (None, False),
+        ("", False),
+        ('W/"abc"', True),
+        ('"abc"', True),
+        ('"other", W/"abc"', True),
+        ('"other"', False),
+        ("*", True),
+        ("abc", False),
+    ])
+    def test_weak_comparison(self, header, expected):
+        """Test that tags match ignoring W/, in lists and for *"""
+        assert etag_matches(header, self.ETAG) is expected
+
+    def test_not_modified_response(self):
+        """Test that the 304 carries the ETag and cache headers but no body"""
+        response = not_modified(self.ETAG)
+
+        assert response.status_code == 304
+        assert response.body == b""
+        assert response.headers["etag"] == self.ETAG
+        assert response.headers["cache-control"] == CACHE_CONTROL
@@ -0,0 +1,117 @@
+import pytest
+import numpy as np
+from pydantic import ValidationError
+from app.features import (
+    FEATURES, FEATURE_NAMES, MODEL_COLUMNS, decode_matrix, decode_rows, encode_rows, feature_matrix,
+    field_rules, model_matrix, patient_model, row_dtype
+)
+from app.schemas import PatientData, PatientDataUpdate, PatientDataWithCreatedAt
+from app.validators import PATIENT_FIELD_RULES
+from app.ml.drift import FEATURE_BINS
+from app.ml.distill import INPUT_BOUNDS, jittered_inputs
+
+ROWS = [
+    {"pregnancies": 2, "glucose": 120, "blood_pressure": 80, "insulin": 100,
+     "bmi": 25.5, "diabetic_family": 0, "age": 35},
+    {"pregnancies": 20, "glucose": 300, "blood_pressure": 200, "insulin": 1000,
+     "bmi": 33.3, "diabetic_family": 1, "age": 120},
+]
+
+
+class TestGeneratedSchemas:
+    """Test suite for the Pydantic models generated from the feature spec"""
+
+    @pytest.mark.parametrize("model", [PatientData, PatientDataWithCreatedAt, PatientDataUpdate])
+    def test_every_feature_is_a_field_with_its_bounds(self, model):
+        """Test that each schema has one field per feature with the spec's bounds"""
+        schema = model.model_json_schema()["properties"]
+
+        for feature in FEATURES:
+            prop = schema[feature.name]
+            bounds = prop["anyOf"][0] if "anyOf" in prop else prop
+            assert (bounds["minimum"], bounds["maximum"]) == (feature.min, feature.max)
+
+    def test_update_fields_are_optional(self):
+        """Test that the update schema accepts any subset of features"""
+        assert PatientDataUpdate(glucose=130).dict(exclude_unset=True) == {"glucose": 130}
+
+    def test_extra_fields(self):
+        """Test that extra fields are added next to the features"""
+        model = patient_model("WithNote", note=(str, ...))
+
+        with pytest.raises(ValidationError):
+            model(**ROWS[0])
+        assert model(**ROWS[0], note="x").note == "x"
+
+
+class TestSharedSpec:
+    """Test suite for the layers that take their feature list from the spec"""
+
+    def test_validator_rules(self):
+        """Test that the validator rules are the spec's bounds"""
+        assert PATIENT_FIELD_RULES == field_rules()
+        assert list(PATIENT_FIELD_RULES) == list(FEATURE_NAMES)
+        assert PATIENT_FIELD_RULES["bmi"]["integer"] is False
+        assert PATIENT_FIELD_RULES["age"]["integer"] is True
+
+    def test_drift_bins_and_distill_bounds(self):
+        """Test that drift histograms and distillation jitter use the spec's bounds"""
+        assert FEATURE_BINS == {f.name: (f.min, f.max, f.bins) for f in FEATURES}
+        assert INPUT_BOUNDS == tuple((f.name, f.min, f.max) for f in FEATURES)
+
+    def test_distill_jitter_follows_feature_types(self):
+        """Test that jittered rows keep integer features whole and the family flag 0/1"""
+        base = np.array([[row[name] for name in FEATURE_NAMES] for row in ROWS], dtype=float)
+
+        X = jittered_inputs(base, 200, np.random.default_rng(0))
+
+        for i, feature in enumerate(FEATURES):
+            if feature.type is int:
+                assert np.array_equal(X[:, i], np.round(X[:, i])), feature.name
+        assert set(X[:, FEATURE_NAMES.index("diabetic_family")]) <= {0.0, 1.0}
+        assert model_matrix(X).tolist() == feature_matrix(
+            [dict(zip(FEATURE_NAMES, row)) for row in X.tolist()]).tolist()
+
+
+class TestFeatureMatrix:
+    """Test suite for the model input matrix"""
+
+    def test_columns_in_model_order(self):
+        """Test that the inputs come in spec order followed by bmi/age"""
+        X = feature_matrix(ROWS)
+
+        assert X.shape == (2, len(MODEL_COLUMNS))
+        assert X[0].tolist() == [2, 120, 80, 100, 25.5, 0, 35, 25.5 / 35]
+        assert X[1, -1] == pytest.approx(33.3 / 120)
+
+    def test_empty(self):
+        """Test that no rows give an empty matrix of the right width"""
+        assert feature_matrix([]).shape == (0, len(MODEL_COLUMNS))
+
+
+class TestRowEncoding:
+    """Test suite for the binary row encoding"""
+
+    def test_sixteen_bytes_per_row(self):
+        """Test that a row packs into 16 bytes"""
+        assert row_dtype().itemsize == 16
+        assert len(encode_rows(ROWS)) == 32
+
+    def test_round_trip(self):
+        """Test that decoding gives back the same ints and floats"""
+        decoded = decode_rows(encode_rows(ROWS))
+
+        assert decoded == ROWS
+        assert type(decoded[0]["glucose"]) is int
+        assert type(decoded[0]["bmi"]) is float
+
+    def test_decode_matrix(self):
+        """Test that the matrix decoded from bytes equals the one built from dicts"""
+        np.testing.assert_array_equal(decode_matrix(encode_rows(ROWS)), feature_matrix(ROWS))
+
+    @pytest.mark.parametrize("feature", FEATURES, ids=FEATURE_NAMES)
+    def test_storage_holds_bounds(self, feature):
+        """Test that each storage type represents the feature's min and max exactly"""
+        stored = np.array([feature.min, feature.max]).astype(feature.storage)
+
+        assert stored.tolist() == [feature.min, feature.max]
@@ -1,7 +1,7 @@
 import pytest
 import numpy as np
 from unittest.mock import Mock, patch
-from app.ml.inferences import predict_risk, risk_label
+from app.ml.inferences import prediction_fields, predict_risk, predict_risk_batch, risk_label, stored_risks
 
 
 class TestRiskLabel:
@@ -222,3 +222,126 @@ class TestPredictRisk:
         result2 = predict_risk(sample_patient_data)
 
         assert result1 == result2
+
+
+class TestPredictRiskBatch:
+    """Test suite for vectorized batch prediction"""
+
+    @pytest.fixture
+    def rows(self):
+        return [
+            {"pregnancies": 2, "glucose": 120, "blood_pressure": 80, "insulin": 100,
+             "bmi": 25.5, "diabetic_family": 0, "age": 35},
+            {"pregnancies": 6, "glucose": 190, "blood_pressure": 72, "insulin": 0,
+             "bmi": 43.1, "diabetic_family": 1, "age": 52},
+            {"pregnancies": 0, "glucose": 85, "blood_pressure": 66, "insulin": 29,
+             "bmi": 18.2, "diabetic_family": 0, "age": 21},
+        ]
+
+    def test_matches_single_row_predictions(self, rows):
+        """Test that the batch path gives the same output as predict_risk row by row"""
+        assert predict_risk_batch(rows) == [predict_risk(row) for row in rows]
+
+    def test_each_model_called_once(self, rows):
+        """Test that every model sees the whole matrix in one call"""
+        with patch('app.ml.inferences.models') as mock_models:
+            mock_model = Mock()
+            mock_model.predict_proba.return_value = np.array([[0.3, 0.7]] * len(rows))
+            mock_models.items.return_value = [("xgboost", mock_model)]
+
+            results = predict_risk_batch(rows)
+
+            assert mock_model.predict_proba.call_count == 1
+            assert mock_model.predict_proba.call_args[0][0].shape == (3, 8)
+            assert [r["prediction_prob_xgboost"] for r in results] == [70.0, 70.0, 70.0]
+
+    def test_empty_batch(self):
+        """Test that an empty batch returns an empty list"""
+        assert predict_risk_batch([]) == []
+
+
+class TestModelSubset:
+    """Test suite for evaluating only some of the models"""
+
+    PATIENT = {"pregnancies": 2, "glucose": 120, "blood_pressure": 80, "insulin": 100,
+               "bmi": 25.5, "diabetic_family": 0, "age": 35}
+
+    @pytest.fixture
+    def model_set(self):
+        names = ["logisticregression", "randomforest", "svc", "knn", "mlp", "xgboost"]
+        models = {}
+        for name in names:
+            model = Mock()
+            model.predict_proba.side_effect = lambda X: np.array([[0.6, 0.4]] * len(X))
+            models[name] = model
+        return models
+
+    def test_only_requested_models_run(self, model_set):
+        """Test that CPU scales with the requested models: the rest are never called"""
+        result = predict_risk(self.PATIENT, model_set, ["xgboost"])
+
+        assert result == {"outcome_xgboost": "Medium Risk", "prediction_prob_xgboost": 40.0}
+        assert model_set["xgboost"].predict_proba.call_count == 1
+        assert all(m.predict_proba.call_count == 0 for name, m in model_set.items() if name != "xgboost")
+
+    def test_none_means_all_models(self, model_set):
+        """Test that omitting the subset keeps the full output"""
+        result = predict_risk(self.PATIENT, model_set, None)
+
+        assert len(result) == 12
+
+    def test_batch_subset(self, model_set):
+        """Test that the batch path honours the subset too"""
+        rows = [{"pregnancies": 1, "glucose": 100, "blood_pressure": 70, "insulin": 80,
+                 "bmi": 24.0, "diabetic_family": 0, "age": 30}] * 2
+
+        results = predict_risk_batch(rows, model_set, ["svc", "knn"])
+
+        assert all(set(r) == {"outcome_svc", "prediction_prob_svc", "outcome_knn", "prediction_prob_knn"}
+                   for r in results)
+
+
+class TestStoredRisks:
+    """Test suite for the compact risk_ columns of health_records"""
+
+    def test_hundredths_of_a_percent(self):
+        """Test that predictions are stored as integers in hundredths of a percent"""
+        result = {"outcome_svc": "High Risk", "prediction_prob_svc": 74.57, "outcome_knn": "Low Risk",
+                  "prediction_prob_knn": 0.0}
+
+        assert stored_risks(result) == {"risk_svc": 7457, "risk_knn": 0}
+
+    @pytest.mark.parametrize("risk", [0.0, 0.1234567, 0.33, 0.5, 0.66, 0.6649, 0.99999, 1.0])
+    def test_round_trip_matches_prediction(self, risk):
+        """Test that the fields derived from a stored risk equal the prediction that was stored"""
+        result = {"outcome_svc": risk_label(risk), "prediction_prob_svc": round(risk * 100, 2)}
+        record = Mock(**stored_risks(result))
+
+        assert prediction_fields(record, ["svc"]) == result
+
+    def test_label_follows_stored_percentage(self):
+        """Test that a risk rounding onto a threshold is labelled like the percentage shown"""
+        record = Mock(**stored_risks({"prediction_prob_svc": round(0.3300001 * 100, 2)}))
+
+        assert prediction_fields(record, ["svc"]) == {"outcome_svc": "Low Risk", "prediction_prob_svc": 33.0}
+
+    @pytest.mark.parametrize("risk", [0.33004, 0.66004, 0.3349, 0.32996])
+    def test_prediction_labelled_like_its_stored_value(self, risk):
+        """Test that a risk just past a threshold is returned with the label it reads back with"""
+        model = Mock()
+        model.predict_proba.side_effect = lambda X: np.array([[1 - risk, risk]] * len(X))
+        patient = {"pregnancies": 2, "glucose": 120, "blood_pressure": 80, "insulin": 100,
+                   "bmi": 25.5, "diabetic_family": 0, "age": 35}
+
+        result = predict_risk(patient, {"svc": model})
+        record = Mock(**stored_risks(result))
+
+        assert result["outcome_svc"] == risk_label(round(risk * 100, 2) / 100)
+        assert prediction_fields(record, ["svc"]) == result
+        assert predict_risk_batch([patient], {"svc": model}) == [result]
+
+    def test_missing_model(self):
+        """Test that a model not evaluated yet gives None for both fields"""
+        record = Mock(risk_svc=None)
+
+        assert prediction_fields(record, ["svc"]) == {"outcome_svc": None, "prediction_prob_svc": None}
@@ -0,0 +1,257 @@
+import pytest
+import threading
+from datetime import datetime, timedelta
+from uuid import uuid4
+from sqlmodel import Session, SQLModel, create_engine, select
+from app.jobs import JobLeaseLost, PredictionJobPool, claim_job, job_progress, predict_job_batch
+from app.ml import inferences
+from app.ml.model_store import ModelSet
+from app.models import health_records, prediction_jobs
+
+
+class FixedModel:
+    """Stand-in model that returns the same risk for every row"""
+
+    def __init__(self, risk=0.7):
+        self.risk = risk
+        self.calls = []
+
+    def predict_proba(self, X):
+        self.calls.append(len(X))
+        return [[1 - self.risk, self.risk] for _ in range(len(X))]
+
+
+class BrokenModel:
+    def predict_proba(self, X):
+        raise RuntimeError("model exploded")
+
+
+@pytest.fixture
+def model_set(monkeypatch):
+    models = ModelSet("v-test", {name: FixedModel() for name in inferences.model_files})
+    monkeypatch.setattr(inferences, "load_models", lambda: models)
+    return models
+
+
+def make_job(session, rows=5, models=None, status="queued", lease_expires_at=None):
+    job = prediction_jobs(user_id=uuid4(), total=rows, models=models, status=status,
+                          lease_expires_at=lease_expires_at)
+    session.add(job)
+    for i in range(rows):
+        session.add(health_records(
+            user_id=job.user_id, pregnancies=1, glucose=100 + i, blood_pressure=70, insulin=80,
+            bmi=25.0, diabetic_family=0, age=30, created_at=datetime(2025, 1, 1, 0, i),
+            job_id=job.job_id, prediction_status="pending",
+        ))
+    session.commit()
+    return job
+
+
+def job_rows(session, job):
+    session.expire_all()
+    return session.exec(select(health_records).where(health_records.job_id == job.job_id)).all()
+
+
+class TestPredictJobBatch:
+    """Test suite for predicting one batch of a job"""
+
+    def test_predicts_one_batch_per_call(self, session, model_set):
+        """Test that each call predicts at most batch_size rows with one model call each"""
+        job = make_job(session, rows=5)
+
+        assert predict_job_batch(session, job, batch_size=3) == 3
+        assert predict_job_batch(session, job, batch_size=3) == 2
+        assert predict_job_batch(session, job, batch_size=3) == 0
+
+        assert model_set["xgboost"].calls == [3, 2]
+        assert job.completed == 5
+        rows = job_rows(session, job)
+        assert {row.prediction_status for row in rows} == {"complete"}
+        assert {row.model_version for row in rows} == {"v-test"}
+        assert rows[0].risk_xgboost == 7000
+
+    def test_model_subset(self, session, model_set):
+        """Test that a job created with models= only evaluates those models"""
+        job = make_job(session, rows=2, models="svc,xgboost")
+
+        predict_job_batch(session, job, batch_size=10)
+
+        row = job_rows(session, job)[0]
+        assert row.risk_svc == 7000
+        assert row.risk_xgboost == 7000
+        assert row.risk_knn is None
+        assert model_set["knn"].calls == []
+
+    def test_failed_batch_marks_rows_failed(self, session, monkeypatch):
+        """Test that a batch whose prediction raises is marked failed, not retried forever"""
+        monkeypatch.setattr(inferences, "load_models", lambda: ModelSet("v-test", {"xgboost": BrokenModel()}))
+        job = make_job(session, rows=3)
+
+        assert predict_job_batch(session, job, batch_size=10) == 3
+        assert predict_job_batch(session, job, batch_size=10) == 0
+
+        assert job.failed == 3
+        assert job.error == "model exploded"
+        assert {row.prediction_status for row in job_rows(session, job)} == {"failed"}
+
+
+class TestClaimJob:
+    """Test suite for taking a job with a lease"""
+
+    def test_one_claim_wins(self, session):
+        """Test that a queued job is taken by exactly one worker"""
+        job = make_job(session, rows=1)
+
+        assert claim_job(session, job.job_id, "worker-a", 60) is True
+        assert claim_job(session, job.job_id, "worker-b", 60) is False
+
+        session.refresh(job)
+        assert (job.status, job.owner) == ("running", "worker-a")
+        assert job.started_at is not None
+        assert job.lease_expires_at > datetime.utcnow()
+
+    def test_expired_lease_is_taken_over(self, session):
+        """Test that a running job is claimable once its lease has passed"""
+        job = make_job(session, rows=1, status="running", lease_expires_at=datetime.utcnow() - timedelta(seconds=1))
+
+        assert claim_job(session, job.job_id, "worker-b", 60) is True
+
+    def test_finished_and_unknown_jobs(self, session):
+        """Test that finished and unknown jobs cannot be claimed"""
+        job = make_job(session, rows=1, status="complete")
+
+        assert claim_job(session, job.job_id, "worker-a", 60) is False
+        assert claim_job(session, uuid4(), "worker-a", 60) is False
+
+    def test_batch_after_takeover_is_rolled_back(self, session, model_set):
+        """Test that a worker whose job was taken over commits nothing and stops"""
+        job = make_job(session, rows=4)
+        claim_job(session, job.job_id, "worker-a", 60)
+        session.refresh(job)
+        job.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+        session.add(job)
+        session.commit()
+        claim_job(session, job.job_id, "worker-b", 60)
+
+        with pytest.raises(JobLeaseLost):
+            predict_job_batch(session, job, batch_size=2, owner="worker-a")
+
+        assert {row.prediction_status for row in job_rows(session, job)} == {"pending"}
+        assert predict_job_batch(session, job, batch_size=10, owner="worker-b") == 4
+        session.refresh(job)
+        assert job.completed == 4
+        assert job.lease_expires_at > datetime.utcnow()
+
+
+class TestPredictionJobPool:
+    """Test suite for the background job workers"""
+
+    def test_run_job_completes_job(self, session, test_engine, model_set):
+        """Test that running a job predicts every row and marks it complete"""
+        job = make_job(session, rows=7)
+        pool = PredictionJobPool(engine_factory=lambda: test_engine, workers=1, batch_size=3)
+
+        progress = pool.run_job(job.job_id)
+
+        assert progress["status"] == "complete"
+        assert progress["completed"] == 7
+        assert progress["pending"] == 0
+        assert progress["progress"] == 100.0
+        assert progress["finished_at"] is not None
+
+    def test_run_job_skips_finished_and_unknown_jobs(self, session, test_engine, model_set):
+        """Test that finished or unknown jobs are not run again"""
+        job = make_job(session, rows=2, status="complete")
+        pool = PredictionJobPool(engine_factory=lambda: test_engine, workers=1)
+
+        assert pool.run_job(job.job_id) is None
+        assert pool.run_job(uuid4()) is None
+        assert model_set["xgboost"].calls == []
+
+    def test_workers_run_submitted_jobs(self, session, test_engine, model_set):
+        """Test that started workers pick up submitted jobs"""
+        job = make_job(session, rows=4)
+        pool = PredictionJobPool(engine_factory=lambda: test_engine, workers=1, batch_size=2)
+        pool.start()
+        try:
+            pool.submit(job.job_id)
+            assert pool.join(timeout=30)
+        finally:
+            pool.stop()
+
+        session.refresh(job)
+        assert job.status == "complete"
+        assert job.completed == 4
+
+    def test_resume_requeues_unfinished_jobs(self, session, test_engine):
+        """Test that queued jobs and running jobs whose worker is gone are queued again"""
+        make_job(session, rows=1, status="queued")
+        make_job(session, rows=1, status="running", lease_expires_at=datetime.utcnow() - timedelta(seconds=1))
+        make_job(session, rows=1, status="running", lease_expires_at=datetime.utcnow() + timedelta(seconds=60))
+        make_job(session, rows=1, status="complete")
+        pool = PredictionJobPool(engine_factory=lambda: test_engine, workers=1)
+
+        assert pool.resume() == 2
+        assert pool.queued == 2
+        assert pool.resume() == 0
+        assert pool.queued == 2
+
+    def test_job_running_elsewhere_is_not_run(self, session, test_engine, model_set):
+        """Test that a job under another worker's live lease is left alone"""
+        job = make_job(session, rows=3, status="running", lease_expires_at=datetime.utcnow() + timedelta(seconds=60))
+        pool = PredictionJobPool(engine_factory=lambda: test_engine, workers=1)
+
+        assert pool.run_job(job.job_id) is None
+        assert model_set["xgboost"].calls == []
+
+    def test_stop_hands_the_job_back(self, session, test_engine, model_set):
+        """Test that a job interrupted by stop() is queued again for any worker, not held until its lease ends"""
+        job = make_job(session, rows=4)
+        pool = PredictionJobPool(engine_factory=lambda: test_engine, workers=1, batch_size=2)
+        pool._stop.set()
+
+        assert pool.run_job(job.job_id) is None
+
+        session.refresh(job)
+        assert (job.status, job.owner, job.lease_expires_at) == ("queued", None, None)
+        assert job.completed == 2
+
+    def test_two_pools_run_a_job_once(self, tmp_path, model_set):
+        """Test that two processes' pools racing for the same job predict each row once"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"timeout": 30})
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            job = make_job(session, rows=40)
+            job_id = job.job_id
+        pools = [PredictionJobPool(engine_factory=lambda: engine, workers=1, batch_size=5) for _ in range(2)]
+        results = []
+        threads = [threading.Thread(target=lambda pool=pool: results.append(pool.run_job(job_id))) for pool in pools]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with Session(engine) as session:
+            job = session.get(prediction_jobs, job_id)
+            assert (job.status, job.completed, job.failed) == ("complete", 40, 0)
+            assert job.owner is None
+        assert sum(result is not None for result in results) == 1
+        assert sum(model_set["xgboost"].calls) == 40
+        engine.dispose()
+
+
+class TestJobProgress:
+    """Test suite for job progress reporting"""
+
+    def test_progress_counts_completed_and_failed(self):
+        """Test that progress covers both completed and failed rows"""
+        job = prediction_jobs(user_id=uuid4(), total=8, completed=4, failed=2, status="running")
+
+        progress = job_progress(job)
+
+        assert progress["pending"] == 2
+        assert progress["progress"] == 75.0
+
+    def test_empty_job_is_done(self):
+        """Test that a job with no rows reports full progress"""
+        assert job_progress(prediction_jobs(user_id=uuid4(), total=0))["progress"] == 100.0
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, date
+from uuid import uuid4
+from app.models import refresh_tokens, users
+from app.maintenance import (
+    clear_expired_verification_tokens, purge_abandoned_accounts, purge_refresh_tokens, run_sweep, sweep_stats
+)
+
+NOW = datetime(2025, 6, 1, 12, 0, 0)
+
+
+def make_user(session, name, is_verified=False, token_expiry=None, created_at=NOW):
+    user = users(
+        user_id=uuid4(),
+        email=f"{name}@example.com",
+        username=name,
+        first_name="Test",
+        last_name="User",
+        password_hash="hash",
+        phone_number="1234567890",
+        date_of_birth=date(1990, 1, 1),
+        is_verified=is_verified,
+        verification_token=f"token_{name}" if token_expiry else None,
+        verification_token_expiry=token_expiry,
+        created_at=created_at
+    )
+    session.add(user)
+    session.commit()
+    return user
+
+
+class TestClearExpiredVerificationTokens:
+    """Test suite for the expired verification token sweep"""
+
+    def test_clears_only_tokens_past_grace(self, session):
+        """Test that tokens expired beyond the grace period are cleared"""
+        old = make_user(session, "olduser", token_expiry=NOW - timedelta(days=3))
+        recent = make_user(session, "recentuser", token_expiry=NOW - timedelta(hours=2))
+        live = make_user(session, "liveuser", token_expiry=NOW + timedelta(hours=2))
+
+        cleared = clear_expired_verification_tokens(session, NOW, grace=timedelta(days=1))
+
+        assert cleared == 1
+        session.refresh(old)
+        session.refresh(recent)
+        session.refresh(live)
+        assert old.verification_token is None and old.verification_token_expiry is None
+        assert recent.verification_token == "token_recentuser"
+        assert live.verification_token == "token_liveuser"
+
+    def test_processes_in_batches(self, session):
+        """Test that more rows than the batch size are all cleared"""
+        for i in range(7):
+            make_user(session, f"user{i}", token_expiry=NOW - timedelta(days=5))
+
+        assert clear_expired_verification_tokens(session, NOW, batch_size=3) == 7
+        assert clear_expired_verification_tokens(session, NOW, batch_size=3) == 0
+
+
+class TestPurgeAbandonedAccounts:
+    """Test suite for purging old unverified accounts"""
+
+    def test_purges_old_unverified_only(self, session):
+        """Test that verified, recent, and live-token accounts are kept"""
+        month_ago = NOW - timedelta(days=40)
+        make_user(session, "abandoned", created_at=month_ago)
+        make_user(session, "verified", is_verified=True, created_at=month_ago)
+        make_user(session, "recent", created_at=NOW - timedelta(days=2))
+        make_user(session, "resent", created_at=month_ago, token_expiry=NOW + timedelta(hours=5))
+
+        purged = purge_abandoned_accounts(session, NOW, older_than=timedelta(days=30), batch_size=1)
+
+        assert purged == 1
+        remaining = {u.username for u in session.query(users).all()}
+        assert remaining == {"verified", "recent", "resent"}
+
+
+def make_refresh_token(session, user_id, name, expires_at, revoked=False):
+    session.add(refresh_tokens(user_id=user_id, token_hash=name, expires_at=expires_at, revoked=revoked))
+    session.commit()
+
+
+class TestPurgeRefreshTokens:
+    """Test suite for deleting refresh tokens that can no longer be used"""
+
+    def test_purges_expired_orphaned_and_dead_families(self, session):
+        """Test that expired tokens, tokens of deleted users and fully revoked families go"""
+        active = make_user(session, "active", is_verified=True)
+        logged_out = make_user(session, "loggedout", is_verified=True)
+        make_refresh_token(session, active.user_id, "live", NOW + timedelta(days=3))
+        make_refresh_token(session, active.user_id, "rotated", NOW + timedelta(days=2), revoked=True)
+        make_refresh_token(session, active.user_id, "expired", NOW - timedelta(minutes=1))
+        make_refresh_token(session, logged_out.user_id, "revoked", NOW + timedelta(days=5), revoked=True)
+        make_refresh_token(session, uuid4(), "orphan", NOW + timedelta(days=5))
+
+        purged = purge_refresh_tokens(session, NOW, batch_size=2)
+
+        assert purged == 3
+        remaining = {t.token_hash for t in session.query(refresh_tokens).all()}
+        assert remaining == {"live", "rotated"}
+
+
+class TestRunSweep:
+    """Test suite for a full sweep run and its metrics"""
+
+    def test_records_stats(self, session):
+        """Test that each run updates the cumulative and last-run metrics"""
+        make_user(session, "olduser", token_expiry=NOW - timedelta(days=3))
+        runs_before = sweep_stats["runs"]
+        cleared_before = sweep_stats["tokens_cleared_total"]
+
+        result = run_sweep(session, now=NOW)
+
+        assert result["tokens_cleared"] == 1
+        assert result["accounts_purged"] == 0
+        assert result["refresh_tokens_purged"] == 0
+        assert sweep_stats["runs"] == runs_before + 1
+        assert sweep_stats["tokens_cleared_total"] == cleared_before + 1
+        assert sweep_stats["last_run"] == result
@@ -0,0 +1,120 @@
+import pytest
+from unittest.mock import Mock
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.testclient import TestClient
+from app.metrics import Histogram, Registry, route_label, stage_timer, stage_duration
+
+
+class TestHistogram:
+    """Test suite for the fixed-bucket histogram"""
+
+    def test_observe_lands_in_first_bucket_at_or_above_value(self):
+        """Test that bucket bounds are inclusive upper limits"""
+        hist = Histogram((0.1, 1.0))
+        hist.observe(0.05)
+        hist.observe(0.1)
+        hist.observe(0.5)
+        hist.observe(3.0)
+
+        assert hist.counts == [2, 1, 1]
+        assert hist.sum == pytest.approx(3.65)
+
+    def test_quantile_interpolates_within_bucket(self):
+        """Test quantile estimation from bucket counts"""
+        hist = Histogram((1.0, 2.0))
+        for value in (0.5, 1.5, 1.5, 1.5):
+            hist.observe(value)
+
+        assert hist.count == 4
+        assert hist.quantile(0.25) == pytest.approx(1.0)
+        assert hist.quantile(0.5) == pytest.approx(1.0 + 1 / 3)
+
+    def test_quantile_empty(self):
+        """Test that an empty histogram reports zero"""
+        assert Histogram((1.0,)).quantile(0.99) == 0.0
+
+
+class TestRegistryRender:
+    """Test suite for Prometheus text exposition"""
+
+    def test_histogram_is_cumulative(self):
+        """Test that rendered buckets are cumulative and end with +Inf"""
+        registry = Registry()
+        family = registry.histogram("latency_seconds", "Latency", ("route",), (0.1, 1.0))
+        family.labels("/x").observe(0.05)
+        family.labels("/x").observe(0.5)
+
+        text = registry.render()
+
+        assert '# TYPE latency_seconds histogram' in text
+        assert 'latency_seconds_bucket{route="/x",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{route="/x",le="1.0"} 2' in text
+        assert 'latency_seconds_bucket{route="/x",le="+Inf"} 2' in text
+        assert 'latency_seconds_count{route="/x"} 2' in text
+
+    def test_counter_and_label_escaping(self):
+        """Test counter output and escaping of quotes in label values"""
+        registry = Registry()
+        family = registry.counter("hits_total", "Hits", ("path",))
+        family.inc('/a"b')
+        family.inc('/a"b')
+
+        assert 'hits_total{path="/a\\"b"} 2' in registry.render()
+
+    def test_collectors_are_appended(self):
+        """Test that collector callbacks contribute lines"""
+        registry = Registry()
+        registry.collectors.append(lambda: ["custom_metric 7"])
+
+        assert "custom_metric 7" in registry.render()
+
+
+class TestRouteLabel:
+    """Test suite for route template labels"""
+
+    def test_unmatched(self):
+        """Test that requests without a matched route share one label"""
+        assert route_label({"path": "/nope"}) == "unmatched"
+
+    def test_template_from_matched_route(self):
+        """Test that the label is the matched route's template, not the raw path"""
+        route = Mock(path_format="/records/{recordId}")
+        scope = {"route": route, "path": "/records/42", "path_params": {"recordId": "42"}}
+
+        assert route_label(scope) == "/records/{recordId}"
+
+    def test_values_repeated_in_path(self):
+        """Test that a parameter value that also appears as a literal segment is left alone"""
+        route = Mock(path_format="/records/{recordId}/records/{other}")
+        scope = {"route": route, "path": "/records/records/records/7",
+                 "path_params": {"recordId": "records", "other": "7"}}
+
+        assert route_label(scope) == "/records/{recordId}/records/{other}"
+
+    def test_included_router_prefix(self):
+        """Test that routes from included routers are labelled with their prefix"""
+        router = APIRouter()
+
+        @router.get("/items/{item_id}/{item_id2}")
+        def item(item_id: str, item_id2: str, request: Request):
+            return {"label": route_label(request.scope)}
+
+        outer = APIRouter()
+        outer.include_router(router, prefix="/v1")
+        app = FastAPI()
+        app.include_router(outer, prefix="/api")
+
+        assert TestClient(app).get("/api/v1/items/5/5").json() == {"label": "/api/v1/items/{item_id}/{item_id2}"}
+
+
+class TestStageTimer:
+    """Test suite for stage timing"""
+
+    def test_stage_timer_records_observation(self):
+        """Test that a timed block adds one observation to its stage"""
+        before = sum(stage_duration.labels("unit_test_stage", "").counts)
+
+        with stage_timer("unit_test_stage"):
+            pass
+
+        assert sum(stage_duration.labels("unit_test_stage", "").counts) == before + 1
@@ -0,0 +1,196 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlmodel import Session, SQLModel, select
+from app.migrate_predictions import (
+    TABLES, migrate, migration_statements, needs_migration, relation_sizes, scan_seconds, upgrade_statements
+)
+from app.ml.inferences import model_files, prediction_fields, risk_label
+from app.models import health_records, prediction_jobs, users
+
+OLD_PREDICTIONS = ", ".join(f"outcome_{name} VARCHAR, prediction_prob_{name} FLOAT" for name in model_files)
+
+
+@pytest.fixture
+def old_engine():
+    """In-memory database with health_records in the layout before risk_ columns"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE health_records (record_id INTEGER PRIMARY KEY, user_id CHAR(32) NOT NULL, "
+            "pregnancies INTEGER NOT NULL, glucose INTEGER NOT NULL, blood_pressure INTEGER NOT NULL, "
+            "insulin INTEGER NOT NULL, bmi FLOAT NOT NULL, diabetic_family INTEGER NOT NULL, age INTEGER NOT NULL, "
+            f"{OLD_PREDICTIONS}, model_version VARCHAR, prediction_status VARCHAR NOT NULL, job_id CHAR(32), "
+            "fingerprint VARCHAR, created_at DATETIME)"
+        ))
+        connection.execute(text("CREATE UNIQUE INDEX ix_health_records_fingerprint ON health_records (fingerprint)"))
+        for record_id, prob in ((1, 74.57), (2, 33.0), (3, 66.01), (4, None)):
+            outcome = None if prob is None else risk_label(prob / 100)
+            connection.execute(text(
+                "INSERT INTO health_records (record_id, user_id, pregnancies, glucose, blood_pressure, insulin, bmi, "
+                "diabetic_family, age, outcome_xgboost, prediction_prob_xgboost, outcome_svc, prediction_prob_svc, "
+                "prediction_status, created_at) VALUES (:id, '0123456789abcdef0123456789abcdef', 1, 120, 80, 100, 25.5, 0, 35, :outcome, :prob, "
+                "'Low Risk', 0.0, 'complete', '2025-01-01 00:00:00')"
+            ), {"id": record_id, "outcome": outcome, "prob": prob})
+    return engine
+
+
+@pytest.fixture
+def baseline_engine(tmp_path):
+    """Database created by the original models: no columns or indexes added since, old prediction columns"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE users (user_id CHAR(32) NOT NULL PRIMARY KEY, email VARCHAR NOT NULL, "
+            "password_hash VARCHAR NOT NULL, first_name VARCHAR NOT NULL, last_name VARCHAR NOT NULL, "
+            "username VARCHAR NOT NULL, phone_number VARCHAR NOT NULL, date_of_birth DATE NOT NULL, "
+            "is_verified BOOLEAN NOT NULL, verification_token VARCHAR, verification_token_expiry DATETIME, "
+            "created_at DATETIME NOT NULL)"
+        ))
+        connection.execute(text("CREATE UNIQUE INDEX ix_users_username ON users (username)"))
+        connection.execute(text(
+            "CREATE TABLE health_records (record_id INTEGER NOT NULL PRIMARY KEY, user_id CHAR(32) NOT NULL, "
+            "pregnancies INTEGER NOT NULL, glucose INTEGER NOT NULL, blood_pressure INTEGER NOT NULL, "
+            "insulin INTEGER NOT NULL, bmi FLOAT NOT NULL, diabetic_family INTEGER NOT NULL, age INTEGER NOT NULL, "
+            f"{OLD_PREDICTIONS}, created_at DATETIME)"
+        ))
+        connection.execute(text(
+            "INSERT INTO users VALUES ('0123456789abcdef0123456789abcdef', 'old@example.com', 'hash', 'Old', "
+            "'User', 'olduser', '1234567890', '1990-01-01', 1, NULL, NULL, '2024-01-01 00:00:00')"
+        ))
+        connection.execute(text(
+            "INSERT INTO health_records VALUES (1, '0123456789abcdef0123456789abcdef', 1, 120, 80, 100, 25.5, 0, 35, "
+            + ", ".join("'High Risk', 74.57" for _ in model_files) + ", '2024-01-01 00:00:00')"
+        ))
+    return engine
+
+
+class TestSchemaUpgrade:
+    """Test suite for bringing a database created by the original models up to date"""
+
+    def test_baseline_database_matches_models(self, baseline_engine):
+        """Test that after startup's create_all and the migration every table has the models' columns and indexes"""
+        SQLModel.metadata.create_all(baseline_engine)
+
+        assert migrate(baseline_engine) is True
+
+        inspector = inspect(baseline_engine)
+        for name, table in TABLES.items():
+            assert {c["name"] for c in inspector.get_columns(name)} == set(table.c.keys()), name
+            assert {i["name"] for i in inspector.get_indexes(name)} == {i.name for i in table.indexes}, name
+        assert upgrade_statements(baseline_engine) == []
+        assert migrate(baseline_engine) is False
+
+    def test_existing_rows_load_through_the_models(self, baseline_engine):
+        """Test that users and records stored before the upgrade can be read and written by the ORM"""
+        SQLModel.metadata.create_all(baseline_engine)
+        migrate(baseline_engine)
+
+        with Session(baseline_engine) as session:
+            user = session.exec(select(users).where(users.email == "old@example.com")).one()
+            record = session.exec(select(health_records)).one()
+            assert user.records_version == 0
+            assert record.prediction_status == "complete"
+            assert record.model_version is None and record.fingerprint is None
+            assert record.risk_xgboost == 7457
+            user.records_version += 1
+            session.add(user)
+            session.commit()
+
+    def test_duplicate_emails_stop_the_upgrade(self, baseline_engine):
+        """Test that emails held by two users are reported and nothing is changed"""
+        with baseline_engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO users VALUES ('fedcba9876543210fedcba9876543210', 'old@example.com', 'hash', 'Old', "
+                "'Twin', 'oldtwin', '1234567890', '1990-01-01', 1, NULL, NULL, '2024-01-02 00:00:00')"
+            ))
+        statements = upgrade_statements(baseline_engine)
+        assert "CREATE UNIQUE INDEX ix_users_email ON users (email)" in statements
+
+        with pytest.raises(ValueError, match="old@example.com"):
+            migrate(baseline_engine)
+
+        assert upgrade_statements(baseline_engine) == statements
+
+    def test_existing_jobs_table_gets_lease_columns(self, baseline_engine):
+        """Test that a prediction_jobs table from before job leases gains owner and lease_expires_at"""
+        with baseline_engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE prediction_jobs (job_id CHAR(32) NOT NULL PRIMARY KEY, user_id CHAR(32) NOT NULL, "
+                "status VARCHAR NOT NULL, models VARCHAR, total INTEGER NOT NULL, completed INTEGER NOT NULL, "
+                "failed INTEGER NOT NULL, error VARCHAR, created_at DATETIME NOT NULL, started_at DATETIME, "
+                "finished_at DATETIME)"
+            ))
+        SQLModel.metadata.create_all(baseline_engine)
+        migrate(baseline_engine)
+
+        with Session(baseline_engine) as session:
+            assert session.exec(select(prediction_jobs)).all() == []
+        columns = {c["name"] for c in inspect(baseline_engine).get_columns("prediction_jobs")}
+        assert {"owner", "lease_expires_at"} <= columns
+
+
+class TestMigration:
+    """Test suite for converting stored predictions to risk_ columns"""
+
+    def test_replaces_prediction_columns(self, old_engine):
+        """Test that each model's two columns become one risk_ column"""
+        assert migrate(old_engine) is True
+
+        columns = {column["name"] for column in inspect(old_engine).get_columns("health_records")}
+        assert {f"risk_{name}" for name in model_files} <= columns
+        assert not any(column.startswith(("outcome_", "prediction_prob_")) for column in columns)
+        assert not needs_migration(old_engine)
+
+    def test_converts_existing_rows(self, old_engine):
+        """Test that the API gives back the stored labels and percentages after the migration"""
+        with old_engine.connect() as connection:
+            before = connection.execute(text(
+                "SELECT outcome_xgboost, prediction_prob_xgboost FROM health_records ORDER BY record_id")).all()
+
+        migrate(old_engine)
+
+        with Session(old_engine) as session:
+            records = session.exec(select(health_records).order_by(health_records.record_id)).all()
+        assert [record.risk_xgboost for record in records] == [7457, 3300, 6601, None]
+        assert [record.risk_svc for record in records] == [0, 0, 0, 0]
+        assert [record.risk_knn for record in records] == [None] * 4
+        after = [prediction_fields(record, ["xgboost"]) for record in records]
+        assert [(fields["outcome_xgboost"], fields["prediction_prob_xgboost"]) for fields in after] == before
+
+    def test_second_run_does_nothing(self, old_engine):
+        """Test that an already migrated table is left alone"""
+        migrate(old_engine)
+
+        assert migrate(old_engine) is False
+
+    def test_current_schema_needs_no_migration(self, test_engine):
+        """Test that a table created from the models is already in the new layout"""
+        assert not needs_migration(test_engine)
+
+    def test_statements(self):
+        """Test that the printed SQL adds, fills and drops the columns in that order"""
+        statements = migration_statements(["svc"])
+
+        assert statements == [
+            "ALTER TABLE health_records ADD COLUMN risk_svc SMALLINT",
+            "UPDATE health_records SET risk_svc = CAST(ROUND(prediction_prob_svc * 100) AS SMALLINT)",
+            "ALTER TABLE health_records DROP COLUMN outcome_svc",
+            "ALTER TABLE health_records DROP COLUMN prediction_prob_svc",
+        ]
+
+
+class TestMeasurements:
+    """Test suite for the size and scan measurements"""
+
+    def test_relation_sizes(self, old_engine):
+        """Test that table and index sizes are reported in bytes"""
+        sizes = relation_sizes(old_engine)
+
+        assert sizes["table_bytes"] > 0
+        assert sizes["index_bytes"] > 0
+
+    def test_scan_either_layout(self, old_engine):
+        """Test that the scan reads the prediction columns before and after the migration"""
+        assert scan_seconds(old_engine) >= 0
+        migrate(old_engine)
+        assert scan_seconds(old_engine) >= 0
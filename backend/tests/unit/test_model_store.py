@@ -0,0 +1,163 @@
+import os
+import threading
+import joblib
+import numpy as np
+import pytest
+from app.ml import inferences
+from app.ml.inferences import ModelSwapper, model_files, validate_model_set
+from app.ml.model_store import BUNDLED_VERSION, ModelSet, ModelStore
+
+
+class ConstantModel:
+    """Picklable stand-in for a fitted pipeline"""
+
+    def __init__(self, risk: float):
+        self.risk = risk
+
+    def predict_proba(self, X):
+        return np.array([[1 - self.risk, self.risk]] * len(X))
+
+
+def write_version(root, version: str, risk: float = 0.25, skip: str = None):
+    directory = os.path.join(root, version)
+    os.makedirs(directory)
+    for name, path in model_files.items():
+        if name != skip:
+            joblib.dump(ConstantModel(risk), os.path.join(directory, os.path.basename(path)))
+
+
+@pytest.fixture
+def store(tmp_path):
+    """A store with one valid and one incomplete version"""
+    root = str(tmp_path / "versions")
+    write_version(root, "v2", risk=0.25)
+    write_version(root, "broken", skip="svc")
+    return ModelStore(root=root)
+
+
+@pytest.fixture
+def restore_models():
+    """Put back whatever model set was active before the test"""
+    saved = inferences.models
+    yield
+    inferences.models = saved
+
+
+class TestModelStore:
+    """Test suite for the versioned model store"""
+
+    def test_versions_include_bundled(self, store):
+        """Test that the bundled models are always a version"""
+        assert store.versions() == [BUNDLED_VERSION, "broken", "v2"]
+
+    def test_active_defaults_to_bundled(self, store):
+        """Test that a store without a pointer serves the bundled models"""
+        assert store.active_version() == BUNDLED_VERSION
+
+    def test_set_active_writes_pointer(self, store):
+        """Test that activating a version persists it for other workers"""
+        store.set_active("v2")
+
+        assert store.active_version() == "v2"
+        assert not [f for f in os.listdir(store.root) if f.startswith(".ACTIVE")]
+
+    def test_set_active_rejects_unknown_version(self, store):
+        """Test that the pointer cannot name a missing version"""
+        with pytest.raises(KeyError):
+            store.set_active("v9")
+
+    def test_load_tags_version(self, store):
+        """Test that a loaded set remembers its version"""
+        model_set = store.load("v2", model_files)
+
+        assert isinstance(model_set, ModelSet)
+        assert model_set.version == "v2"
+        assert set(model_set) == set(model_files)
+
+
+class TestValidateModelSet:
+    """Test suite for canary validation"""
+
+    def test_valid_set_returns_canary_scores(self, store):
+        """Test that every model scores every canary row"""
+        scores = validate_model_set(store.load("v2", model_files))
+
+        assert set(scores) == set(model_files)
+        assert scores["svc"] == [0.25] * len(inferences.CANARY_ROWS)
+
+    def test_missing_model_is_rejected(self):
+        """Test that an incomplete set fails validation"""
+        with pytest.raises(ValueError, match="missing"):
+            validate_model_set({"svc": ConstantModel(0.5)})
+
+    def test_out_of_range_probability_is_rejected(self):
+        """Test that nonsense probabilities fail validation"""
+        model_set = {name: ConstantModel(1.5) for name in model_files}
+
+        with pytest.raises(ValueError, match="invalid probabilities"):
+            validate_model_set(model_set)
+
+
+class TestModelSwapper:
+    """Test suite for hot-swapping model versions"""
+
+    def test_activate_swaps_and_persists(self, store, restore_models):
+        """Test that a valid version becomes the serving set and the pointer"""
+        swapper = ModelSwapper(store, poll_interval=0)
+
+        status = swapper.activate("v2")
+
+        assert status["state"] == "active"
+        assert inferences.model_version() == "v2"
+        assert store.active_version() == "v2"
+        result = inferences.predict_risk(inferences.CANARY_ROWS[0])
+        assert result["prediction_prob_svc"] == 25.0
+
+    def test_failed_validation_keeps_serving_set(self, store, restore_models):
+        """Test that a broken version never replaces the active set"""
+        swapper = ModelSwapper(store, poll_interval=0)
+        current = ModelSet("v1", {})
+        inferences.models = current
+
+        status = swapper.activate("broken")
+
+        assert status["state"] == "failed"
+        assert inferences.models is current
+        assert store.active_version() == BUNDLED_VERSION
+
+    def test_concurrent_swap_is_refused(self, store):
+        """Test that only one swap runs at a time"""
+        swapper = ModelSwapper(store, poll_interval=0)
+        swapper._swap_lock.acquire()
+        try:
+            with pytest.raises(RuntimeError):
+                swapper.activate("v2")
+            assert swapper.activate_in_background("v2") is False
+        finally:
+            swapper._swap_lock.release()
+
+    def test_watcher_follows_pointer(self, store, restore_models):
+        """Test that a worker picks up a version activated elsewhere"""
+        inferences.models = ModelSet(BUNDLED_VERSION, {})
+        swapper = ModelSwapper(store, poll_interval=0.01)
+        store.set_active("v2")
+
+        swapper.start()
+        try:
+            for _ in range(500):
+                if inferences.model_version() == "v2":
+                    break
+                threading.Event().wait(0.01)
+        finally:
+            swapper.stop()
+
+        assert inferences.model_version() == "v2"
+
+    def test_in_flight_prediction_keeps_its_set(self, store, restore_models):
+        """Test that a prediction pinned to a set is unaffected by a swap"""
+        pinned = store.load("v2", model_files)
+        inferences.swap_models(ModelSet("other", {name: ConstantModel(0.9) for name in model_files}))
+
+        result = inferences.predict_risk(inferences.CANARY_ROWS[0], pinned)
+
+        assert result["prediction_prob_xgboost"] == 25.0
@@ -0,0 +1,166 @@
+import cProfile
+import threading
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from app import profiling
+from app.metrics import MetricsRoute
+from app.profiling import ProfilingMiddleware, profiled, top_frames
+
+
+def busy_work():
+    return sum(i * i for i in range(20000))
+
+
+@pytest.fixture
+def profiled_client():
+    """A minimal app wired like the real one: MetricsRoute endpoints behind ProfilingMiddleware"""
+    router = APIRouter(route_class=MetricsRoute)
+
+    @router.get("/work")
+    def work():
+        return {"total": busy_work()}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(ProfilingMiddleware, sample_rate=1.0)
+    profiling.profiles.clear()
+    yield TestClient(app)
+    profiling.profiles.clear()
+
+
+class TestProfilingMiddleware:
+    """Test suite for opt-in request profiling"""
+
+    def test_requests_without_header_are_not_profiled(self, profiled_client):
+        """Test that only requests asking for a profile are recorded"""
+        profiled_client.get("/work")
+
+        assert len(profiling.profiles) == 0
+
+    def test_header_captures_endpoint_frames(self, profiled_client):
+        """Test that a profiled request stores the endpoint's hot functions"""
+        response = profiled_client.get("/work", headers={"X-Profile": "1"})
+
+        assert response.status_code == 200
+        assert len(profiling.profiles) == 1
+        entry = profiling.profiles[0]
+        assert entry["path"] == "/work"
+        assert entry["status"] == 200
+        assert entry["skipped"] is None
+        assert any(frame["function"] == "busy_work" for frame in entry["top"])
+
+    def test_sample_rate_zero_skips(self):
+        """Test that a zero sample rate never profiles"""
+        middleware = ProfilingMiddleware(app=None, sample_rate=0.0)
+
+        assert middleware._wants_profile({"headers": [(b"x-profile", b"1")]}) is False
+
+    def test_ring_buffer_is_bounded(self, profiled_client):
+        """Test that old profiles are dropped once the buffer is full"""
+        for _ in range(profiling.profiles.maxlen + 5):
+            profiled_client.get("/work", headers={"X-Profile": "1"})
+
+        assert len(profiling.profiles) == profiling.profiles.maxlen
+
+
+class TestProfiledWrapper:
+    """Test suite for the endpoint wrapper"""
+
+    def test_passthrough_without_active_profile(self):
+        """Test that the wrapper just calls the endpoint when not profiling"""
+        assert profiled(lambda x: x + 1)(1) == 2
+
+    def test_async_endpoints_are_not_wrapped(self):
+        """Test that coroutine endpoints are returned unchanged"""
+        async def endpoint():
+            return 1
+
+        assert profiled(endpoint) is endpoint
+
+
+class TestConcurrentProfiling:
+    """Test suite for overlapping sampled requests sharing the one profiler"""
+
+    def run_in_request(self, endpoint, profile, results, index):
+        # What the middleware does for a sampled request, in a worker thread of its own
+        token = profiling._active_profile.set(profile)
+        try:
+            results[index] = endpoint()
+        except Exception as e:
+            results[index] = e
+        finally:
+            profiling._active_profile.reset(token)
+
+    def test_overlapping_requests_run_unprofiled(self):
+        """Test that only one of several overlapping requests is profiled and none fails"""
+        barrier = threading.Barrier(4, timeout=10)
+
+        @profiled
+        def endpoint():
+            barrier.wait()
+            return busy_work()
+
+        profiles = [cProfile.Profile() for _ in range(4)]
+        for profile in profiles:
+            profile.skipped = None
+        results = [None] * 4
+        threads = [threading.Thread(target=self.run_in_request, args=(endpoint, profile, results, i))
+                   for i, profile in enumerate(profiles)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == [busy_work()] * 4
+        assert sorted(profile.skipped is None for profile in profiles) == [False, False, False, True]
+        assert not profiling._profiler_lock.locked()
+
+    def test_profiler_refused(self):
+        """Test that a profiler that cannot be enabled leaves the request unprofiled"""
+        class Refusing(cProfile.Profile):
+            def enable(self, *args, **kwargs):
+                raise ValueError("Another profiling tool is already active")
+
+        profile = Refusing()
+        profile.skipped = None
+        results = [None]
+        self.run_in_request(profiled(busy_work), profile, results, 0)
+
+        assert results == [busy_work()]
+        assert profile.skipped == "Another profiling tool is already active"
+        assert not profiling._profiler_lock.locked()
+
+    def test_endpoint_error_releases_profiler(self):
+        """Test that an endpoint raising still disables the profiler and frees the lock"""
+        @profiled
+        def failing():
+            raise RuntimeError("boom")
+
+        profile = cProfile.Profile()
+        profile.skipped = None
+        results = [None]
+        self.run_in_request(failing, profile, results, 0)
+
+        assert isinstance(results[0], RuntimeError)
+        assert not profiling._profiler_lock.locked()
+        self.run_in_request(profiled(busy_work), cProfile.Profile(), results, 0)
+        assert results == [busy_work()]
+
+
+class TestTopFrames:
+    """Test suite for profile aggregation"""
+
+    def test_sorted_by_cumulative_time_and_limited(self):
+        """Test that frames are ordered by cumulative time and capped"""
+        profile = cProfile.Profile()
+        profile.runcall(busy_work)
+
+        frames = top_frames(profile, limit=3)
+
+        assert len(frames) <= 3
+        assert frames == sorted(frames, key=lambda f: f["cumtime_ms"], reverse=True)
+
+    def test_empty_profile(self):
+        """Test that a profile with no calls (endpoint never reached) aggregates to nothing"""
+        assert top_frames(cProfile.Profile()) == []
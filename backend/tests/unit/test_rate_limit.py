@@ -0,0 +1,216 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from app.rate_limit import (
+    Rule, MemoryBackend, SQLiteBackend, RateLimiter, RateLimitMiddleware, check_account_limit, client_ip,
+    limiter, parse_trusted_proxies
+)
+
+
+class FakeClock:
+    """Manually advanced clock for deterministic bucket refills"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestMemoryBackend:
+    """Test suite for the in-process token bucket store"""
+
+    def test_allows_up_to_capacity(self):
+        """Test that a fresh bucket allows exactly `capacity` hits"""
+        rule = Rule(capacity=3, period=60)
+        backend = MemoryBackend()
+
+        assert [backend.take("k", rule, 0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert backend.take("k", rule, 0.0) > 0
+
+    def test_retry_after_matches_refill_rate(self):
+        """Test that retry-after is the time until one token refills"""
+        rule = Rule(capacity=2, period=60)  # one token every 30s
+        backend = MemoryBackend()
+        backend.take("k", rule, 0.0)
+        backend.take("k", rule, 0.0)
+
+        assert backend.take("k", rule, 10.0) == pytest.approx(20.0)
+        assert backend.take("k", rule, 30.0) == 0.0
+
+    def test_keys_are_independent(self):
+        """Test that separate keys have separate buckets"""
+        rule = Rule(capacity=1, period=60)
+        backend = MemoryBackend()
+
+        assert backend.take("a", rule, 0.0) == 0.0
+        assert backend.take("b", rule, 0.0) == 0.0
+        assert backend.take("a", rule, 0.0) > 0
+
+    def test_evict_drops_only_refilled_buckets(self):
+        """Test that eviction removes buckets that are back to capacity"""
+        backend = MemoryBackend()
+        backend.take("short", Rule(capacity=1, period=10), 0.0)
+        backend.take("long", Rule(capacity=1, period=100), 0.0)
+
+        assert backend.evict(50.0) == 1
+        assert len(backend) == 1
+
+
+class TestSQLiteBackend:
+    """Test suite for the shared SQLite bucket store"""
+
+    def test_state_shared_between_instances(self, tmp_path):
+        """Test that two workers pointing at one file share buckets"""
+        path = str(tmp_path / "buckets.db")
+        rule = Rule(capacity=2, period=60)
+        worker_a = SQLiteBackend(path)
+        worker_b = SQLiteBackend(path)
+
+        assert worker_a.take("k", rule, 0.0) == 0.0
+        assert worker_b.take("k", rule, 0.0) == 0.0
+        assert worker_a.take("k", rule, 0.0) > 0
+
+    def test_evict(self, tmp_path):
+        """Test that refilled buckets are deleted"""
+        backend = SQLiteBackend(str(tmp_path / "buckets.db"))
+        backend.take("k", Rule(capacity=1, period=10), 0.0)
+
+        assert backend.evict(5.0) == 0
+        assert backend.evict(10.0) == 1
+        assert len(backend) == 0
+
+
+class TestRateLimiter:
+    """Test suite for the RateLimiter front end"""
+
+    def test_periodic_eviction(self):
+        """Test that idle buckets are swept on the next hit after the interval"""
+        clock = FakeClock()
+        rate_limiter = RateLimiter(evict_interval=60, clock=clock)
+        rate_limiter.hit("idle", Rule(capacity=1, period=10))
+
+        clock.now += 61
+        rate_limiter.hit("other", Rule(capacity=5, period=10))
+
+        assert len(rate_limiter.backend) == 1
+
+    def test_disabled_always_allows(self):
+        """Test that a disabled limiter never rejects"""
+        rate_limiter = RateLimiter(enabled=False)
+        rule = Rule(capacity=1, period=60)
+
+        assert rate_limiter.hit("k", rule) == 0.0
+        assert rate_limiter.hit("k", rule) == 0.0
+
+
+class TestCheckAccountLimit:
+    """Test suite for per-account throttling"""
+
+    def setup_method(self):
+        limiter.reset()
+
+    def test_raises_429_when_exhausted(self):
+        """Test that the account bucket raises 429 with Retry-After"""
+        for _ in range(3):
+            check_account_limit("/auth/resend-verification", "user@example.com")
+
+        with pytest.raises(HTTPException) as exc_info:
+            check_account_limit("/auth/resend-verification", "user@example.com")
+
+        assert exc_info.value.status_code == 429
+        assert "Retry-After" in exc_info.value.headers
+
+    def test_account_key_is_case_insensitive(self):
+        """Test that case variations of an email share one bucket"""
+        for _ in range(3):
+            check_account_limit("/auth/resend-verification", "User@Example.com")
+
+        with pytest.raises(HTTPException):
+            check_account_limit("/auth/resend-verification", "user@example.com")
+
+    def test_client_ip_gives_each_client_its_own_bucket(self):
+        """Test that exhausting an account from one IP leaves it open from another"""
+        for _ in range(10):
+            check_account_limit("/auth/login", "user@example.com", "203.0.113.7")
+
+        with pytest.raises(HTTPException):
+            check_account_limit("/auth/login", "user@example.com", "203.0.113.7")
+        check_account_limit("/auth/login", "user@example.com", "198.51.100.20")
+
+
+def http_scope(peer: str, *forwarded: str, path: str = "/auth/login") -> dict:
+    return {
+        "type": "http", "method": "POST", "path": path, "client": (peer, 40000),
+        "headers": [(b"x-forwarded-for", value.encode()) for value in forwarded],
+    }
+
+
+class TestClientIp:
+    """Test suite for the client address behind trusted proxies"""
+
+    PROXIES = parse_trusted_proxies("10.0.0.0/8, 192.168.1.5")
+
+    def test_parse_trusted_proxies(self):
+        """Test that addresses and networks are parsed and blanks ignored"""
+        assert [str(n) for n in self.PROXIES] == ["10.0.0.0/8", "192.168.1.5/32"]
+        assert parse_trusted_proxies("") == ()
+        with pytest.raises(ValueError):
+            parse_trusted_proxies("render")
+
+    def test_untrusted_peer_header_ignored(self):
+        """Test that a client cannot choose its own key with X-Forwarded-For"""
+        assert client_ip(http_scope("203.0.113.9", "1.2.3.4"), self.PROXIES) == "203.0.113.9"
+        assert client_ip(http_scope("10.0.0.2", "1.2.3.4"), ()) == "10.0.0.2"
+
+    def test_rightmost_untrusted_hop(self):
+        """Test that the address the trusted proxy saw wins over spoofed entries on the left"""
+        scope = http_scope("10.0.0.2", "6.6.6.6, 198.51.100.7, 10.1.2.3")
+
+        assert client_ip(scope, self.PROXIES) == "198.51.100.7"
+
+    def test_repeated_headers_and_missing_header(self):
+        """Test that repeated headers are read as one list and a missing one falls back to the peer"""
+        assert client_ip(http_scope("10.0.0.2", "198.51.100.7", "192.168.1.5"), self.PROXIES) == "198.51.100.7"
+        assert client_ip(http_scope("10.0.0.2"), self.PROXIES) == "10.0.0.2"
+
+
+class TestRateLimitMiddleware:
+    """Test suite for the per-IP auth middleware"""
+
+    def call(self, middleware, scope) -> int:
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(middleware(scope, receive, send))
+        return sent[0]["status"]
+
+    def make(self):
+        async def endpoint(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        return RateLimitMiddleware(
+            endpoint, rate_limiter=RateLimiter(), rules={"/auth/login": Rule(capacity=2, period=60)},
+            trusted_proxies=parse_trusted_proxies("10.0.0.0/8"),
+        )
+
+    def test_clients_behind_proxy_have_own_buckets(self):
+        """Test that one client behind the proxy exhausting its bucket does not lock out others"""
+        middleware = self.make()
+        statuses = [self.call(middleware, http_scope("10.0.0.2", "198.51.100.7")) for _ in range(3)]
+
+        assert statuses == [200, 200, 429]
+        assert self.call(middleware, http_scope("10.0.0.2", "198.51.100.8")) == 200
+
+    def test_spoofed_header_from_direct_client(self):
+        """Test that rotating X-Forwarded-For from outside the proxy does not reset the bucket"""
+        middleware = self.make()
+        statuses = [self.call(middleware, http_scope("203.0.113.9", f"1.1.1.{i}")) for i in range(3)]
+
+        assert statuses == [200, 200, 429]
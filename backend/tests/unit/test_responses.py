@@ -0,0 +1,122 @@
+import gzip
+import json
+import pytest
+from datetime import datetime
+from uuid import uuid4
+from starlette.requests import Request
+from app import responses
+from app.responses import dumps, json_response, negotiate_encoding
+
+CONTENT = [{"record_id": 1, "user_id": uuid4(), "bmi": 25.5, "created_at": datetime(2025, 1, 2, 3, 4, 5, 6),
+            "job_id": None, "outcome_svc": "Low Risk", "prediction_prob_svc": 74.57, "note": "μU/mL"}]
+
+
+class FakeBrotli:
+    """Stand-in for the optional brotli module"""
+
+    @staticmethod
+    def compress(body, quality):
+        return b"br:" + body
+
+
+def make_request(accept_encoding=None):
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+class TestDumps:
+    """Test suite for the JSON encoder"""
+
+    def test_compact_json_with_uuids_and_datetimes(self):
+        """Test that UUIDs and datetimes are written as strings, without whitespace"""
+        body = dumps(CONTENT)
+
+        assert json.loads(body)[0]["user_id"] == str(CONTENT[0]["user_id"])
+        assert json.loads(body)[0]["created_at"] == "2025-01-02T03:04:05.000006"
+        assert b", " not in body
+
+    @pytest.mark.skipif(responses.orjson is None, reason="orjson not installed")
+    def test_stdlib_fallback_matches_orjson(self, monkeypatch):
+        """Test that the stdlib fallback gives the same bytes as orjson"""
+        expected = dumps(CONTENT)
+        monkeypatch.setattr(responses, "orjson", None)
+
+        assert dumps(CONTENT) == expected
+
+    def test_unknown_type(self, monkeypatch):
+        """Test that values JSON has no form for are refused"""
+        monkeypatch.setattr(responses, "orjson", None)
+
+        with pytest.raises(TypeError):
+            dumps([object()])
+
+
+class TestNegotiateEncoding:
+    """Test suite for Accept-Encoding negotiation"""
+
+    @pytest.mark.parametrize("header, expected", [
+        (None, None),
+        ("", None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("deflate, gzip;q=0.5", "gzip"),
+        ("gzip;q=0", None),
+        ("*", "gzip"),
+        ("*, gzip;q=0", None),
+        ("GZIP", "gzip"),
+    ])
+    def test_gzip(self, monkeypatch, header, expected):
+        """Test that gzip is chosen when accepted with a non-zero quality"""
+        monkeypatch.setattr(responses, "brotli", None)
+
+        assert negotiate_encoding(header) == expected
+
+    def test_brotli_preferred_when_installed(self, monkeypatch):
+        """Test that br wins over gzip only when the brotli module is there"""
+        monkeypatch.setattr(responses, "brotli", FakeBrotli)
+        assert negotiate_encoding("gzip, br") == "br"
+        assert negotiate_encoding("gzip, br;q=0") == "gzip"
+
+        monkeypatch.setattr(responses, "brotli", None)
+        assert negotiate_encoding("br") is None
+
+
+class TestJsonResponse:
+    """Test suite for compressed JSON responses"""
+
+    def test_small_body_sent_as_is(self):
+        """Test that bodies under COMPRESS_MIN_BYTES are not compressed"""
+        response = json_response(make_request("gzip"), b"[]")
+
+        assert response.body == b"[]"
+        assert "content-encoding" not in response.headers
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.media_type == "application/json"
+
+    def test_large_body_gzipped(self, monkeypatch):
+        """Test that large bodies are gzipped when the client accepts it"""
+        monkeypatch.setattr(responses, "brotli", None)
+        body = dumps(CONTENT * 200)
+
+        response = json_response(make_request("gzip, deflate"), body, headers={"ETag": '"x"'})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert gzip.decompress(response.body) == body
+        assert int(response.headers["content-length"]) == len(response.body) < len(body)
+        assert response.headers["etag"] == '"x"'
+
+    def test_large_body_brotli(self, monkeypatch):
+        """Test that large bodies use brotli when it is installed and accepted"""
+        monkeypatch.setattr(responses, "brotli", FakeBrotli)
+        body = dumps(CONTENT * 200)
+
+        response = json_response(make_request("br"), body)
+
+        assert response.headers["content-encoding"] == "br"
+        assert response.body == b"br:" + body
+
+    def test_no_accept_encoding(self):
+        """Test that clients that accept no coding get the plain body"""
+        body = dumps(CONTENT * 200)
+
+        assert json_response(make_request(), body).body == body
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+from app.models import health_records
+from app.series import SERIES_METRICS, downsample
+
+START = datetime(2025, 1, 1)
+
+
+def add_records(session, user_id, values, step=timedelta(hours=1), field="glucose"):
+    for i, value in enumerate(values):
+        record = health_records(
+            user_id=user_id, pregnancies=1, glucose=100, blood_pressure=70, insulin=80, bmi=25.0,
+            diabetic_family=0, age=30, created_at=START + i * step, risk_xgboost=7000,
+        )
+        setattr(record, field, value)
+        session.add(record)
+    session.commit()
+
+
+class TestDownsample:
+    """Test suite for the per-bucket min/max/mean series"""
+
+    def test_equal_time_buckets(self, session):
+        """Test that the time range is split evenly and each bucket is summarised"""
+        user_id = uuid4()
+        add_records(session, user_id, [100, 110, 90, 120, 130, 80, 140, 150, 70, 160])
+
+        series = downsample(session, user_id, "glucose", buckets=2)
+
+        assert series["count"] == 10
+        assert [p["count"] for p in series["points"]] == [5, 5]
+        first, second = series["points"]
+        assert (first["min"], first["max"], first["mean"]) == (90, 130, 110.0)
+        assert (second["min"], second["max"], second["mean"]) == (70, 160, 120.0)
+        assert first["start"] == START
+        assert first["end"] == START + timedelta(hours=4)
+        assert second["end"] == START + timedelta(hours=9)
+
+    def test_payload_bounded_by_buckets(self, session):
+        """Test that there are never more points than buckets, whatever the record count"""
+        user_id = uuid4()
+        add_records(session, user_id, range(60, 260), step=timedelta(minutes=7))
+
+        series = downsample(session, user_id, "glucose", buckets=12)
+
+        assert len(series["points"]) == 12
+        assert sum(p["count"] for p in series["points"]) == 200
+        assert series["points"][-1]["max"] == 259
+
+    def test_empty_buckets_left_out(self, session):
+        """Test that intervals without records give no point"""
+        user_id = uuid4()
+        add_records(session, user_id, [100, 101], step=timedelta(days=30))
+        add_records(session, user_id, [200], step=timedelta(days=30))
+
+        series = downsample(session, user_id, "glucose", buckets=10)
+
+        assert [p["count"] for p in series["points"]] == [2, 1]
+
+    def test_single_record(self, session):
+        """Test that one record gives one bucket with that value"""
+        user_id = uuid4()
+        add_records(session, user_id, [25.5], field="bmi")
+
+        points = downsample(session, user_id, "bmi", buckets=50)["points"]
+
+        assert points == [{"start": START, "end": START, "count": 1, "min": 25.5, "max": 25.5, "mean": 25.5}]
+
+    def test_risk_as_percentage(self, session):
+        """Test that risk_ metrics come back as percentages and skip unpredicted rows"""
+        user_id = uuid4()
+        add_records(session, user_id, [7457, 3300, None], field="risk_xgboost")
+
+        series = downsample(session, user_id, "risk_xgboost", buckets=1)
+
+        assert series["count"] == 2
+        assert series["points"][0]["min"] == 33.0
+        assert series["points"][0]["max"] == 74.57
+
+    def test_time_window_and_owner(self, session):
+        """Test that start/end limit the records, and other users' records never count"""
+        user_id = uuid4()
+        add_records(session, user_id, range(100, 110))
+        add_records(session, uuid4(), [299] * 10)
+
+        series = downsample(session, user_id, "glucose", buckets=100,
+                            start=START + timedelta(hours=2), end=START + timedelta(hours=5))
+
+        assert series["count"] == 4
+        assert [p["min"] for p in series["points"]] == [102, 103, 104, 105]
+
+    def test_no_records(self, session):
+        """Test that a user without records gets an empty series"""
+        assert downsample(session, uuid4(), "glucose", buckets=10) == {
+            "metric": "glucose", "buckets": 10, "count": 0, "points": []}
+
+    def test_metrics(self):
+        """Test that every feature and every model's risk can be charted"""
+        assert "glucose" in SERIES_METRICS
+        assert "risk_xgboost" in SERIES_METRICS
+        assert "outcome_xgboost" not in SERIES_METRICS
@@ -0,0 +1,120 @@
+import os
+import joblib
+import numpy as np
+import pytest
+from app.ml import inferences
+from app.ml.inferences import risk_label
+from app.ml.model_store import ModelSet, ModelStore
+from app.ml.shadow import ENSEMBLE, ShadowEvaluator
+
+
+class ConstantModel:
+    """Picklable stand-in for a fitted pipeline"""
+
+    def __init__(self, risk: float):
+        self.risk = risk
+
+    def predict_proba(self, X):
+        return np.array([[1 - self.risk, self.risk]] * len(X))
+
+
+@pytest.fixture
+def store(tmp_path):
+    """A store with a candidate holding one shared and one new model"""
+    directory = tmp_path / "versions" / "candidate"
+    directory.mkdir(parents=True)
+    joblib.dump(ConstantModel(0.2), os.path.join(directory, "model_SVC.pkl"))
+    joblib.dump(ConstantModel(0.8), os.path.join(directory, "model_LightGBM.pkl"))
+    return ModelStore(root=str(tmp_path / "versions"))
+
+
+@pytest.fixture
+def evaluator(store):
+    """A shadow evaluator sampling every call"""
+    shadow = ShadowEvaluator(label=risk_label, model_store=store, sample_rate=1.0, queue_size=4, recent_size=3)
+    shadow.start("candidate")
+    yield shadow
+    shadow.stop()
+
+
+X = np.zeros((2, 8))
+PRIMARY = {"svc": [0.25, 0.5], "xgboost": [0.75, 0.5]}
+
+
+class TestShadowEvaluator:
+    """Test suite for shadow-mode candidate evaluation"""
+
+    def test_disabled_by_default(self, store):
+        """Test that nothing is queued until a candidate is started"""
+        shadow = ShadowEvaluator(label=risk_label, model_store=store, sample_rate=1.0)
+
+        assert not shadow.enabled
+        assert shadow.submit(X, PRIMARY) is False
+
+    def test_same_name_compared_with_primary_model(self, evaluator):
+        """Test that a candidate model is compared with its namesake"""
+        evaluator.submit(X, PRIMARY)
+        assert evaluator.drain()
+
+        svc = evaluator.summary()["models"]["svc"]
+        assert svc["compared_with"] == "svc"
+        assert svc["rows"] == 2
+        assert svc["mean_abs_diff"] == pytest.approx((0.05 + 0.3) / 2)
+        assert svc["label_agreement"] == 0.5
+
+    def test_new_model_compared_with_ensemble(self, evaluator):
+        """Test that a model with no primary namesake is compared with the ensemble mean"""
+        evaluator.submit(X, PRIMARY)
+        assert evaluator.drain()
+
+        lightgbm = evaluator.summary()["models"]["lightgbm"]
+        assert lightgbm["compared_with"] == ENSEMBLE
+        assert lightgbm["max_abs_diff"] == pytest.approx(0.3)
+
+    def test_sample_rate_zero_skips(self, evaluator):
+        """Test that unsampled calls never reach the queue"""
+        evaluator.sample_rate = 0.0
+
+        assert evaluator.submit(X, PRIMARY) is False
+
+    def test_full_queue_drops_instead_of_blocking(self, store):
+        """Test that the request path never waits on the shadow"""
+        # No worker thread, so the single queue slot stays taken
+        shadow = ShadowEvaluator(label=risk_label, model_store=store, sample_rate=1.0, queue_size=1)
+        shadow.candidate = store.load("candidate")
+
+        assert shadow.submit(X, PRIMARY) is True
+        assert shadow.submit(X, PRIMARY) is False
+        assert shadow.dropped == 1
+
+    def test_recent_samples_are_bounded(self, evaluator):
+        """Test that the sample ring buffer keeps only the newest entries"""
+        for _ in range(4):
+            evaluator.submit(X, PRIMARY)
+            evaluator.drain()
+
+        assert len(evaluator.summary()["recent"]) == 3
+
+    def test_stop_discards_queued_samples(self, evaluator):
+        """Test that samples queued before stop are not evaluated"""
+        evaluator.stop()
+        candidate = evaluator.store.load("candidate")
+        evaluator._queue.put_nowait((candidate, X, PRIMARY))
+        evaluator.drain()
+
+        assert evaluator.summary()["models"] == {}
+
+
+class TestPredictRiskShadowHook:
+    """Test suite for the predict_risk shadow hook"""
+
+    def test_predict_risk_feeds_shadow(self, evaluator, monkeypatch):
+        """Test that a primary prediction is offered to the shadow with its probabilities"""
+        monkeypatch.setattr(inferences, "shadow", evaluator)
+        primary = ModelSet("bundled", {"svc": ConstantModel(0.25)})
+
+        result = inferences.predict_risk(inferences.CANARY_ROWS[0], primary)
+        assert evaluator.drain()
+
+        assert result["prediction_prob_svc"] == 25.0
+        assert evaluator.summary()["models"]["svc"]["rows"] == 1
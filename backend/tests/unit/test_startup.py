@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+import pytest
+from fastapi.testclient import TestClient
+from app.ml import inferences
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Generous enough for a slow CI box; importing sklearn alone used to take longer
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "1.5"))
+
+IMPORT_SCRIPT = """
+import sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+heavy = [m for m in ("sklearn", "xgboost", "scipy", "joblib", "pandas", "numpy", "psycopg2") if m in sys.modules]
+print(elapsed, ",".join(heavy))
+"""
+
+
+def import_app(env: dict):
+    proc = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=60,
+    )
+    assert proc.returncode == 0, proc.stderr
+    elapsed, _, heavy = proc.stdout.strip().partition(" ")
+    return float(elapsed), [m for m in heavy.split(",") if m]
+
+
+@pytest.fixture
+def bare_env():
+    """Environment with only the settings the app cannot run without"""
+    env = {key: value for key, value in os.environ.items()
+           if not key.startswith(("SMTP_", "DB_")) and key != "DATABASE_URL"}
+    env["SECRET_KEY"] = "test-secret-key-for-testing-only"
+    return env
+
+
+class TestStartup:
+    """Test suite for application import cost"""
+
+    def test_import_does_not_load_ml_or_db_drivers(self, bare_env):
+        """Test that importing the app leaves sklearn, xgboost, pandas and psycopg2 unloaded"""
+        _, heavy = import_app(bare_env)
+
+        assert heavy == []
+
+    def test_import_without_smtp_or_db_settings(self, bare_env):
+        """Test that the app imports with no SMTP_PORT or DB_* variables set"""
+        elapsed, _ = import_app(bare_env)
+
+        assert elapsed >= 0
+
+    def test_import_within_budget(self, bare_env):
+        """Test that importing the app stays within the startup budget"""
+        # Best of three, so one slow interpreter start does not fail the build
+        elapsed = min(import_app(bare_env)[0] for _ in range(3))
+
+        assert elapsed < STARTUP_BUDGET_SECONDS
+
+
+class TestModelLoading:
+    """Test suite for deferred model loading"""
+
+    def test_load_models_is_cached(self):
+        """Test that models are unpickled once and reused"""
+        first = inferences.load_models()
+
+        assert set(first) == set(inferences.model_files)
+        assert inferences.load_models() is first
+
+    def test_lifespan_preloads_models(self, monkeypatch, test_engine):
+        """Test that app startup loads the models in the background warm-up"""
+        from app import main, warmup
+        startup = warmup.Warmup(engine_factory=lambda: test_engine)
+        monkeypatch.setenv("TOKEN_SWEEP_ENABLED", "false")
+        monkeypatch.setattr(main, "startup_warmup", startup)
+        monkeypatch.setattr(inferences, "models", None)
+
+        with TestClient(main.app):
+            assert startup.wait(timeout=60)
+            assert inferences.models is not None
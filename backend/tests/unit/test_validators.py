@@ -7,8 +7,17 @@ from app.validators import (
     validate_email_format,
     validate_password_strength,
     validate_phone_number,
-    validate_username
+    validate_username,
+    validate_model_names,
+    validate_series_metric,
+    validate_record_ids,
+    find_patient_data_errors,
+    validate_bulk_records,
+    PATIENT_FIELD_RULES
 )
+from datetime import datetime
+from pydantic import ValidationError
+from app.schemas import PatientData, PatientDataWithCreatedAt
 
 
 class TestValidatePatientData:
@@ -247,3 +256,178 @@ class TestValidateUsername:
     def test_username_with_underscore(self):
         """Test that username with underscore passes"""
         validate_username("user_name")
+
+
+class TestValidateModelNames:
+    """Test suite for the models= subset parameter"""
+
+    def test_absent_or_all_selects_every_model(self):
+        """Test that no subset means all models"""
+        assert validate_model_names(None) is None
+        assert validate_model_names("") is None
+        assert validate_model_names("all") is None
+
+    def test_subset_in_canonical_order(self):
+        """Test that names are normalised, deduplicated and ordered"""
+        assert validate_model_names(" XGBoost,svc,xgboost ") == ["svc", "xgboost"]
+
+    def test_unknown_model(self):
+        """Test that an unknown model name is rejected"""
+        with pytest.raises(HTTPException) as exc_info:
+            validate_model_names("xgboost,lightgbm")
+
+        assert exc_info.value.status_code == 422
+        assert "lightgbm" in exc_info.value.detail
+
+
+class TestValidateSeriesMetric:
+    """Test suite for the metric= parameter of the records series"""
+
+    def test_features_and_risks(self):
+        """Test that features and risk_<model> are accepted and normalised"""
+        assert validate_series_metric("glucose") == "glucose"
+        assert validate_series_metric(" Risk_XGBoost ") == "risk_xgboost"
+
+    def test_unknown_metric(self):
+        """Test that anything that is not a numeric record column is rejected"""
+        for metric in ("outcome_xgboost", "user_id", "created_at"):
+            with pytest.raises(HTTPException) as exc_info:
+                validate_series_metric(metric)
+
+            assert exc_info.value.status_code == 422
+            assert metric in exc_info.value.detail
+
+
+class TestValidateRecordIds:
+    """Test suite for batch edit and delete record IDs"""
+
+    def test_valid_ids(self):
+        """Test that distinct IDs within the limit are returned as given"""
+        assert validate_record_ids([3, 1, 2]) == [3, 1, 2]
+
+    def test_empty_batch(self):
+        """Test that an empty batch is rejected"""
+        with pytest.raises(HTTPException) as exc_info:
+            validate_record_ids([])
+
+        assert exc_info.value.status_code == 422
+
+    def test_too_many_ids(self):
+        """Test that a batch over the limit is rejected"""
+        with pytest.raises(HTTPException) as exc_info:
+            validate_record_ids([1, 2, 3], max_records=2)
+
+        assert "At most 2" in exc_info.value.detail
+
+    def test_duplicate_ids(self):
+        """Test that a record named twice is rejected and reported"""
+        with pytest.raises(HTTPException) as exc_info:
+            validate_record_ids([1, 2, 1, 3, 3])
+
+        assert exc_info.value.detail.endswith("1, 3")
+
+
+VALID_ROW = {"pregnancies": 2, "glucose": 120, "blood_pressure": 80, "insulin": 100,
+             "bmi": 25.5, "diabetic_family": 0, "age": 35}
+
+
+class TestFindPatientDataErrors:
+    """Test suite for the columnar patient data validator"""
+
+    def test_valid_rows_are_converted(self):
+        """Test that valid columns come back as ints and floats like the schemas produce"""
+        columns, errors = find_patient_data_errors([VALID_ROW, {**VALID_ROW, "glucose": "130", "bmi": 30}])
+
+        assert errors == []
+        assert columns["glucose"] == [120, 130]
+        assert all(type(v) is int for v in columns["glucose"])
+        assert columns["bmi"] == [25.5, 30.0]
+        assert all(type(v) is float for v in columns["bmi"])
+
+    def test_reports_every_failing_row_and_field(self):
+        """Test that all problems are reported in one pass, ordered by row"""
+        rows = [
+            {**VALID_ROW, "age": 0, "bmi": 80},
+            VALID_ROW,
+            {**VALID_ROW, "glucose": "high"},
+        ]
+
+        _, errors = find_patient_data_errors(rows)
+
+        assert [(e["row"], e["field"]) for e in errors] == [(0, "bmi"), (0, "age"), (2, "glucose")]
+        assert errors[0]["message"] == PATIENT_FIELD_RULES["bmi"]["message"]
+        assert errors[2]["value"] == "high"
+
+    def test_fractional_integer_field(self):
+        """Test that a fractional value is rejected for an integer field"""
+        _, errors = find_patient_data_errors([{**VALID_ROW, "pregnancies": 2.5}])
+
+        assert [e["field"] for e in errors] == ["pregnancies"]
+
+    def test_missing_fields(self):
+        """Test that missing fields are errors only when required"""
+        row = {"glucose": 120}
+
+        _, required_errors = find_patient_data_errors([row])
+        columns, optional_errors = find_patient_data_errors([row], required=False)
+
+        assert {e["field"] for e in required_errors} == set(PATIENT_FIELD_RULES) - {"glucose"}
+        assert all(e["message"] == "Field required" for e in required_errors)
+        assert optional_errors == []
+        assert columns["age"] == [None]
+
+    @pytest.mark.parametrize("field", list(PATIENT_FIELD_RULES))
+    def test_agrees_with_schema_at_bounds(self, field):
+        """Test that the columnar check accepts exactly what PatientData accepts around each bound"""
+        rules = PATIENT_FIELD_RULES[field]
+        step = 1 if rules["integer"] else 0.1
+        candidates = [rules["min"] - step, rules["min"], rules["max"], rules["max"] + step]
+        rows = [{**VALID_ROW, field: value} for value in candidates]
+
+        _, errors = find_patient_data_errors(rows)
+        rejected = {e["row"] for e in errors}
+
+        for i, row in enumerate(rows):
+            try:
+                PatientData(**row)
+                schema_accepts = True
+            except ValidationError:
+                schema_accepts = False
+            assert schema_accepts == (i not in rejected), (field, row[field])
+
+
+class TestValidateBulkRecords:
+    """Test suite for bulk upload validation"""
+
+    def test_valid_rows(self):
+        """Test that valid rows are returned with a parsed created_at"""
+        rows = validate_bulk_records([{**VALID_ROW, "created_at": "2025-01-01T08:00:00"}])
+
+        assert rows == [{**VALID_ROW, "created_at": datetime(2025, 1, 1, 8, 0)}]
+
+    def test_timestamps_parsed_like_the_schema(self):
+        """Test that the frontend's toISOString() output and Unix timestamps are accepted, as by Pydantic"""
+        sent = ["2024-01-15T10:30:00Z", "2024-01-15T10:30:00.123Z", "2024-01-15T10:30:00+02:00", 1705314600]
+
+        rows = validate_bulk_records([{**VALID_ROW, "created_at": value} for value in sent])
+
+        expected = [PatientDataWithCreatedAt(**VALID_ROW, created_at=value).created_at for value in sent]
+        assert [row["created_at"] for row in rows] == expected
+        assert rows[0]["created_at"].utcoffset().total_seconds() == 0
+        assert rows[1]["created_at"].microsecond == 123000
+
+    def test_reports_fields_and_timestamps_together(self):
+        """Test that range and timestamp errors are raised together as one 422"""
+        rows = [
+            {**VALID_ROW, "created_at": "2025-01-01T08:00:00"},
+            {**VALID_ROW, "insulin": 5000, "created_at": "yesterday"},
+            {**VALID_ROW},
+        ]
+
+        with pytest.raises(HTTPException) as exc_info:
+            validate_bulk_records(rows)
+
+        assert exc_info.value.status_code == 422
+        assert [(e["row"], e["field"]) for e in exc_info.value.detail] == [
+            (1, "insulin"), (1, "created_at"), (2, "created_at")
+        ]
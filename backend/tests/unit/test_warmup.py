@@ -0,0 +1,147 @@
+import time
+from unittest.mock import MagicMock
+from app import warmup
+from app.warmup import Warmup, prime_database, retry_delay, synthetic_rows, warm_models
+
+
+class TestSyntheticRows:
+    """Test suite for warm-up input rows"""
+
+    def test_rows_are_deterministic_and_complete(self):
+        """Test that the same seed gives the same rows with every model input"""
+        rows = synthetic_rows(10)
+
+        assert rows == synthetic_rows(10)
+        assert set(rows[0]) == {"pregnancies", "glucose", "blood_pressure", "insulin", "bmi", "diabetic_family", "age"}
+        assert all(row["age"] > 0 for row in rows)
+
+
+class TestWarmModels:
+    """Test suite for the model warm-up pass"""
+
+    def test_every_model_is_exercised(self):
+        """Test that each model sees the batches and single rows"""
+        model = MagicMock()
+        report = warm_models({"a": model, "b": model}, batches=2, batch_size=8, single_rows=5)
+
+        assert set(report) == {"a", "b"}
+        assert model.predict_proba.call_count == 2 * (2 + 5)
+        assert report["a"]["p99_ms"] >= report["a"]["p50_ms"]
+
+    def test_warmup_does_not_touch_drift_or_stage_metrics(self, monkeypatch):
+        """Test that synthetic traffic is kept out of the live statistics"""
+        observe = MagicMock()
+        monkeypatch.setattr(warmup.inferences.drift_monitor, "observe", observe)
+        monkeypatch.setattr(warmup.inferences, "observe_stage", observe)
+
+        warm_models({"a": MagicMock()}, batches=1, batch_size=4, single_rows=2)
+
+        observe.assert_not_called()
+
+
+class TestWarmup:
+    """Test suite for the readiness state machine"""
+
+    def test_pending_until_run(self):
+        """Test that a fresh warm-up is not ready"""
+        ready, report = Warmup().readiness()
+
+        assert not ready
+        assert report["status"] == "pending"
+
+    def test_ready_after_successful_run(self, test_engine):
+        """Test that models and database are both reported"""
+        startup = Warmup(load_models=lambda: {"a": MagicMock()}, engine_factory=lambda: test_engine)
+
+        startup.run()
+        ready, report = startup.readiness()
+
+        assert ready
+        assert startup.done.is_set()
+        assert report["models"]["status"] == "ok"
+        assert report["database"]["connections"] == warmup.WARMUP_DB_CONNECTIONS
+
+    def test_database_failure_is_not_ready(self):
+        """Test that an unreachable database keeps the instance out of rotation"""
+        def broken_engine():
+            raise RuntimeError("connection refused")
+
+        startup = Warmup(load_models=lambda: {}, engine_factory=broken_engine, max_attempts=1)
+        startup.run()
+        ready, report = startup.readiness()
+
+        assert not ready
+        assert report["status"] == "failed"
+        assert report["database"] == {"status": "error", "error": "connection refused"}
+
+    def test_model_load_failure_is_not_ready(self, test_engine):
+        """Test that a model that cannot be loaded fails readiness"""
+        def broken_models():
+            raise FileNotFoundError("model_SVC.pkl")
+
+        startup = Warmup(load_models=broken_models, engine_factory=lambda: test_engine, max_attempts=1)
+        startup.run()
+
+        assert startup.readiness()[0] is False
+        assert startup.report["models"]["status"] == "error"
+
+
+    def test_transient_failure_is_retried(self, test_engine):
+        """Test that a database that comes up late still ends in ready, without reloading the models"""
+        failures = [RuntimeError("connection refused")] * 2
+        load_models = MagicMock(return_value={"a": MagicMock()})
+
+        def flaky_engine():
+            if failures:
+                raise failures.pop()
+            return test_engine
+
+        startup = Warmup(load_models=load_models, engine_factory=flaky_engine, retry_initial=0.0)
+        report = startup.run()
+
+        assert report["status"] == "ready"
+        assert report["attempts"] == 3
+        assert "next_retry_in_s" not in report
+        assert load_models.call_count == 1
+        assert startup.readiness()[0]
+
+    def test_retrying_is_not_ready(self):
+        """Test that readiness stays 503 between attempts, then stop() ends the retries"""
+        def broken_engine():
+            raise RuntimeError("connection refused")
+
+        startup = Warmup(load_models=lambda: {}, engine_factory=broken_engine, retry_initial=30.0)
+        startup.start()
+        deadline = time.monotonic() + 10
+        while startup.report["status"] != "retrying" and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        ready, report = startup.readiness()
+        assert not ready
+        assert report["status"] == "retrying"
+        assert report["next_retry_in_s"] == 30.0
+
+        startup.stop()
+        assert startup.done.is_set()
+        assert startup.report["status"] == "failed"
+
+
+class TestRetryDelay:
+    """Test suite for the warm-up backoff"""
+
+    def test_doubles_up_to_the_cap(self):
+        """Test that the delay doubles per failed attempt and is capped"""
+        assert [retry_delay(attempt, 1.0, 10.0) for attempt in range(1, 7)] == [1.0, 2.0, 4.0, 8.0, 10.0, 10.0]
+
+
+class TestPrimeDatabase:
+    """Test suite for connection pool priming"""
+
+    def test_opens_requested_connections_at_once(self):
+        """Test that connections are held together, then all returned"""
+        engine = MagicMock()
+
+        prime_database(engine, 3)
+
+        assert engine.connect.call_count == 3
+        assert engine.connect.return_value.close.call_count == 3